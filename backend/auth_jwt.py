@@ -1,4 +1,5 @@
 import os
+import uuid
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
@@ -11,6 +12,7 @@ from models import User
 SECRET_KEY = os.environ.get("SECRET_KEY", "change_me_in_prod")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
 # ✅ The frontend calls /auth/login to get tokens
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -27,12 +29,49 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return token
 
 
-def get_current_user(
+def create_refresh_token(user_id: int, version: int = 0):
+    """
+    Creates a long-lived refresh token, tied to the user's token_version.
+    Returns (token, jti, expires_at) so the caller can revoke it later.
+    """
+    jti = uuid.uuid4().hex
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+    token = jwt.encode(
+        {"id": user_id, "type": "refresh", "jti": jti, "ver": version, "exp": expire},
+        SECRET_KEY,
+        algorithm=ALGORITHM
+    )
+    return token, jti, expire
+
+
+def decode_refresh_token(token: str) -> dict:
+    """
+    Verifies signature, expiry and token type. Revocation is checked by the caller.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token"
+    )
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+
+    if payload.get("type") != "refresh" or not payload.get("jti") or payload.get("id") is None:
+        raise credentials_exception
+
+    return payload
+
+
+def get_user_allowing_password_change(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
     """
-    Verifies JWT and returns the authenticated user
+    Verifies JWT and returns the authenticated user, even one that still has
+    to replace a temporary password. Only /auth/change_password uses it.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,6 +83,9 @@ def get_current_user(
         user_id: int = payload.get("id")
         if user_id is None:
             raise credentials_exception
+        # Refresh tokens are only accepted by /auth/refresh
+        if payload.get("type") == "refresh":
+            raise credentials_exception
     except JWTError:
         raise credentials_exception
 
@@ -52,3 +94,19 @@ def get_current_user(
         raise credentials_exception
 
     return user
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """
+    Verifies JWT and returns the authenticated user.
+    Accounts flagged must_change_password are refused until they change it.
+    """
+    user = get_user_allowing_password_change(token=token, db=db)
+
+    if user.must_change_password:
+        raise HTTPException(status_code=403, detail="Password change required")
+
+    return user
@@ -0,0 +1,128 @@
+"""
+Per-request connection cost for the DB pool modes in database.py:
+
+    null   NullPool: connect on every request (old Render setting)
+    queue  QueuePool with pre-ping
+    idle   QueuePool + IdleRecycler (new Render default)
+
+Traffic comes in bursts separated by idle gaps, like a sleeping instance.
+
+Without --url the target is a local PostgreSQL stand-in: a SQLite file plus
+simulated network costs. Each new connection sleeps --connect-ms (TCP + TLS
++ auth). Pooled connections idle for longer than --server-idle are treated
+as dropped by the server: using one costs --dead-ms before the pool
+notices and reconnects.
+
+Usage:
+    python bench_db_pool.py
+    python bench_db_pool.py --connect-ms 80 --bursts 8
+    python bench_db_pool.py --url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# database.py needs DATABASE_URL at import; the benchmark builds its own engines
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_pool.db')}")
+
+from sqlalchemy import event, exc, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from database import make_engine, IdleRecycler  # noqa: E402
+
+
+def simulate_network(engine, connect_ms: float, server_idle: float, dead_ms: float):
+    stats = {"connects": 0, "dead": 0}
+
+    @event.listens_for(engine, "do_connect")
+    def slow_connect(dialect, conn_rec, cargs, cparams):
+        time.sleep(connect_ms / 1000)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_conn, conn_rec):
+        stats["connects"] += 1
+        conn_rec.info["last_used"] = time.time()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_conn, conn_rec, proxy):
+        if time.time() - conn_rec.info.get("last_used", time.time()) > server_idle:
+            # Server closed it while idle: the first use fails after a wait
+            stats["dead"] += 1
+            time.sleep(dead_ms / 1000)
+            raise exc.DisconnectionError("server closed the connection")
+        conn_rec.info["last_used"] = time.time()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_conn, conn_rec):
+        if conn_rec is not None:
+            conn_rec.info["last_used"] = time.time()
+
+    return stats
+
+
+def run_mode(mode: str, args, url: str) -> dict:
+    engine = make_engine(url, mode)
+    recycler = IdleRecycler(engine, args.recycle) if mode == "idle" else None
+    stats = simulate_network(engine, args.connect_ms, args.server_idle, args.dead_ms) if args.simulate else {}
+    Session = sessionmaker(bind=engine)
+
+    latencies = []
+    for burst in range(args.bursts):
+        if burst:
+            time.sleep(args.gap)
+        for _ in range(args.burst_size):
+            start = time.perf_counter()
+            if recycler:
+                recycler.check()
+            db = Session()
+            try:
+                db.execute(text("SELECT 1")).scalar()
+            finally:
+                db.close()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    engine.dispose()
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "max": latencies[-1],
+        "connects": stats.get("connects", "-"),
+        "dead": stats.get("dead", "-"),
+        "recycles": recycler.recycles if recycler else "-",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DB pool modes")
+    parser.add_argument("--url", help="Real database to use instead of the stand-in")
+    parser.add_argument("--modes", default="null,queue,idle")
+    parser.add_argument("--bursts", type=int, default=6)
+    parser.add_argument("--burst-size", type=int, default=25)
+    parser.add_argument("--gap", type=float, default=1.5, help="Idle seconds between bursts")
+    parser.add_argument("--recycle", type=float, default=1.0, help="IdleRecycler threshold (seconds)")
+    parser.add_argument("--connect-ms", type=float, default=40)
+    parser.add_argument("--server-idle", type=float, default=1.2, help="Stand-in server idle timeout (seconds)")
+    parser.add_argument("--dead-ms", type=float, default=100, help="Cost of using a dropped connection")
+    args = parser.parse_args()
+
+    args.simulate = not args.url
+    if args.url:
+        url = args.url
+        print(f"target: {url.split('@')[-1]}")
+    else:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        print(f"target: stand-in (connect {args.connect_ms:.0f} ms, server idle {args.server_idle}s, "
+              f"dead connection {args.dead_ms:.0f} ms)")
+    print(f"{args.bursts} bursts x {args.burst_size} requests, {args.gap}s idle between bursts\n")
+
+    print(f"{'mode':<8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'connects':>10}{'dead':>8}{'recycles':>10}")
+    for mode in args.modes.split(","):
+        r = run_mode(mode, args, url)
+        print(f"{mode:<8}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['max']:>10.2f}"
+              f"{r['connects']:>10}{r['dead']:>8}{r['recycles']:>10}")
+
+
+if __name__ == "__main__":
+    main()
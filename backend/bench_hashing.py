@@ -0,0 +1,69 @@
+"""
+Benchmarks password hashing on this machine to help pick PBKDF2_ROUNDS
+and HASH_THREADS.
+
+Usage:
+    python bench_hashing.py
+    python bench_hashing.py --rounds 29000 100000 200000 --target-ms 100 --threads 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.hash import pbkdf2_sha256, bcrypt
+
+
+def time_calls(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def throughput(fn, threads, n):
+    """Calls/sec with `threads` workers hashing at once (hashlib releases the GIL)."""
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda _: fn(), range(n)))
+        return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password hashing")
+    parser.add_argument("--rounds", type=int, nargs="+",
+                        default=[pbkdf2_sha256.default_rounds, 50000, 100000, 200000])
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--target-ms", type=float, default=50.0,
+                        help="Desired single-hash latency used for the recommendation")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}  threads: {args.threads}  samples: {args.samples}\n")
+    print(f"{'scheme':<22}{'hash ms':>10}{'verify ms':>12}{'hashes/s':>12}")
+
+    results = []
+    for rounds in args.rounds:
+        handler = pbkdf2_sha256.using(rounds=rounds)
+        stored = handler.hash("benchmark-password")
+
+        hash_s = time_calls(lambda: handler.hash("benchmark-password"), args.samples)
+        verify_s = time_calls(lambda: handler.verify("benchmark-password", stored), args.samples)
+        rate = throughput(lambda: handler.hash("benchmark-password"), args.threads, args.samples * args.threads)
+
+        results.append((rounds, hash_s))
+        print(f"{'pbkdf2 ' + str(rounds):<22}{hash_s * 1000:>10.1f}{verify_s * 1000:>12.1f}{rate:>12.1f}")
+
+    # Legacy hashes still verified at login
+    stored = bcrypt.hash("benchmark-password")
+    verify_s = time_calls(lambda: bcrypt.verify("benchmark-password", stored), max(3, args.samples // 4))
+    print(f"{'bcrypt (verify only)':<22}{'-':>10}{verify_s * 1000:>12.1f}{'-':>12}")
+
+    # Rounds scale linearly with time, so extrapolate from the largest sample
+    rounds, seconds = max(results)
+    suggested = int(rounds * (args.target_ms / 1000) / seconds)
+    print(f"\nSuggested PBKDF2_ROUNDS for ~{args.target_ms:.0f} ms: {suggested}")
+
+
+if __name__ == "__main__":
+    main()
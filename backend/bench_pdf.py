@@ -0,0 +1,106 @@
+"""
+Benchmarks generate_pdf: renders/sec and peak RSS for a short proposal and
+a very long one. Each case runs in a fresh process so peak RSS is per case.
+
+Usage:
+    python bench_pdf.py
+    python bench_pdf.py --renders 50 --long-words 60000
+"""
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+WORDS = (
+    "data model learning network crop yield soil analysis system students "
+    "evaluation method result survey sensor rainfall accuracy proposed study "
+    "framework university research performance algorithm design approach"
+).split()
+
+
+def make_text(words: int, rng: random.Random) -> str:
+    paragraphs = []
+    while words > 0:
+        n = min(words, rng.randint(80, 200))
+        paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + ".")
+        words -= n
+    return "\n".join(paragraphs)
+
+
+def make_submission(section_words: int, review_words: int):
+    rng = random.Random(42)
+    return SimpleNamespace(
+        id=1,
+        proposal_type="Thesis",
+        proposed_title="Machine learning approaches to crop yield prediction",
+        background=make_text(section_words, rng),
+        aim=make_text(max(section_words // 4, 10), rng),
+        objectives=make_text(section_words, rng),
+        methods=make_text(section_words, rng),
+        expected_results=make_text(section_words, rng),
+        literature_review=make_text(review_words, rng),
+        student=SimpleNamespace(name="Jane Student", reg_number="123456"),
+        supervisor=SimpleNamespace(name="Dr. Ada", reg_number=None),
+    )
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(name: str, section_words: int, review_words: int, renders: int):
+    from utils_pdf import generate_pdf
+
+    sub = make_submission(section_words, review_words)
+    baseline = peak_rss_mb()
+
+    # First render includes building the shared stylesheet
+    start = time.perf_counter()
+    with generate_pdf(sub) as f:
+        size = len(f.read())
+    first_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(renders):
+        with generate_pdf(sub) as f:
+            f.read()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<8}{size / 1024:>10.1f}{first_ms:>12.1f}"
+        f"{renders / elapsed:>12.2f}{baseline:>12.1f}{peak_rss_mb():>12.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF rendering")
+    parser.add_argument("--renders", type=int, default=20)
+    parser.add_argument("--long-words", type=int, default=30000,
+                        help="Literature review length for the long case")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    cases = {
+        "small": (60, 150),
+        "long": (2000, args.long_words),
+    }
+
+    if args.case:
+        run_case(args.case, *cases[args.case], max(1, args.renders if args.case == "small" else args.renders // 4))
+        return
+
+    print(f"{'case':<8}{'pdf KB':>10}{'first ms':>12}{'renders/s':>12}{'base MB':>12}{'peak MB':>12}")
+    for name in cases:
+        subprocess.run(
+            [sys.executable, __file__, "--case", name,
+             "--renders", str(args.renders), "--long-words", str(args.long_words)],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+import time
+import threading
+from sqlalchemy import create_engine, event, exc, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
+from utils_metrics import Counter, Gauge, Histogram
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -22,32 +25,127 @@ FIXES:
 1. pool_pre_ping=True → checks DB connection before using it
 2. pool_recycle=1800 → recycle connections every 30 mins
 3. pool_size=5 / max_overflow=10 → normal pool for production
-4. connect_args={"connect_timeout": 10} → prevents long hanging
-5. NullPool fallback → recommended on Render Free + PostgreSQL
+4. connect_timeout + TCP keepalives (PostgreSQL only) → prevents long hanging
+5. DB_POOL_MODE=idle (default on Render) → keeps connections warm while
+   there is traffic, and throws the whole pool away on the first request
+   after an idle gap longer than DB_IDLE_RECYCLE_SECONDS. That replaces
+   NullPool, which paid a fresh TCP + auth connect on EVERY request.
+   DB_POOL_MODE=null still gives the old NullPool behaviour.
 """
 
-# Use stronger connection handling
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=1800,
-    pool_size=5,
-    max_overflow=10,
-    connect_args={"connect_timeout": 10},
+DB_POOL_MODE = os.getenv("DB_POOL_MODE") or ("idle" if os.getenv("RENDER") == "true" else "queue")
+DB_IDLE_RECYCLE_SECONDS = float(os.getenv("DB_IDLE_RECYCLE_SECONDS", "300"))
+
+
+def connect_args_for(url: str) -> dict:
+    # SQLite's driver rejects connect_timeout
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "connect_timeout": 10,
+        # Notice dead peers instead of hanging on a half-open socket
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    }
+
+
+db_pool_checkouts = Counter("db_pool_checkouts_total", "Connections handed out by the pool")
+db_pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds", "Time to get a pooled connection, including opening a new one",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
 )
+db_pool_timeouts = Counter("db_pool_timeouts_total", "Checkouts that gave up waiting for a free connection")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            db_pool_timeouts.inc()
+            raise
+        finally:
+            db_pool_wait_seconds.observe(time.perf_counter() - start)
+
 
-# SECOND IMPORTANT FIX:
-# When running on Render Free Tier, the database SLEEPS.
-# If SQLAlchemy crashes due to stale pool connections,
-# recommending use of NullPool.
-if os.getenv("RENDER") == "true":
-    engine = create_engine(
-        DATABASE_URL,
-        poolclass=NullPool,       # ensures fresh connection ALWAYS
+def make_engine(url: str, mode: str = DB_POOL_MODE):
+    if mode == "null":
+        return create_engine(
+            url,
+            poolclass=NullPool,       # fresh connection ALWAYS
+            pool_pre_ping=True,
+            connect_args=connect_args_for(url),
+        )
+
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
         pool_pre_ping=True,
-        connect_args={"connect_timeout": 10}
+        pool_recycle=1800,
+        pool_size=5,
+        max_overflow=10,
+        # LIFO: a few connections stay hot, extras are the ones left to go idle
+        pool_use_lifo=True,
+        connect_args=connect_args_for(url),
     )
 
+
+class IdleRecycler:
+    """
+    Tracks when requests last used the pool. After a longer gap the pooled
+    connections are probably dead (server idle timeout, instance slept), so
+    the first request disposes the pool and opens fresh connections instead
+    of pinging, failing and reconnecting them one at a time.
+
+    Only request sessions (get_db) count as activity. Background threads
+    such as the email outbox check out a connection every few seconds and
+    would otherwise keep the pool looking busy forever; LIFO hands them the
+    same hot connection while the rest of the pool goes stale.
+
+    Wall-clock time on purpose: a suspended instance does not advance the
+    monotonic clock.
+    """
+
+    def __init__(self, engine, idle_seconds: float):
+        self.engine = engine
+        self.idle_seconds = idle_seconds
+        self.last_used = time.time()
+        self.recycles = 0
+        self._lock = threading.Lock()
+
+    def touch(self):
+        self.last_used = time.time()
+
+    def check(self):
+        if time.time() - self.last_used <= self.idle_seconds:
+            return
+        with self._lock:
+            idle = time.time() - self.last_used
+            if idle <= self.idle_seconds:
+                return   # another request already recycled
+            # Checked-out connections are unaffected; pooled ones are closed
+            self.engine.dispose()
+            self.last_used = time.time()
+            self.recycles += 1
+        print(f"♻️ DB pool recycled after {idle:.0f}s idle")
+
+
+engine = make_engine(DATABASE_URL)
+idle_recycler = IdleRecycler(engine, DB_IDLE_RECYCLE_SECONDS) if DB_POOL_MODE == "idle" else None
+
+event.listen(engine, "checkout", lambda *args: db_pool_checkouts.inc())
+
+# engine.pool is replaced when IdleRecycler disposes it, so read it at scrape time
+Gauge("db_pool_checked_out", "Connections currently in use",
+      fn=lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0)
+Gauge("db_pool_idle", "Connections idle in the pool",
+      fn=lambda: engine.pool.checkedin() if hasattr(engine.pool, "checkedin") else 0)
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -62,8 +160,38 @@ def get_db():
     Ensures CLEAN session for every request.
     Prevents zombie connections when Render sleeps.
     """
+    if idle_recycler:
+        idle_recycler.check()
+        idle_recycler.touch()
+
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        if idle_recycler:
+            idle_recycler.touch()
+
+
+def upgrade_schema(metadata):
+    """
+    Creates missing tables, then adds columns that were added to the models
+    after their table already existed (create_all never alters tables).
+    New columns are added as nullable, with their indexes.
+    """
+    metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            added = [c for c in table.columns if c.name not in existing]
+
+            for column in added:
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                print(f"🛠 Added column {table.name}.{column.name}")
+
+            for index in table.indexes:
+                if any(c.name in index.columns for c in added):
+                    index.create(conn, checkfirst=True)
@@ -0,0 +1,299 @@
+"""
+Synthetic data for performance testing: thousands of users, supervisor
+assignments and up to hundreds of thousands of proposals with realistic
+section lengths, topics, dates and decisions.
+
+Rows go in through executemany inserts in batches. All generated accounts
+share one password (--password), hashed once. The change log, counters
+and full-text index are filled in too, so a running app picks the data up
+like normal writes.
+
+Usage:
+    python datagen.py --reset                                 # 2,500 students, 6,000 proposals
+    python datagen.py --reset --students 40000 --proposals 100000
+    DATABASE_URL=postgresql://user:pw@localhost/perf python datagen.py --reset
+
+Without --reset, rows are added next to the existing data. Accounts are
+<role><id>@datagen.example.com.
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text
+from database import Base, engine
+from models import User, Submission, SubmissionChange, Settings, student_supervisors
+from utils_changes import bump, USERS_SCOPE, SUBMISSIONS_SCOPE
+
+# Share of proposals per type. A student has at most one of each type.
+TYPE_WEIGHTS = {"Seminar": 0.4, "Project": 0.35, "Dissertation": 0.15, "Thesis": 0.1}
+
+# Median words per section; actual lengths are log-normal around these
+SECTION_WORDS = {
+    "background": 180,
+    "aim": 35,
+    "objectives": 90,
+    "methods": 220,
+    "expected_results": 80,
+    "literature_review": 450,
+}
+
+DECISIONS = {"pending": 0.4, "approved": 0.4, "rejected": 0.2}
+
+APPROACHES = [
+    "Machine learning for", "A deep learning approach to", "Evaluating", "Design of a system for",
+    "Improving", "A comparative study of", "Predicting", "An IoT framework for", "Optimising",
+    "Assessing the impact of", "Automated", "A mobile application for",
+]
+CONTEXTS = [
+    "in smallholder farms", "in Nigerian universities", "using mobile phones", "in rural clinics",
+    "with limited data", "in secondary schools", "in developing regions", "for small businesses", "",
+]
+TOPICS = {
+    "agriculture": ["crop yield prediction", "soil moisture monitoring", "maize disease detection",
+                    "irrigation scheduling", "pest outbreak forecasting"],
+    "health": ["malaria diagnosis", "patient record management", "maternal health monitoring",
+               "drug inventory tracking", "disease outbreak surveillance"],
+    "education": ["student performance prediction", "plagiarism detection", "e-learning adoption",
+                  "course timetabling", "exam result processing"],
+    "finance": ["credit risk scoring", "fraud detection", "mobile money adoption",
+                "stock price forecasting", "microfinance loan repayment"],
+    "security": ["intrusion detection", "phishing email classification", "biometric attendance",
+                 "password strength analysis", "network traffic anomaly detection"],
+    "energy": ["solar power forecasting", "electricity load prediction", "smart metering",
+               "generator fuel monitoring", "power outage reporting"],
+    "transport": ["traffic congestion prediction", "vehicle tracking", "road accident analysis",
+                  "ride sharing demand", "parking space detection"],
+    "language": ["sentiment analysis of tweets", "Yoruba speech recognition", "fake news detection",
+                 "machine translation of Hausa", "chatbot customer support"],
+}
+COMMON_WORDS = (
+    "the study will data system model method result analysis proposed approach using based "
+    "performance evaluation accuracy users design framework existing research problem solution "
+    "collected survey sample dataset training testing improve current results show significant "
+    "implementation environment application developed techniques approach compared previous"
+).split()
+
+SENTENCES_PER_TOPIC = 300
+
+
+def _weighted(rng: random.Random, weights: dict) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def build_sentence_pools(rng: random.Random) -> dict:
+    """Sentences per topic; sections are drawn from these, which is far faster than word by word."""
+    pools = {}
+    for topic, subjects in TOPICS.items():
+        vocab = [w for s in subjects for w in s.lower().split()]
+        pool = []
+        for _ in range(SENTENCES_PER_TOPIC):
+            n = rng.randint(8, 22)
+            words = [rng.choice(vocab) if rng.random() < 0.35 else rng.choice(COMMON_WORDS) for _ in range(n)]
+            pool.append(" ".join(words).capitalize() + ".")
+        pools[topic] = pool
+    return pools
+
+
+def make_section(rng: random.Random, pool: list, median_words: int) -> str:
+    words = rng.lognormvariate(math.log(median_words), 0.5)
+    return " ".join(rng.choices(pool, k=max(1, round(words / 15))))
+
+
+def make_title(rng: random.Random, topic: str) -> str:
+    return " ".join(p for p in (rng.choice(APPROACHES), rng.choice(TOPICS[topic]), rng.choice(CONTEXTS)) if p)
+
+
+def make_created_at(rng: random.Random, now: datetime, days: int) -> datetime:
+    # A third of submissions land in the last two days before the deadline
+    if rng.random() < 0.33:
+        return now - timedelta(hours=rng.uniform(0, 48))
+    return now - timedelta(days=rng.uniform(0, days))
+
+
+# ============================================================
+#   LOADING
+# ============================================================
+def reset_database():
+    """Drops every table, then recreates the schema through migrate.py."""
+    import migrate
+
+    Base.metadata.drop_all(bind=engine)
+    if engine.dialect.name == "sqlite":
+        # Not in the metadata; would keep indexing rows that no longer exist
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS submissions_fts"))
+    migrate.run_migrations(force=True)
+
+
+def _insert_batches(conn, table, rows, batch: int):
+    for i in range(0, len(rows), batch):
+        conn.execute(table.insert(), rows[i:i + batch])
+
+
+def _next_id(conn, column) -> int:
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def _sync_sequences(conn):
+    """Explicit ids leave Postgres sequences behind."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in ("users", "submissions", "submission_changes"):
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+        ))
+
+
+def generate(args) -> dict:
+    from utils_password import hash_password
+
+    rng = random.Random(args.seed)
+    pools = build_sentence_pools(rng)
+    password_hash = hash_password(args.password)
+    now = datetime.utcnow()
+    timings = {}
+
+    with engine.begin() as conn:
+        if not conn.execute(select(Settings.id)).first():
+            conn.execute(Settings.__table__.insert(), [{}])
+
+        # ---------------- users ----------------
+        t0 = time.perf_counter()
+        first_id = _next_id(conn, User.id)
+        taken_regs = {r for (r,) in conn.execute(select(User.reg_number).where(User.reg_number.isnot(None)))}
+        reg_numbers = (f"{n:06d}" for n in range(100000, 1000000) if f"{n:06d}" not in taken_regs)
+
+        users, ids = [], {"admin": [], "lecturer": [], "student": []}
+        for role, count in (("admin", args.admins), ("lecturer", args.lecturers), ("student", args.students)):
+            for _ in range(count):
+                uid = first_id + len(users)
+                users.append({
+                    "id": uid,
+                    "name": f"{role.title()} {uid}",
+                    "email": f"{role}{uid}@datagen.example.com",
+                    "password_hash": password_hash,
+                    "role": role,
+                    "reg_number": next(reg_numbers) if role == "student" else None,
+                    "is_approved": True,
+                    "updated_at": now,
+                })
+                ids[role].append(uid)
+        _insert_batches(conn, User.__table__, users, args.batch)
+
+        lecturers, students = ids["lecturer"], ids["student"]
+        supervisor_of = {}
+        links = []
+        for sid in students:
+            chosen = rng.sample(lecturers, min(args.supervisors_per_student, len(lecturers)))
+            supervisor_of[sid] = chosen[0]
+            links += [{"student_id": sid, "lecturer_id": lid} for lid in chosen]
+        _insert_batches(conn, student_supervisors, links, args.batch)
+        timings["users"] = time.perf_counter() - t0
+
+        # ---------------- submissions ----------------
+        t0 = time.perf_counter()
+        first_sub = _next_id(conn, Submission.id)
+        first_change = _next_id(conn, SubmissionChange.id)
+        type_order = {}
+        rows, changes = [], []
+
+        for i in range(args.proposals):
+            sid = students[i % len(students)]
+            if sid not in type_order:
+                # Weighted shuffle: each student's next proposal is of a type they do not have yet
+                type_order[sid] = sorted(TYPE_WEIGHTS, key=lambda t: rng.random() ** (1 / TYPE_WEIGHTS[t]), reverse=True)
+            ptype = type_order[sid][i // len(students)]
+
+            topic = rng.choice(list(TOPICS))
+            created = make_created_at(rng, now, args.days)
+            decision = _weighted(rng, DECISIONS)
+            # Recent submissions are mostly still waiting
+            if now - created < timedelta(days=2) and rng.random() < 0.8:
+                decision = "pending"
+            decided_at = None if decision == "pending" else min(now, created + timedelta(days=rng.expovariate(1 / 3)))
+
+            sub_id = first_sub + i
+            rows.append({
+                "id": sub_id,
+                "student_id": sid,
+                "supervisor_id": supervisor_of[sid],
+                "proposal_type": ptype,
+                "proposed_title": make_title(rng, topic),
+                **{field: make_section(rng, pools[topic], words) for field, words in SECTION_WORDS.items()},
+                "similarity_score": round(rng.betavariate(2, 8) * 100, 2),
+                "lecturer_decision": decision,
+                "admin_decision": "pending",
+                "final_decision": decision,
+                "ca_score": rng.randint(10, 30) if ptype == "Seminar" and decision == "approved" else None,
+                "created_at": created,
+                "lecturer_decision_at": decided_at,
+                "updated_at": decided_at or created,
+            })
+            changes.append({
+                "id": first_change + i,
+                "submission_id": sub_id,
+                "student_id": sid,
+                "supervisor_id": supervisor_of[sid],
+                "op": "upsert",
+                "changed_at": now,
+            })
+
+            if len(rows) >= args.batch:
+                conn.execute(Submission.__table__.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(Submission.__table__.insert(), rows)
+        _insert_batches(conn, SubmissionChange.__table__, changes, args.batch)
+        timings["submissions"] = time.perf_counter() - t0
+
+        _sync_sequences(conn)
+        # Cached lists and ETags from before the load are stale now
+        bump(conn, {USERS_SCOPE, SUBMISSIONS_SCOPE})
+
+    return {
+        "users": len(users),
+        "links": len(links),
+        "submissions": args.proposals,
+        "admin_email": users[0]["email"] if ids["admin"] else None,
+        "timings": timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic users and proposals")
+    parser.add_argument("--students", type=int, default=2500)
+    parser.add_argument("--lecturers", type=int, default=100)
+    parser.add_argument("--admins", type=int, default=3)
+    parser.add_argument("--proposals", type=int, default=6000)
+    parser.add_argument("--supervisors-per-student", type=int, default=1)
+    parser.add_argument("--days", type=int, default=120, help="Spread of submission dates")
+    parser.add_argument("--password", default="password", help="Password for every generated account")
+    parser.add_argument("--batch", type=int, default=5000, help="Rows per insert statement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Drop all tables first")
+    args = parser.parse_args()
+
+    if args.students < 1 or args.lecturers < 1:
+        parser.error("need at least one student and one lecturer")
+    if args.proposals > args.students * len(TYPE_WEIGHTS):
+        parser.error(f"--proposals above {len(TYPE_WEIGHTS)} per student; raise --students")
+
+    started = time.perf_counter()
+    if args.reset:
+        reset_database()
+    else:
+        import migrate
+        migrate.run_migrations()
+
+    result = generate(args)
+    print(f"✅ {result['users']} users, {result['links']} supervisor links, "
+          f"{result['submissions']} proposals in {time.perf_counter() - started:.1f}s "
+          f"(users {result['timings']['users']:.1f}s, proposals {result['timings']['submissions']:.1f}s)")
+    if result["admin_email"]:
+        print(f"   Log in as {result['admin_email']} / {args.password}")
+
+
+if __name__ == "__main__":
+    main()
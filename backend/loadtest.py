@@ -0,0 +1,395 @@
+"""
+Deadline-night load test: starts the app under uvicorn against a scratch
+database, replays a role mix over real HTTP and reports throughput and
+p50/p95/p99 latency per route.
+
+    students   submit once, then keep editing (/update_submission), check
+               their list and the live title preview
+    lecturers  poll /submissions (with ETag), decide, record CA scores
+    admins     dashboard stats, full list, export, PDF downloads
+
+Emails stay in memory (EMAIL_TRANSPORT=local), so Mailjet is never called.
+Without --db the app runs on a fresh SQLite file; pass a Postgres URL to
+test against a local stand-in of production. The database is wiped and
+seeded each run, so never point --db at real data.
+
+Usage:
+    python loadtest.py
+    python loadtest.py --users 40 --duration 60 --mix student=75,lecturer=20,admin=5
+    python loadtest.py --db postgresql://user:pw@localhost/loadtest --workers 2
+    python loadtest.py --json before.json     # save results to compare runs
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+WORDS = (
+    "data model learning network crop yield soil analysis system students "
+    "evaluation method result survey sensor rainfall accuracy proposed study "
+    "framework university research performance algorithm design approach "
+    "irrigation maize drought remote sensing clinic health records mobile"
+).split()
+
+PROPOSAL_TYPES = ["Seminar", "Project", "Thesis"]
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_proposal(rng: random.Random, section_words: int) -> dict:
+    return {
+        "proposed_title": make_text(rng, rng.randint(6, 12)).rstrip("."),
+        "background": make_text(rng, section_words),
+        "aim": make_text(rng, section_words // 4 or 1),
+        "objectives": make_text(rng, section_words // 2 or 1),
+        "methods": make_text(rng, section_words),
+        "expected_results": make_text(rng, section_words // 2 or 1),
+        "literature_review": make_text(rng, section_words * 2),
+    }
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = math.ceil(p / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, k)]
+
+
+# ============================================================
+#   SETUP
+# ============================================================
+def seed(args, rng: random.Random) -> dict:
+    """Fresh schema plus users; returns {role: [(id, token), ...]}."""
+    from database import SessionLocal
+    from models import User, Settings, Submission, ProposalTypeEnum
+    from datagen import reset_database
+    from auth_jwt import create_access_token
+    from passlib.hash import pbkdf2_sha256
+
+    reset_database()
+
+    counts = parse_mix(args.mix, args.users)
+    # Hash once: seeding would otherwise spend seconds in PBKDF2
+    password_hash = pbkdf2_sha256.hash("loadtest")
+
+    db = SessionLocal()
+    try:
+        db.add(Settings())
+        admins = [User(name=f"Admin {i}", email=f"admin{i}@loadtest.example.com", password_hash=password_hash,
+                       role="admin", is_approved=True) for i in range(max(1, counts["admin"]))]
+        lecturers = [User(name=f"Lecturer {i}", email=f"lecturer{i}@loadtest.example.com", password_hash=password_hash,
+                          role="lecturer", is_approved=True) for i in range(max(1, counts["lecturer"]))]
+        # Students from earlier sessions only provide the similarity corpus
+        students = [User(name=f"Student {i}", email=f"student{i}@loadtest.example.com", password_hash=password_hash,
+                         role="student", reg_number=f"{100000 + i}", is_approved=True)
+                    for i in range(counts["student"] + args.corpus)]
+        db.add_all(admins + lecturers + students)
+        db.flush()
+
+        for i, student in enumerate(students):
+            student.supervisors.append(lecturers[i % len(lecturers)])
+
+        for i, student in enumerate(students):
+            if i < counts["student"]:
+                continue
+            db.add(Submission(
+                student_id=student.id,
+                supervisor_id=lecturers[i % len(lecturers)].id,
+                proposal_type=ProposalTypeEnum(rng.choice(PROPOSAL_TYPES)),
+                similarity_score=0,
+                **make_proposal(rng, args.section_words),
+            ))
+        db.commit()
+
+        def tokens(users, role):
+            return [(u.id, create_access_token({"id": u.id, "role": role, "name": u.name})) for u in users]
+
+        return {
+            "admin": tokens(admins[:counts["admin"]], "admin"),
+            "lecturer": tokens(lecturers[:counts["lecturer"]], "lecturer"),
+            "student": tokens(students[:counts["student"]], "student"),
+        }
+    finally:
+        db.close()
+
+
+def parse_mix(mix: str, users: int) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        role, _, weight = part.partition("=")
+        if role not in ("student", "lecturer", "admin"):
+            sys.exit(f"unknown role in --mix: {role}")
+        weights[role] = float(weight)
+    total = sum(weights.values())
+    counts = {role: int(users * weights.get(role, 0) / total) for role in ("student", "lecturer", "admin")}
+    counts["student"] += users - sum(counts.values())
+    return counts
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, log_path: str):
+    log = open(log_path, "w")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=log, stderr=subprocess.STDOUT,
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"uvicorn exited during startup, see {log_path}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=2) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    sys.exit(f"server not ready after 60s, see {log_path}")
+
+
+# ============================================================
+#   CLIENTS
+# ============================================================
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route: str, status: int, seconds: float):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][status] += 1
+
+
+class Client:
+    """One keep-alive connection per virtual user, like a browser tab."""
+
+    def __init__(self, port: int, token: str, results: Results):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        self.headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        self.results = results
+        self.etags = {}     # path -> (etag, parsed body), for 304 responses
+
+    def request(self, method: str, path: str, route: str, body=None, etag: bool = False):
+        headers = dict(self.headers)
+        if etag and path in self.etags:
+            headers["If-None-Match"] = self.etags[path][0]
+
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            resp = self.conn.getresponse()
+            payload = resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            status, payload = 0, b""
+        self.results.record(f"{method} {route}", status, time.perf_counter() - start)
+
+        if status == 304:
+            return status, self.etags[path][1]
+        if status == 200 and payload:
+            try:
+                body = json.loads(payload)
+            except ValueError:
+                return status, None
+            if etag and resp.getheader("ETag"):
+                self.etags[path] = (resp.getheader("ETag"), body)
+            return status, body
+        return status, None
+
+
+def student(client: Client, user_id: int, rng: random.Random, args, stop: threading.Event):
+    ptype = rng.choice(PROPOSAL_TYPES)
+    draft = make_proposal(rng, args.section_words)
+    sub_id = None
+
+    while not stop.wait(rng.expovariate(1 / args.think)):
+        roll = rng.random()
+        if sub_id is None:
+            client.request("GET", f"/similarity/preview?title={urllib.request.quote(draft['proposed_title'])}"
+                                  f"&type={ptype}", "/similarity/preview")
+            status, body = client.request("POST", "/submit", "/submit",
+                                          {"student_id": user_id, "proposal_type": ptype, **draft})
+            if body:
+                sub_id = body["id"]
+        elif roll < 0.6:
+            # Last-minute edits to one or two sections
+            changes = {k: make_text(rng, args.section_words) for k in rng.sample(["background", "methods", "aim"], 2)}
+            status, _ = client.request("PUT", f"/update_submission/{sub_id}", "/update_submission/{id}", changes)
+            if status == 400:
+                # Approved (locked) or rejected: start a fresh proposal
+                sub_id, draft = None, make_proposal(rng, args.section_words)
+                ptype = rng.choice(PROPOSAL_TYPES)
+        else:
+            client.request("GET", f"/student_submissions/{user_id}", "/student_submissions/{id}")
+
+
+def lecturer(client: Client, user_id: int, rng: random.Random, args, stop: threading.Event):
+    while not stop.wait(rng.expovariate(1 / args.think)):
+        _, subs = client.request("GET", "/submissions", "/submissions", etag=True)
+        pending = [s for s in subs or [] if s.get("lecturer_decision") in (None, "pending")]
+        if not pending or rng.random() < 0.5:
+            continue
+
+        sub = rng.choice(pending)
+        if sub["proposal_type"] == "Seminar" and sub.get("ca_score") is None:
+            client.request("PUT", f"/lecturer/add_ca/{sub['id']}?score={rng.randint(10, 30)}",
+                           "/lecturer/add_ca/{id}")
+        elif rng.random() < 0.3:
+            decision = "approved" if rng.random() < 0.7 else "rejected"
+            client.request("POST", f"/lecturer/decision/{sub['id']}?decision={decision}",
+                           "/lecturer/decision/{id}")
+
+
+def admin(client: Client, user_id: int, rng: random.Random, args, stop: threading.Event):
+    known_ids = []
+    while not stop.wait(rng.expovariate(1 / args.think)):
+        roll = rng.random()
+        if roll < 0.4:
+            client.request("GET", "/admin/stats", "/admin/stats")
+        elif roll < 0.7 or not known_ids:
+            _, subs = client.request("GET", "/submissions", "/submissions", etag=True)
+            if subs:
+                known_ids = [s["id"] for s in subs]
+        elif roll < 0.95:
+            client.request("GET", f"/submission/{rng.choice(known_ids)}/pdf", "/submission/{id}/pdf")
+        else:
+            client.request("GET", "/admin/export/submissions", "/admin/export/submissions")
+
+
+ROLES = {"student": student, "lecturer": lecturer, "admin": admin}
+
+
+def run_load(port: int, users: dict, args) -> Results:
+    results = Results()
+    stop = threading.Event()
+    threads = []
+
+    for role, accounts in users.items():
+        for user_id, token in accounts:
+            rng = random.Random(args.seed * 100003 + user_id)
+            client = Client(port, token, results)
+            threads.append(threading.Thread(
+                target=ROLES[role], args=(client, user_id, rng, args, stop),
+                name=f"{role}-{user_id}", daemon=True
+            ))
+
+    # Users arrive over the ramp-up, not all in the same millisecond
+    for t in threads:
+        t.start()
+        time.sleep(args.ramp / max(1, len(threads)))
+
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=60)
+    return results
+
+
+# ============================================================
+#   REPORT
+# ============================================================
+def summarize(results: Results, elapsed: float) -> dict:
+    routes = {}
+    for route, values in results.latencies.items():
+        values = sorted(values)
+        statuses = results.statuses[route]
+        routes[route] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1),
+            # 4xx are mostly business rules (locked proposal, not your student)
+            "client_errors": sum(n for s, n in statuses.items() if 400 <= s < 500),
+            "server_errors": sum(n for s, n in statuses.items() if s >= 500 or s == 0),
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {"elapsed_s": round(elapsed, 1), "requests": total, "rps": round(total / elapsed, 2), "routes": routes}
+
+
+def print_report(summary: dict):
+    print(f"\n{'route':<38}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'4xx':>6}{'5xx':>6}")
+    for route, r in sorted(summary["routes"].items(), key=lambda x: -x[1]["requests"]):
+        print(f"{route:<38}{r['requests']:>7}{r['rps']:>8.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}{r['client_errors']:>6}{r['server_errors']:>6}")
+    print(f"\ntotal: {summary['requests']} requests in {summary['elapsed_s']}s = {summary['rps']} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deadline-night load test")
+    parser.add_argument("--db", help="Database URL for the app (default: scratch SQLite file)")
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--mix", default="student=75,lecturer=20,admin=5", help="Share of users per role")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of steady load after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds to start all users")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean seconds between a user's actions")
+    parser.add_argument("--corpus", type=int, default=200, help="Existing submissions for similarity checks")
+    parser.add_argument("--section-words", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the summary to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    # The app reads these at import, in this process (seeding) and in uvicorn
+    os.environ["DATABASE_URL"] = args.db or f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    os.environ["SECRET_KEY"] = secrets.token_hex(32)
+    os.environ["EMAIL_TRANSPORT"] = "local"
+    os.environ["MIGRATE_ON_STARTUP"] = "0"
+    os.environ["PROFILING_ENABLED"] = "0"
+
+    rng = random.Random(args.seed)
+    users = seed(args, rng)
+    print(f"seeded {sum(len(v) for v in users.values())} active users "
+          f"({', '.join(f'{len(v)} {k}' for k, v in users.items())}) and {args.corpus} earlier submissions")
+
+    log_path = os.path.join(workdir, "server.log")
+    port = _free_port()
+    server = start_server(port, args.workers, log_path)
+    print(f"server up on :{port} ({args.workers} worker(s)), log: {log_path}")
+
+    try:
+        start = time.perf_counter()
+        results = run_load(port, users, args)
+        summary = summarize(results, time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print_report(summary)
+    if args.json:
+        summary["args"] = vars(args)
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
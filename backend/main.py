@@ -1,14 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
+from migrate import MIGRATE_ON_STARTUP, run_migrations
 from routes_auth import router as auth_router
 from routes_submissions import router as submissions_router
 from routes_approval import router as approval_router
+from routes_export import router as export_router
+from routes_events import router as events_router
+from routes_search import router as search_router
+from routes_health import router as health_router
+from routes_metrics import router as metrics_router
+from routes_profiling import router as profiling_router
+from routes_archive import router as archive_router
+from utils_email import email_dispatcher
+from utils_events import broker
+from utils_metrics import MetricsMiddleware
+from utils_profiling import ProfilingMiddleware
+from utils_warmup import warmup, ActivityMiddleware
 
 
 #from seed import seed
 
-app = FastAPI(title='ML Research App')
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup runs here (or via `python migrate.py`), not at import.
+    # When nothing changed it is a single lookup in schema_migrations.
+    if MIGRATE_ON_STARTUP:
+        run_migrations()
+
+    # Pool, caches, similarity index, PDF styles - /health/ready waits for it
+    warmup.start()
+
+    # Background delivery of queued emails
+    email_dispatcher.start()
+    # Fan-out of submission events to this worker's SSE clients
+    broker.start()
+    yield
+    broker.stop()
+    email_dispatcher.stop()
+
+
+app = FastAPI(title='ML Research App', lifespan=lifespan)
 
 origins = [
     "https://university-research-submission-system-1.onrender.com",
@@ -22,10 +54,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Change-Cursor", "X-Profile-Id"],
 )
 
-# ✅ Create database tables
-Base.metadata.create_all(bind=engine)
+# Re-runs the warm-up on the first request after an idle gap
+app.add_middleware(ActivityMiddleware)
+# Latency per route template, scraped from /metrics
+app.add_middleware(MetricsMiddleware)
+# X-Profile: 1 on an admin request stores a profile of that request
+app.add_middleware(ProfilingMiddleware)
 
 # ✅ Seed initial data
 #try:
@@ -37,6 +74,14 @@ Base.metadata.create_all(bind=engine)
 app.include_router(auth_router)
 app.include_router(submissions_router)
 app.include_router(approval_router)
+app.include_router(export_router)
+app.include_router(events_router)
+app.include_router(search_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(profiling_router)
+app.include_router(archive_router)
+
 
 # ✅ Root endpoint
 @app.get('/')
@@ -0,0 +1,125 @@
+"""
+Schema setup, run once per deploy instead of on every worker boot.
+
+    python migrate.py            # create / upgrade tables and search index
+    python migrate.py --check    # exit 1 if the schema is out of date
+
+The app also calls run_migrations() at startup unless MIGRATE_ON_STARTUP=false.
+That costs one indexed lookup when nothing has changed: the models are
+fingerprinted and the fingerprint of the last applied schema is stored in
+schema_migrations.
+"""
+import os
+import sys
+import json
+import hashlib
+from datetime import datetime
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, insert, text
+from sqlalchemy.schema import CreateTable
+
+from database import Base, engine, upgrade_schema
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from utils_search import ensure_search_index, SEARCH_FIELDS
+
+MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "true").lower() == "true"
+
+# Bump when ensure_search_index (or other raw DDL) changes
+DDL_VERSION = 2
+
+_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("fingerprint", String, primary_key=True),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+
+def schema_fingerprint() -> str:
+    tables = {
+        table.name: sorted((c.name, str(c.type)) for c in table.columns)
+        for table in Base.metadata.sorted_tables
+    }
+    content = [DDL_VERSION, engine.dialect.name, tables, SEARCH_FIELDS]
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def is_current(fingerprint: str) -> bool:
+    if not inspect(engine).has_table("schema_migrations"):
+        return False
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(_migrations.c.fingerprint).where(_migrations.c.fingerprint == fingerprint)
+        ).first()
+    return row is not None
+
+
+def ensure_submission_ids_not_reused():
+    """
+    SQLite only. Archiving moves rows out of submissions with their id, and
+    a table without AUTOINCREMENT hands the highest free id out again. Tables
+    created before sqlite_autoincrement was set are rebuilt with it (create
+    new, copy, drop, rename), and the id sequence starts above every
+    archived id.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    table = models.Submission.__table__
+    with engine.begin() as conn:
+        ddl = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": table.name},
+        ).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return
+
+        # A scratch MetaData holding the referenced tables, so foreign keys resolve
+        scratch = MetaData()
+        for fk in table.foreign_keys:
+            if fk.column.table.name not in scratch.tables:
+                fk.column.table.to_metadata(scratch)
+        rebuilt = table.to_metadata(scratch, name=f"{table.name}_rebuild")
+        columns = ", ".join(c.name for c in table.columns)
+        conn.execute(CreateTable(rebuilt))
+        conn.execute(text(f"INSERT INTO {rebuilt.name} ({columns}) SELECT {columns} FROM {table.name}"))
+        conn.execute(text(f"DROP TABLE {table.name}"))   # also drops its indexes and search triggers
+        conn.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {table.name}"))
+        for index in table.indexes:
+            index.create(conn)
+
+        floor = conn.execute(text(
+            f"SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM {table.name} "
+            f"UNION ALL SELECT MAX(id) FROM {models.ArchivedSubmission.__tablename__})"
+        )).scalar() or 0
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table.name})
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                     {"name": table.name, "seq": floor})
+    print(f"🛠 Rebuilt {table.name} with AUTOINCREMENT (ids start after {floor})")
+
+
+def run_migrations(force: bool = False) -> bool:
+    """Brings the schema up to date. Returns True if anything was run."""
+    fingerprint = schema_fingerprint()
+    if not force and is_current(fingerprint):
+        return False
+
+    upgrade_schema(Base.metadata)
+    ensure_submission_ids_not_reused()
+    ensure_search_index()
+
+    _migrations.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(_migrations.delete().where(_migrations.c.fingerprint == fingerprint))
+        conn.execute(insert(_migrations).values(fingerprint=fingerprint, applied_at=datetime.utcnow()))
+
+    print(f"🛠 Schema up to date ({fingerprint[:12]})")
+    return True
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        current = is_current(schema_fingerprint())
+        print("Schema is current" if current else "Schema needs migrating")
+        sys.exit(0 if current else 1)
+
+    run_migrations(force="--force" in sys.argv)
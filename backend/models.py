@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Table, Text, Boolean, event
+from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Table, Text, Boolean, LargeBinary, event
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -45,6 +45,11 @@ class User(Base):
     role = Column(Enum(RoleEnum), nullable=False)
     reg_number = Column(String(6), unique=True, index=True, nullable=True)
     is_approved = Column(Boolean, default=False)
+    # Bumped on password change/reset; older refresh tokens stop working
+    token_version = Column(Integer, default=0)
+    # Set for imported / admin-reset accounts; cleared by change_password
+    must_change_password = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     supervisors = relationship(
         'User',
@@ -56,8 +61,39 @@ class User(Base):
 
     submissions = relationship("Submission", back_populates="student", foreign_keys='Submission.student_id')
 
+# Version numbers bumped on every write that affects a list endpoint.
+# scope examples: "users", "submissions", "submissions:supervisor:7", "submissions:student:12"
+class ChangeCounter(Base):
+    __tablename__ = "change_counters"
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Append-only log of submission writes. id is the sync cursor handed to clients.
+# op: "upsert" (created / updated) or "delete" (removed, or moved away from
+# the supervisor/student recorded on this row).
+class SubmissionChange(Base):
+    __tablename__ = "submission_changes"
+    id = Column(Integer, primary_key=True, index=True)
+    submission_id = Column(Integer, index=True, nullable=False)
+    student_id = Column(Integer, index=True)
+    supervisor_id = Column(Integer, index=True)
+    op = Column(String, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+# Refresh tokens that were rotated or logged out.
+# Rows can be purged once expires_at has passed.
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow)
+
 class Submission(Base):
     __tablename__ = "submissions"
+    # Archived rows keep their id; SQLite would otherwise hand it out again
+    # (tables created without it are rebuilt by migrate.ensure_submission_ids_not_reused)
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"))
     supervisor_id = Column(Integer, ForeignKey("users.id"))
@@ -70,17 +106,132 @@ class Submission(Base):
     expected_results = Column(Text)
     literature_review = Column(Text)
     similarity_score = Column(Float, default=0.0)
+    # Best archived match alone; similarity_score is max(live, archive_score)
+    archive_score = Column(Float, nullable=True)
+    # Closest document of the external reference corpus (utils_references)
+    reference_score = Column(Float, default=0.0)
+    reference_match_id = Column(Integer, nullable=True)
     lecturer_decision = Column(String, default="pending")
     admin_decision = Column(String, default="pending")
     final_decision = Column(String, default="pending")
     ca_score = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     lecturer_decision_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     student = relationship("User", foreign_keys=[student_id], back_populates="submissions")
     supervisor = relationship("User", foreign_keys=[supervisor_id])
 
 
+# Top-k most similar submissions of the same type, per submission (score in %).
+# Kept current in both directions on submit/update, so an earlier proposal's
+# similarity_score rises when a later one copies it.
+class SimilarityNeighbor(Base):
+    __tablename__ = "similarity_neighbors"
+    submission_id = Column(Integer, ForeignKey("submissions.id"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("submissions.id"), primary_key=True, index=True)
+    score = Column(Float, nullable=False)
+
+
+# Final submissions from past academic sessions, moved out of `submissions`
+# by utils_archive. id is the original submission id. The text sections are
+# zlib-compressed JSON; only the list columns stay plain.
+class ArchivedSubmission(Base):
+    __tablename__ = "archived_submissions"
+    id = Column(Integer, primary_key=True, index=True)
+    session = Column(String, index=True)              # e.g. "2024/2025"
+    student_id = Column(Integer, index=True)
+    supervisor_id = Column(Integer, index=True)
+    proposal_type = Column(String)
+    proposed_title = Column(String, nullable=False)
+    text_z = Column(LargeBinary)
+    similarity_score = Column(Float)
+    lecturer_decision = Column(String)
+    final_decision = Column(String)
+    ca_score = Column(Integer, nullable=True)
+    created_at = Column(DateTime)
+    lecturer_decision_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+# One run of POST /admin/archive; the archiving itself happens in a thread.
+class ArchiveJob(Base):
+    __tablename__ = "archive_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="running", index=True)   # running / done / failed
+    before = Column(DateTime)
+    requested_by = Column(Integer)
+    done = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    by_type = Column(Text)                                   # JSON {proposal_type: count}
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+# Read-only similarity index over archived proposals, per proposal type and
+# similarity mode ("title" / "title_plus"). payload is an .npz of hashed
+# term counts and archived ids; see utils_archive.
+class ArchiveSegment(Base):
+    __tablename__ = "archive_segments"
+    id = Column(Integer, primary_key=True, index=True)
+    proposal_type = Column(String, index=True)
+    mode = Column(String)
+    doc_count = Column(Integer)
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Past theses from outside the system, ingested by utils_references.py.
+# Only metadata is kept; the text lives on as vectors in reference_segments.
+class ReferenceDocument(Base):
+    __tablename__ = "reference_documents"
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, nullable=False)
+    title = Column(String)
+    sha1 = Column(String, unique=True, index=True, nullable=False)
+    chars = Column(Integer)
+    ingested_at = Column(DateTime, default=datetime.utcnow)
+
+# Same format as ArchiveSegment, one per mode once ingestion has compacted them.
+class ReferenceSegment(Base):
+    __tablename__ = "reference_segments"
+    id = Column(Integer, primary_key=True, index=True)
+    mode = Column(String)
+    doc_count = Column(Integer)
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Outgoing emails. Rows are written in the request transaction and
+# delivered in batches by the background dispatcher in utils_email.
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body_html = Column(Text, nullable=False)
+    status = Column(String, default="pending", index=True)   # pending | sending | sent | failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    lease_until = Column(DateTime, nullable=True)   # while "sending": reclaimed after this if the worker died
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+# Pending "new submission" notices for a supervisor's digest email.
+# Values are copied so the digest still reads correctly if the submission changes.
+class SupervisorDigestItem(Base):
+    __tablename__ = "supervisor_digest_items"
+    id = Column(Integer, primary_key=True, index=True)
+    supervisor_id = Column(Integer, ForeignKey("users.id"), index=True)
+    submission_id = Column(Integer)
+    student_name = Column(String)
+    student_reg_number = Column(String)
+    proposal_type = Column(String)
+    proposed_title = Column(String)
+    similarity = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
 @event.listens_for(Submission, "load")
 def fix_datetime_on_load(submission, _):
     # If date fields were stored as text, convert safely
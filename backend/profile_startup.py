@@ -0,0 +1,114 @@
+"""
+Cold start report: where import time goes, and how long a fresh server
+takes to answer its first request.
+
+Usage:
+    python profile_startup.py                 # import profile, top 25 modules
+    python profile_startup.py --top 40
+    python profile_startup.py --serve         # also time uvicorn boot -> first 200 on /
+
+Uses DATABASE_URL like the app. Each measurement runs in a fresh
+interpreter, so nothing is already imported or cached.
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+HEAVY = ("sklearn", "scipy", "numpy", "reportlab", "mailjet_rest", "requests")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile():
+    """Runs `python -X importtime -c 'import main'` and parses its report."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(proc.stderr[-2000:])
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows, wall
+
+
+def print_profile(rows, wall, top: int):
+    total = next((cum for name, _, cum, _ in rows if name == "main"), 0)
+    print(f"python -c 'import main': {wall * 1000:.0f} ms wall, {total / 1000:.0f} ms importing\n")
+
+    # Our own modules, in the order they are imported
+    print(f"{'app module':<28}{'cumulative ms':>15}")
+    for name, _, cum, _ in rows:
+        if name == "main" or name.startswith(("routes_", "utils_", "database", "models", "auth_jwt", "migrate")):
+            print(f"{name:<28}{cum / 1000:>15.1f}")
+
+    print(f"\n{'top-level package':<28}{'cumulative ms':>15}")
+    packages = {}
+    for name, _, cum, depth in rows:
+        if depth == 1 and "." not in name:
+            packages[name] = packages.get(name, 0) + cum
+    for name, cum in sorted(packages.items(), key=lambda x: -x[1])[:top]:
+        print(f"{name:<28}{cum / 1000:>15.1f}")
+
+    loaded = {name.split(".")[0] for name, *_ in rows}
+    eager = [h for h in HEAVY if h in loaded]
+    print("\nheavy modules imported at startup:", ", ".join(eager) if eager else "none")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_first_response(timeout: float = 30.0) -> float:
+    """Seconds from launching uvicorn to the first successful GET /."""
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                sys.exit("uvicorn exited during startup")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        sys.exit("no response before timeout")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile app cold start")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--serve", action="store_true", help="Also time the first HTTP response")
+    args = parser.parse_args()
+
+    rows, wall = import_profile()
+    print_profile(rows, wall, args.top)
+
+    if args.serve:
+        print(f"\nuvicorn start -> first 200: {time_first_response() * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import Submission, User, Settings
 from auth_jwt import get_current_user
+from utils_stats import get_stats
 from datetime import datetime
 from fastapi.encoders import jsonable_encoder 
 from pydantic import BaseModel
@@ -324,3 +325,17 @@ def lecturer_decide_submission(
 
 
 
+
+
+# ============================================================
+#   ADMIN - DASHBOARD STATS
+# ============================================================
+@router.get("/admin/stats")
+def get_admin_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    return get_stats(db)
@@ -0,0 +1,146 @@
+# routes_archive.py
+
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import get_db
+from models import ArchivedSubmission, ArchiveJob, User
+from auth_jwt import get_current_user
+from utils_archive import archive_submissions, decompress_text, running_job, start_archive_job
+
+router = APIRouter()
+
+
+def _summary(a: ArchivedSubmission) -> dict:
+    return {
+        "id": a.id,
+        "session": a.session,
+        "proposal_type": a.proposal_type,
+        "proposed_title": a.proposed_title,
+        "student_id": a.student_id,
+        "supervisor_id": a.supervisor_id,
+        "similarity_score": a.similarity_score,
+        "lecturer_decision": a.lecturer_decision,
+        "final_decision": a.final_decision,
+        "ca_score": a.ca_score,
+        "created_at": a.created_at,
+        "archived_at": a.archived_at,
+    }
+
+
+def _job(job: ArchiveJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "before": job.before,
+        "done": job.done,
+        "total": job.total,
+        "by_type": json.loads(job.by_type) if job.by_type else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# ============================================================
+#   ADMIN - ARCHIVE OF PAST SESSIONS
+# ============================================================
+@router.get("/admin/archive")
+def list_archive(
+    session: Optional[str] = Query(None, description='Academic session, e.g. "2024/2025"'),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    sessions = dict(
+        db.query(ArchivedSubmission.session, func.count())
+        .group_by(ArchivedSubmission.session)
+        .all()
+    )
+
+    # Text stays compressed; only list columns are read
+    query = db.query(ArchivedSubmission).with_entities(
+        *[getattr(ArchivedSubmission, c) for c in (
+            "id", "session", "proposal_type", "proposed_title", "student_id", "supervisor_id",
+            "similarity_score", "lecturer_decision", "final_decision", "ca_score", "created_at", "archived_at"
+        )]
+    )
+    if session:
+        query = query.filter(ArchivedSubmission.session == session)
+    rows = query.order_by(ArchivedSubmission.id.desc()).offset(offset).limit(limit).all()
+
+    return {
+        "sessions": sessions,
+        "total": sessions.get(session, 0) if session else sum(sessions.values()),
+        "results": [_summary(r) for r in rows],
+    }
+
+
+@router.get("/admin/archive/jobs/{job_id}")
+def get_archive_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    job = db.query(ArchiveJob).filter(ArchiveJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Archive job not found")
+    return _job(job)
+
+
+@router.get("/admin/archive/{submission_id}")
+def get_archived_submission(
+    submission_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    archived = db.query(ArchivedSubmission).filter(ArchivedSubmission.id == submission_id).first()
+    if not archived:
+        raise HTTPException(status_code=404, detail="Archived submission not found")
+
+    return {**_summary(archived), **decompress_text(archived.text_z)}
+
+
+@router.post("/admin/archive")
+def run_archive(
+    response: Response,
+    before: Optional[str] = Query(None, description="YYYY-MM-DD; default is the start of the current session"),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Moves final submissions created before `before` out of the live table.
+    Runs in the background; poll GET /admin/archive/jobs/{id}. A dry run
+    only counts and answers straight away.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    try:
+        cutoff = datetime.fromisoformat(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="before must be YYYY-MM-DD")
+
+    if dry_run:
+        counts = archive_submissions(db, cutoff, dry_run=True)
+        return {"dry_run": True, "archived": sum(counts.values()), "by_type": counts}
+
+    if running_job(db):
+        raise HTTPException(status_code=409, detail="An archive job is already running")
+
+    response.status_code = 202
+    return _job(start_archive_job(db, cutoff, current_user.id))
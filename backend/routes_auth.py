@@ -1,14 +1,31 @@
 # routes_auth.py
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File, Request, Response
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from passlib.hash import pbkdf2_sha256, bcrypt
 from database import get_db
-from models import User, RoleEnum
-from auth_jwt import create_access_token, get_current_user
+from models import User, RoleEnum, RevokedToken
+from auth_jwt import (
+    create_access_token, create_refresh_token, decode_refresh_token, get_current_user,
+    get_user_allowing_password_change
+)
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from passlib.context import CryptContext
-from utils_email import send_email
+from email_validator import validate_email, EmailNotValidError
+from utils_email import queue_email, email_dispatcher
+from utils_password import (
+    hash_passwords, is_bcrypt_hash, hash_password_limited, verify_password_limited,
+    hashing_status, HashingBusy
+)
+from utils_ratelimit import TokenBucketLimiter
+from utils_changes import check_not_modified, bump, USERS_SCOPE
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+import csv
+import io
+import os
+import secrets
 import uuid
 
 router = APIRouter(
@@ -19,32 +36,48 @@ router = APIRouter(
 # We'll use pbkdf2_sha256 as the canonical hashing algorithm for new hashes.
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Throttling for endpoints that hash passwords.
+# Client IPs come from request.client - run uvicorn with --proxy-headers
+# (and FORWARDED_ALLOW_IPS) behind a load balancer.
+ip_limiter = TokenBucketLimiter(
+    per_minute=float(os.environ.get("AUTH_IP_PER_MINUTE", "30")),
+    burst=int(os.environ.get("AUTH_IP_BURST", "20")),
+)
+account_limiter = TokenBucketLimiter(
+    per_minute=float(os.environ.get("AUTH_ACCOUNT_PER_MINUTE", "5")),
+    burst=int(os.environ.get("AUTH_ACCOUNT_BURST", "5")),
+)
+
 
 # -------------------------------
-# Local helper (replaces missing utils_password)
+# Throttling + bounded hashing helpers
 # -------------------------------
-def hash_password(plain: str) -> str:
-    """Hash with pbkdf2_sha256 (consistent across app)."""
-    return pbkdf2_sha256.hash(plain)
+def throttle(limiter: TokenBucketLimiter, key: str):
+    retry_after = limiter.allow(key)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts. Please wait and try again.",
+            headers={"Retry-After": str(int(retry_after) + 1)}
+        )
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    """Verify password against stored hash. Handles bcrypt -> pbkdf2 upgrade path."""
-    if not hashed:
-        return False
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def hash_password(plain: str) -> str:
+    try:
+        return hash_password_limited(plain)
+    except (HashingBusy, FutureTimeoutError):
+        raise HTTPException(status_code=503, detail="Server busy, please retry.", headers={"Retry-After": "2"})
 
-    # If stored is bcrypt, use bcrypt.verify then (optionally) upgrade to pbkdf2 in DB caller
-    if hashed.startswith("$2b$") or hashed.startswith("$2a$") or hashed.startswith("$2y$"):
-        try:
-            return bcrypt.verify(plain, hashed)
-        except Exception:
-            return False
 
-    # Default: pbkdf2_sha256
+def verify_password(plain: str, hashed: str) -> bool:
     try:
-        return pbkdf2_sha256.verify(plain, hashed)
-    except Exception:
-        return False
+        return verify_password_limited(plain, hashed)
+    except (HashingBusy, FutureTimeoutError):
+        raise HTTPException(status_code=503, detail="Server busy, please retry.", headers={"Retry-After": "2"})
 
 
 # -------------------------------
@@ -67,11 +100,85 @@ class ForgotPasswordRequest(BaseModel):
     email: EmailStr
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+# -------------------------------
+# Token helpers
+# -------------------------------
+def issue_tokens(user: User) -> dict:
+    access_token = create_access_token({
+        "id": user.id,
+        "role": user.role,
+        "name": user.name,
+        "pwd_change": bool(user.must_change_password)
+    })
+    refresh_token, _, _ = create_refresh_token(user.id, user.token_version or 0)
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+def revoke_all_refresh_tokens(user: User):
+    """Invalidates every refresh token issued to user so far. Caller commits."""
+    user.token_version = (user.token_version or 0) + 1
+
+
+def revoke_refresh_token(db: Session, payload: dict):
+    """
+    Adds the token's jti to the revocation list.
+    The jti is the primary key, so two concurrent uses of the same
+    refresh token cannot both succeed - the second insert fails.
+    """
+    db.add(RevokedToken(
+        jti=payload["jti"],
+        user_id=payload["id"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+
+# -------------------------------
+# Temporary passwords (roster import, admin reset)
+# -------------------------------
+TEMP_PASSWORD_BYTES = 9   # secrets.token_urlsafe -> 12 characters
+
+
+def new_temporary_password() -> str:
+    return secrets.token_urlsafe(TEMP_PASSWORD_BYTES)
+
+
+def queue_temporary_password_email(db: Session, name: str, email: str, password: str, reason: str):
+    """Emails a temporary password; it goes out once the caller commits."""
+    body_html = f"""
+    <p>Hello {name},</p>
+
+    <p>{reason}</p>
+
+    <p>Email: <b>{email}</b><br>Temporary password: <b>{password}</b></p>
+
+    <p>You will be asked to choose a new password when you next log in.</p>
+
+    <p>Regards,<br>University Research Submission System</p>
+    """
+    queue_email(db, email, "Your Research Submission System password", body_html)
+
+
 # -------------------------------
 # SIGNUP - Requires Admin Approval
 # -------------------------------
 @router.post("/signup")
-def signup(payload: SignupRequest, db: Session = Depends(get_db)):
+def signup(payload: SignupRequest, request: Request, db: Session = Depends(get_db)):
+    throttle(ip_limiter, client_ip(request))
+
     if payload.role not in RoleEnum.__members__:
         raise HTTPException(status_code=400, detail="Invalid role selected.")
 
@@ -118,7 +225,10 @@ def signup(payload: SignupRequest, db: Session = Depends(get_db)):
 # LOGIN - Requires Approval
 # -------------------------------
 @router.post("/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+def login(payload: LoginRequest, request: Request, db: Session = Depends(get_db)):
+    throttle(ip_limiter, client_ip(request))
+    throttle(account_limiter, payload.email.lower())
+
     user = db.query(User).filter(User.email == payload.email).first()
 
     if not user:
@@ -128,40 +238,75 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
     if not stored_hash:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    # If bcrypt-stored hash -> verify with bcrypt then upgrade to pbkdf2
-    if stored_hash.startswith("$2b$") or stored_hash.startswith("$2a$") or stored_hash.startswith("$2y$"):
-        if not bcrypt.verify(payload.password, stored_hash):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        # Upgrade stored hash to pbkdf2_sha256
+    if not verify_password(payload.password, stored_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # If bcrypt-stored hash -> upgrade to pbkdf2
+    if is_bcrypt_hash(stored_hash):
         user.password_hash = hash_password(payload.password)
         db.commit()
-    else:
-        if not pbkdf2_sha256.verify(payload.password, stored_hash):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
 
     if not user.is_approved:
         raise HTTPException(status_code=403, detail="Account pending admin approval")
 
-    token = create_access_token({
-        "id": user.id,
-        "role": user.role,
-        "name": user.name
-    })
-
     return {
-        "access_token": token,
-        "token_type": "bearer",
+        **issue_tokens(user),
         "user": {
             "id": user.id,
             "name": user.name,
             "email": user.email,
-            "role": user.role
+            "role": user.role,
+            "must_change_password": bool(user.must_change_password)
         }
     }
 
 
 # -------------------------------
-# ADMIN - Reset password (to fixed '1234567')
+# REFRESH - Rotate refresh token, no password needed
+# -------------------------------
+@router.post("/refresh")
+def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+    claims = decode_refresh_token(payload.refresh_token)
+
+    if db.query(RevokedToken).filter(RevokedToken.jti == claims["jti"]).first():
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+    user = db.query(User).filter(User.id == claims["id"]).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # Issued before the last password change or reset
+    if claims.get("ver", 0) != (user.token_version or 0):
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+    if not user.is_approved:
+        raise HTTPException(status_code=403, detail="Account pending admin approval")
+
+    # Rotation: the presented token can never be used again
+    revoke_refresh_token(db, claims)
+
+    # Housekeeping: expired tokens no longer need to be remembered
+    db.query(RevokedToken).filter(RevokedToken.expires_at < datetime.utcnow()).delete()
+    db.commit()
+
+    return issue_tokens(user)
+
+
+# -------------------------------
+# LOGOUT - Revoke refresh token
+# -------------------------------
+@router.post("/logout")
+def logout(payload: RefreshRequest, db: Session = Depends(get_db)):
+    claims = decode_refresh_token(payload.refresh_token)
+
+    if not db.query(RevokedToken).filter(RevokedToken.jti == claims["jti"]).first():
+        revoke_refresh_token(db, claims)
+
+    return {"message": "Logged out"}
+
+
+# -------------------------------
+# ADMIN - Reset password (random, emailed, changed on next login)
 # -------------------------------
 @router.put("/reset_password/{user_id}")
 def reset_password(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -173,20 +318,32 @@ def reset_password(user_id: int, db: Session = Depends(get_db), current_user: Us
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.password_hash = hash_password("1234567")
+    password = new_temporary_password()
+    user.password_hash = hash_password(password)
+    user.must_change_password = True
+    revoke_all_refresh_tokens(user)
+    queue_temporary_password_email(
+        db, user.name, user.email, password,
+        "An administrator has reset your password for the University Research Submission System."
+    )
     db.commit()
+    email_dispatcher.wake()
 
-    return {"message": "Password reset to 1234567"}
+    return {"message": f"Password reset. A temporary password was emailed to {user.email}."}
 
 
 # -------------------------------
 # ADMIN - List Pending Accounts
 # -------------------------------
 @router.get("/pending_approvals")
-def list_pending_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_pending_users(request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if getattr(current_user, "role", None) != "admin":
         raise HTTPException(status_code=403, detail="Only admin can view pending approvals")
 
+    not_modified = check_not_modified(request, response, db, USERS_SCOPE)
+    if not_modified:
+        return not_modified
+
     return db.query(User).filter(User.is_approved == False).all()
 
 
@@ -213,17 +370,163 @@ def approve_user(user_id: int, approve: bool, db: Session = Depends(get_db), cur
     return {"message": message}
 
 
+# -------------------------------
+# ADMIN - Bulk import student roster (CSV)
+# -------------------------------
+ROSTER_BATCH_SIZE = 500
+ROSTER_MAX_REPORTED_ERRORS = 200
+
+
+def _import_roster_batch(db: Session, batch: list[dict], seen_emails: set, seen_regs: set, errors: list) -> int:
+    """Validate one batch against the DB with set queries, then hash + bulk insert."""
+    emails = {r["email"] for r in batch}
+    regs = {r["reg_number"] for r in batch}
+
+    taken_emails = {e for (e,) in db.query(User.email).filter(User.email.in_(emails))}
+    taken_regs = {r for (r,) in db.query(User.reg_number).filter(User.reg_number.in_(regs))}
+
+    accepted = []
+    for r in batch:
+        if r["email"] in taken_emails or r["email"] in seen_emails:
+            errors.append({"line": r["line"], "error": f"Email already registered: {r['email']}"})
+            continue
+        if r["reg_number"] in taken_regs or r["reg_number"] in seen_regs:
+            errors.append({"line": r["line"], "error": f"Registration number already exists: {r['reg_number']}"})
+            continue
+        seen_emails.add(r["email"])
+        seen_regs.add(r["reg_number"])
+        accepted.append(r)
+
+    if not accepted:
+        return 0
+
+    hashes = hash_passwords([r["password"] for r in accepted])
+
+    db.execute(insert(User), [
+        {
+            "name": r["name"],
+            "email": r["email"],
+            "password_hash": h,
+            "role": RoleEnum.student,
+            "reg_number": r["reg_number"],
+            "is_approved": True,
+            "must_change_password": True,
+        }
+        for r, h in zip(accepted, hashes)
+    ])
+    # Generated passwords are only ever sent to the student, in the same commit
+    for r in accepted:
+        if r["generated"]:
+            queue_temporary_password_email(
+                db, r["name"], r["email"], r["password"],
+                "An account has been created for you on the University Research Submission System."
+            )
+    # Core bulk insert skips the ORM flush hooks that bump counters
+    bump(db.connection(), {USERS_SCOPE})
+    db.commit()
+
+    return len(accepted)
+
+
+@router.post("/import_roster")
+def import_roster(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    CSV columns: name, email, reg_number, password (optional).
+    Imported students are approved immediately and must change their
+    password on first login. Rows without a password get a random one,
+    emailed to the student. Rows are read and inserted batch by batch,
+    so large rosters are never held in memory.
+    """
+    if getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Only admin can import users")
+
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+
+    missing = {"name", "email", "reg_number"} - set(reader.fieldnames or [])
+    if missing:
+        raise HTTPException(status_code=400, detail=f"CSV is missing columns: {sorted(missing)}")
+
+    created = 0
+    errors = []
+    seen_emails, seen_regs = set(), set()
+    batch = []
+
+    for line, row in enumerate(reader, start=2):
+        name = (row.get("name") or "").strip()
+        reg_number = (row.get("reg_number") or "").strip()
+        password = (row.get("password") or "").strip()
+        generated = not password
+        if generated:
+            password = new_temporary_password()
+
+        try:
+            email = validate_email((row.get("email") or "").strip(), check_deliverability=False).normalized
+        except EmailNotValidError as e:
+            errors.append({"line": line, "error": f"Invalid email: {e}"})
+            continue
+
+        if not name:
+            errors.append({"line": line, "error": "Name is required"})
+            continue
+
+        if not reg_number.isdigit() or len(reg_number) != 6:
+            errors.append({"line": line, "error": "Registration number must be EXACTLY 6 digits"})
+            continue
+
+        batch.append({"line": line, "name": name, "email": email, "reg_number": reg_number,
+                      "password": password, "generated": generated})
+
+        if len(batch) >= ROSTER_BATCH_SIZE:
+            created += _import_roster_batch(db, batch, seen_emails, seen_regs, errors)
+            batch = []
+
+    if batch:
+        created += _import_roster_batch(db, batch, seen_emails, seen_regs, errors)
+
+    if created:
+        email_dispatcher.wake()
+
+    return {
+        "message": f"{created} students imported.",
+        "created": created,
+        "skipped": len(errors),
+        "errors": errors[:ROSTER_MAX_REPORTED_ERRORS]
+    }
+
+
+# -------------------------------
+# ADMIN - Password hashing stats
+# -------------------------------
+@router.get("/hash_stats")
+def get_hash_stats(current_user: User = Depends(get_current_user)):
+    if getattr(current_user, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Only admin can view hashing stats")
+
+    return hashing_status()
+
+
 # -------------------------------
 # ADMIN - View All Users
 # -------------------------------
 @router.get("/users")
 def list_users(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if getattr(current_user, "role", None) != "admin":
         raise HTTPException(status_code=403, detail="Only admin can view all users")
 
+    # Nothing changed since the client's copy -> skip the list query
+    not_modified = check_not_modified(request, response, db, USERS_SCOPE)
+    if not_modified:
+        return not_modified
+
     users = db.query(User).all()
 
     result = []
@@ -257,11 +560,12 @@ def change_password(
     new_password: str = Body(..., embed=True),
     confirm_password: str = Body(..., embed=True),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_user_allowing_password_change),
 ):
     """
     Allows any authenticated user (student, lecturer, or admin) to change their password.
     """
+    throttle(account_limiter, f"user:{current_user.id}")
 
     # Validate new password confirmation
     if new_password != confirm_password:
@@ -284,9 +588,13 @@ def change_password(
 
     # Hash and save new password
     user.password_hash = hash_password(new_password)
+    user.must_change_password = False
+    # Sessions elsewhere (e.g. a stolen refresh token) end with the old password
+    revoke_all_refresh_tokens(user)
     db.commit()
 
-    return {"message": "Password changed successfully."}
+    # This session carries on with tokens for the new version
+    return {"message": "Password changed successfully.", **issue_tokens(user)}
 
 
 # -------------------------------
@@ -305,7 +613,6 @@ def forgot_password(payload: ForgotPasswordRequest, db: Session = Depends(get_db
     token = str(uuid.uuid4())
     # attach token to user - ensure your User model has reset_token column if you want persistence
     setattr(user, "reset_token", token)
-    db.commit()
 
     # Generate reset link (adjust domain as needed)
     reset_link = f"https://university-research-submission-system-1.onrender.com/reset-password/{token}"
@@ -326,6 +633,8 @@ def forgot_password(payload: ForgotPasswordRequest, db: Session = Depends(get_db
     <p>Regards,<br>University Research Submission System</p>
     """
 
-    send_email(email, subject, body_html)
+    queue_email(db, email, subject, body_html)
+    db.commit()
+    email_dispatcher.wake()
 
     return {"message": "Password reset link sent if the email exists."}
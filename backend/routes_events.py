@@ -0,0 +1,95 @@
+# routes_events.py
+
+import json
+import time
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from jose import jwt
+
+from auth_jwt import get_current_user
+from database import SessionLocal
+from utils_changes import latest_change_id
+from utils_events import hub
+
+router = APIRouter()
+
+# Comment lines keep proxies from closing an idle stream
+HEARTBEAT_SECONDS = 25
+# Browser reconnect delay after the stream drops
+RETRY_MS = 3000
+
+
+def _authenticate(token: str):
+    """Same checks as get_current_user, with a session that is closed before streaming."""
+    db = SessionLocal()
+    try:
+        user = get_current_user(token=token, db=db)
+        return user, latest_change_id(db)
+    finally:
+        db.close()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# ============================================================
+#   SERVER-SENT EVENTS
+# ============================================================
+@router.get("/events")
+async def submission_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="EventSource cannot send headers"),
+):
+    """
+    One long-lived stream per panel. Pushes submission.created / decided /
+    updated / deleted for submissions the user can see. The stream ends when
+    the access token expires; the client reconnects with a fresh one.
+    """
+    auth = request.headers.get("authorization", "")
+    if not token and auth.lower().startswith("bearer "):
+        token = auth[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    user, cursor = await run_in_threadpool(_authenticate, token)
+    expires_at = jwt.get_unverified_claims(token).get("exp", 0)
+
+    sub = hub.subscribe(user)
+
+    async def stream():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            # After a reconnect the client catches up with /submissions/changes?since=cursor
+            yield _sse("ready", {"cursor": cursor, "role": user.role})
+
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield _sse("expired", {})
+                    return
+                try:
+                    evt = await asyncio.wait_for(sub.queue.get(), min(HEARTBEAT_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+
+                evt = {k: v for k, v in evt.items() if k != "audience"}
+                yield _sse(evt.pop("type"), evt)
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",   # no proxy buffering
+        }
+    )
@@ -0,0 +1,361 @@
+# routes_export.py
+
+import csv
+import io
+import json
+import os
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from auth_jwt import get_current_user
+from database import SessionLocal
+from models import Submission, User, ProposalTypeEnum
+from utils_pdf import render_pdf_bytes
+from utils_pdf_cache import pdf_cache_key, cached_pdf_path, store_pdf
+
+router = APIRouter()
+
+# Rows fetched per round-trip from the server-side cursor.
+EXPORT_BATCH_SIZE = 500
+
+# Processes rendering PDFs for bundle downloads
+PDF_RENDER_PROCESSES = int(os.environ.get("PDF_RENDER_PROCESSES", os.cpu_count() or 1))
+
+_render_pool = None
+
+Student = aliased(User)
+Supervisor = aliased(User)
+
+# Column name -> SQL expression. Only these can be requested.
+EXPORT_COLUMNS = {
+    "id": Submission.id,
+    "proposal_type": Submission.proposal_type,
+    "proposed_title": Submission.proposed_title,
+    "background": Submission.background,
+    "aim": Submission.aim,
+    "objectives": Submission.objectives,
+    "methods": Submission.methods,
+    "expected_results": Submission.expected_results,
+    "literature_review": Submission.literature_review,
+    "similarity_score": Submission.similarity_score,
+    "lecturer_decision": Submission.lecturer_decision,
+    "admin_decision": Submission.admin_decision,
+    "final_decision": Submission.final_decision,
+    "ca_score": Submission.ca_score,
+    "created_at": Submission.created_at,
+    "lecturer_decision_at": Submission.lecturer_decision_at,
+    "student_id": Submission.student_id,
+    "student_name": Student.name,
+    "student_email": Student.email,
+    "student_reg_number": Student.reg_number,
+    "supervisor_id": Submission.supervisor_id,
+    "supervisor_name": Supervisor.name,
+    "supervisor_email": Supervisor.email,
+}
+
+# Everything except the long text sections
+DEFAULT_COLUMNS = [
+    "id", "proposal_type", "proposed_title", "similarity_score",
+    "lecturer_decision", "admin_decision", "final_decision", "ca_score",
+    "created_at", "lecturer_decision_at",
+    "student_name", "student_reg_number", "supervisor_name",
+]
+
+
+# ============================================================
+#   HELPERS
+# ============================================================
+def _plain(value):
+    """Make a DB value safe for csv / json output."""
+    if isinstance(value, ProposalTypeEnum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _stream_rows(stmt, columns):
+    """
+    Yields plain dicts from a server-side cursor.
+    Owns its session so it outlives the request dependencies.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield [
+                {name: _plain(value) for name, value in zip(columns, row)}
+                for row in partition
+            ]
+    finally:
+        db.close()
+
+
+def _csv_chunks(stmt, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+
+    # Header goes out before the first query round-trip
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for rows in _stream_rows(stmt, columns):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(stmt, columns):
+    for rows in _stream_rows(stmt, columns):
+        yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+
+
+# ============================================================
+#   ADMIN - EXPORT SUBMISSIONS (CSV / NDJSON)
+# ============================================================
+@router.get("/admin/export/submissions")
+def export_submissions(
+    format: str = Query("csv"),
+    columns: Optional[str] = Query(None, description="Comma separated column names"),
+    proposal_type: Optional[ProposalTypeEnum] = None,
+    final_decision: Optional[str] = None,
+    supervisor_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Format must be 'csv' or 'ndjson'")
+
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else DEFAULT_COLUMNS
+    unknown = [c for c in selected if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown columns: {unknown}. Allowed: {list(EXPORT_COLUMNS)}"
+        )
+
+    stmt = (
+        select(*[EXPORT_COLUMNS[c] for c in selected])
+        .select_from(Submission)
+        .outerjoin(Student, Submission.student_id == Student.id)
+        .outerjoin(Supervisor, Submission.supervisor_id == Supervisor.id)
+    )
+
+    if proposal_type:
+        stmt = stmt.where(Submission.proposal_type == proposal_type)
+    if final_decision:
+        stmt = stmt.where(Submission.final_decision == final_decision)
+    if supervisor_id:
+        stmt = stmt.where(Submission.supervisor_id == supervisor_id)
+    if student_id:
+        stmt = stmt.where(Submission.student_id == student_id)
+    if created_from:
+        stmt = stmt.where(Submission.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(Submission.created_at < created_to)
+
+    stmt = stmt.order_by(Submission.id)
+
+    if format == "csv":
+        body = _csv_chunks(stmt, selected)
+        media_type = "text/csv"
+    else:
+        body = _ndjson_chunks(stmt, selected)
+        media_type = "application/x-ndjson"
+
+    filename = f"submissions_{datetime.utcnow():%Y%m%d_%H%M%S}.{format}"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+# ============================================================
+#   ADMIN - BULK PDF BUNDLE (ZIP)
+# ============================================================
+class _ZipStream:
+    """Write-only sink for ZipFile; the generator drains it after each entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    if _render_pool is None:
+        # spawn: workers import utils_pdf only, not the web app
+        _render_pool = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+
+PDF_FIELDS = [
+    "id", "proposal_type", "proposed_title", "background", "aim", "objectives",
+    "methods", "expected_results", "literature_review",
+    "student_name", "student_reg_number", "supervisor_name",
+]
+
+
+def _pdf_snapshot(row: dict) -> SimpleNamespace:
+    """Plain, picklable stand-in for a Submission with what generate_pdf reads."""
+    return SimpleNamespace(
+        id=row["id"],
+        proposal_type=row["proposal_type"],
+        proposed_title=row["proposed_title"],
+        background=row["background"],
+        aim=row["aim"],
+        objectives=row["objectives"],
+        methods=row["methods"],
+        expected_results=row["expected_results"],
+        literature_review=row["literature_review"],
+        student=SimpleNamespace(
+            name=row["student_name"], reg_number=row["student_reg_number"]
+        ) if row["student_name"] is not None else None,
+        supervisor=SimpleNamespace(
+            name=row["supervisor_name"], reg_number=None
+        ) if row["supervisor_name"] is not None else None,
+    )
+
+
+def _bundle_entry_name(snap) -> str:
+    reg = snap.student.reg_number if snap.student and snap.student.reg_number else "unknown"
+    return f"submission_{snap.id}_{reg}_{getattr(snap.proposal_type, 'value', snap.proposal_type)}.pdf"
+
+
+def _zip_chunks(stmt):
+    """
+    Renders PDFs in the process pool and writes each into the ZIP as soon as it
+    finishes. At most 2 x workers renders are in flight, so memory stays bounded.
+    A submission that fails to render becomes a .txt error entry; the status
+    line is long gone, and the archive must still be finalized.
+    """
+    sink = _ZipStream()
+    zf = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    parallel = PDF_RENDER_PROCESSES > 1
+    window = PDF_RENDER_PROCESSES * 2
+    pending = {}
+
+    def add(snap, key, data):
+        try:
+            store_pdf(snap.id, key, data)
+        except OSError as e:
+            print(f"❌ PDF cache write failed for submission {snap.id}: {e}")   # bundle goes on
+        info = zipfile.ZipInfo(_bundle_entry_name(snap), datetime.utcnow().timetuple()[:6])
+        zf.writestr(info, data)   # PDFs are already compressed
+        return sink.pop()
+
+    def add_error(snap, error):
+        print(f"❌ PDF bundle: submission {snap.id} failed: {error}")
+        name = _bundle_entry_name(snap).removesuffix(".pdf") + "_ERROR.txt"
+        zf.writestr(name, f"Could not render submission {snap.id}: {type(error).__name__}: {error}\n")
+        return sink.pop()
+
+    def drain(return_when):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            snap, key = pending.pop(future)
+            try:
+                data = future.result()
+            except Exception as e:
+                yield add_error(snap, e)
+                continue
+            yield add(snap, key, data)
+
+    snapshots = (_pdf_snapshot(r) for rows in _stream_rows(stmt, PDF_FIELDS) for r in rows)
+
+    for snap in snapshots:
+        key = pdf_cache_key(snap)
+        path = cached_pdf_path(snap.id, key)
+
+        if path:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                path = None   # evicted since the lookup; render it below
+
+        if path:
+            yield add(snap, key, data)
+        elif parallel:
+            pending[_get_render_pool().submit(render_pdf_bytes, snap)] = (snap, key)
+            if len(pending) >= window:
+                yield from drain(FIRST_COMPLETED)
+        else:
+            try:
+                data = render_pdf_bytes(snap)
+            except Exception as e:
+                yield add_error(snap, e)
+                continue
+            yield add(snap, key, data)
+
+    while pending:
+        yield from drain(FIRST_COMPLETED)
+
+    zf.close()
+    yield sink.pop()
+
+
+@router.get("/admin/submissions/pdf_bundle")
+def download_pdf_bundle(
+    proposal_type: Optional[ProposalTypeEnum] = None,
+    final_decision: Optional[str] = None,
+    supervisor_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    stmt = (
+        select(*[EXPORT_COLUMNS[c] for c in PDF_FIELDS])
+        .select_from(Submission)
+        .outerjoin(Student, Submission.student_id == Student.id)
+        .outerjoin(Supervisor, Submission.supervisor_id == Supervisor.id)
+    )
+
+    if proposal_type:
+        stmt = stmt.where(Submission.proposal_type == proposal_type)
+    if final_decision:
+        stmt = stmt.where(Submission.final_decision == final_decision)
+    if supervisor_id:
+        stmt = stmt.where(Submission.supervisor_id == supervisor_id)
+
+    stmt = stmt.order_by(Submission.id)
+
+    filename = f"submissions_{datetime.utcnow():%Y%m%d_%H%M%S}.zip"
+
+    return StreamingResponse(
+        _zip_chunks(stmt),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
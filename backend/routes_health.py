@@ -0,0 +1,31 @@
+# routes_health.py
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from utils_warmup import warmup
+
+router = APIRouter()
+
+
+# ============================================================
+#   HEALTH CHECKS
+# ============================================================
+@router.get("/health/live")
+def live():
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+def ready():
+    """
+    503 until the startup warm-up has validated DB connections and loaded
+    caches, so the load balancer holds traffic off a cold instance.
+    """
+    status = warmup.status()
+    if status["ready"]:
+        return {"status": "ready", **status}
+
+    # e.g. the DB was unreachable last time: try again
+    if not status["warming"]:
+        warmup.start()
+    return JSONResponse(status_code=503, content={"status": "warming", **status})
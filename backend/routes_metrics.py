@@ -0,0 +1,28 @@
+# routes_metrics.py
+
+import secrets
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from utils_metrics import METRICS_TOKEN, render
+
+router = APIRouter()
+
+
+# ============================================================
+#   PROMETHEUS SCRAPE ENDPOINT
+# ============================================================
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(authorization: str = Header(None)):
+    """
+    Prometheus text format. Disabled until METRICS_TOKEN is set; configure
+    the scraper with `authorization: {credentials: <token>}`.
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(403, "Metrics are disabled; set METRICS_TOKEN")
+
+    supplied = (authorization or "").removeprefix("Bearer ").strip()
+    # Bytes: compare_digest refuses non-ASCII str, and the header is client input
+    if not secrets.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(401, "Invalid metrics token")
+
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
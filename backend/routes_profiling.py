@@ -0,0 +1,45 @@
+# routes_profiling.py
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from models import User
+from auth_jwt import get_current_user
+from utils_profiling import store
+
+router = APIRouter()
+
+
+def _require_admin(current_user: User):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+
+# ============================================================
+#   ADMIN - REQUEST PROFILES
+# ============================================================
+@router.get("/admin/profiles")
+def list_profiles(current_user: User = Depends(get_current_user)):
+    """Stored profiles, newest first. Trigger one with the X-Profile: 1 header."""
+    _require_admin(current_user)
+
+    summaries = []
+    for profile_id in store.ids():
+        try:
+            p = store.load(profile_id)
+        except HTTPException:
+            continue    # pruned in the meantime
+        summaries.append({k: p[k] for k in ("id", "method", "path", "status", "duration_ms", "samples")})
+    return summaries
+
+
+@router.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, current_user: User = Depends(get_current_user)):
+    _require_admin(current_user)
+    return store.load(profile_id)
+
+
+@router.get("/admin/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+def get_profile_folded(profile_id: str, current_user: User = Depends(get_current_user)):
+    """Collapsed stacks (`a;b;c count`) for speedscope.app or flamegraph.pl."""
+    _require_admin(current_user)
+    return PlainTextResponse(store.load(profile_id, "folded"))
@@ -0,0 +1,31 @@
+# routes_search.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User
+from auth_jwt import get_current_user
+from utils_search import search_submissions
+
+router = APIRouter()
+
+
+# ============================================================
+#   FULL-TEXT SEARCH
+# ============================================================
+@router.get("/search")
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ranked search over titles and all proposal sections.
+    Snippets are HTML-escaped with matches wrapped in <mark>.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty search query")
+
+    return search_submissions(db, current_user, q.strip(), limit, offset)
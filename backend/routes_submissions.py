@@ -1,15 +1,24 @@
 # routes_submissions.py
 
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from database import get_db
-from models import Submission, User, ProposalTypeEnum, Settings
+from models import Submission, User, ProposalTypeEnum, Settings, SubmissionChange, ArchivedSubmission
 from auth_jwt import get_current_user
-from utils_similarity import compute_similarity_percent
-from utils_email import send_email
+from utils_similarity import similarity_scores, top_percent
+from utils_neighbors import attach, detach, lock_type
+from utils_archive import archive_index, decompress_text
+from utils_references import reference_match
+from utils_email import queue_email, email_dispatcher
+from utils_digest import notify_supervisor
 from fastapi.responses import StreamingResponse
-from utils_pdf import generate_pdf
+from utils_pdf_cache import pdf_cache_key, open_cached_pdf, invalidate_submission
+from utils_changes import check_not_modified, submissions_scope_for, latest_change_id, USERS_SCOPE
+from utils_title_index import title_index
 
 router = APIRouter()
 
@@ -19,6 +28,7 @@ router = APIRouter()
 @router.get("/submission/{submission_id}/pdf")
 def get_submission_pdf(
     submission_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -33,12 +43,30 @@ def get_submission_pdf(
     if current_user.role == "lecturer" and sub.supervisor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    pdf_bytes = generate_pdf(sub)
+    # Same content -> same ETag, so repeat views skip rendering and transfer
+    key = pdf_cache_key(sub)
+    etag = f'"{key}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=cache_headers)
+
+    # Opened here, not by path later: eviction may remove the file meanwhile
+    pdf = open_cached_pdf(sub, key)
+
+    def chunks():
+        with pdf:
+            while chunk := pdf.read(64 * 1024):
+                yield chunk
 
     return StreamingResponse(
-        pdf_bytes,
+        chunks(),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=submission_{submission_id}.pdf"}
+        headers={
+            **cache_headers,
+            "Content-Length": str(os.fstat(pdf.fileno()).st_size),
+            "Content-Disposition": f"attachment; filename=submission_{submission_id}.pdf"
+        }
     )
 
 
@@ -51,6 +79,15 @@ def get_degree_level(ptype: ProposalTypeEnum) -> str:
     return "postgrad"
 
 
+def has_archived_approval(db: Session, student_id: int, ptype: ProposalTypeEnum) -> bool:
+    # Approved proposals from past sessions still lock their type
+    return db.query(ArchivedSubmission.id).filter(
+        ArchivedSubmission.student_id == student_id,
+        ArchivedSubmission.proposal_type == ptype.value,
+        func.lower(ArchivedSubmission.final_decision) == "approved",
+    ).first() is not None
+
+
 def build_text_for_mode(mode: str, title: str, parts: list[str]):
     if mode == "title":
         return title or ""
@@ -114,6 +151,12 @@ def submit_proposal(payload: ProposalSubmission, db: Session = Depends(get_db)):
         Submission.proposal_type == payload.proposal_type
     ).first()
 
+    if has_archived_approval(db, student.id, payload.proposal_type):
+        raise HTTPException(
+            status_code=400,
+            detail=f"You already have an APPROVED {payload.proposal_type}. Editing or new submission is not allowed."
+        )
+
     if existing_same_type:
         # If approved → completely locked
         if existing_same_type.final_decision and existing_same_type.final_decision.lower() == "approved":
@@ -124,8 +167,10 @@ def submit_proposal(payload: ProposalSubmission, db: Session = Depends(get_db)):
 
         # If rejected → allow new submission
         if existing_same_type.final_decision and existing_same_type.final_decision.lower() == "rejected":
+            detach(db, existing_same_type.id)
             db.delete(existing_same_type)
             db.commit()
+            invalidate_submission(existing_same_type.id)
         else:
             # Pending or lecturer reviewing → must edit instead
             raise HTTPException(
@@ -137,7 +182,8 @@ def submit_proposal(payload: ProposalSubmission, db: Session = Depends(get_db)):
     level = get_degree_level(payload.proposal_type)
     mode = undergrad_mode if level == "undergrad" else postgrad_mode
 
-    # Build text for similarity
+    # Build text for similarity; a concurrent submit of this type waits for our commit
+    lock_type(db, payload.proposal_type.value)
     existing = db.query(Submission).filter(
         Submission.proposal_type == payload.proposal_type
     ).all()
@@ -156,7 +202,12 @@ def submit_proposal(payload: ProposalSubmission, db: Session = Depends(get_db)):
     ]
     new_text = build_text_for_mode(mode, payload.proposed_title, new_parts)
 
-    similarity = compute_similarity_percent(new_text, existing_texts)
+    sims = similarity_scores(new_text, existing_texts, payload.proposal_type.value)
+    # Past sessions are archived but still count
+    archived, _ = archive_index.best_match(db, new_text, payload.proposal_type.value, mode)
+    similarity = max(top_percent(sims), archived)
+    # External theses are reported on their own, not folded into similarity
+    reference = reference_match(db, new_text, mode)
 
     # SAVE SUBMISSION
     submission = Submission(
@@ -171,32 +222,74 @@ def submit_proposal(payload: ProposalSubmission, db: Session = Depends(get_db)):
         expected_results=payload.expected_results,
         literature_review=payload.literature_review,
         similarity_score=similarity,
+        archive_score=archived,
+        reference_score=reference["score"],
+        reference_match_id=reference["document"]["id"] if reference["document"] else None,
     )
     db.add(submission)
+    db.flush()
+
+    # Earlier proposals this one copies get their scores raised too
+    attach(db, submission, existing, sims)
     db.commit()
     db.refresh(submission)
 
     # Notify student
-    send_email(
+    queue_email(
+        db,
         student.email,
         "Submission received",
         f"<p>Your {payload.proposal_type} submission was received. Similarity: <b>{similarity}%</b>.</p>"
     )
 
-    # Notify supervisor
-    warn = '<p style="color:red"><b>⚠ High similarity detected</b></p>' if similarity >= 70 else ""
-    send_email(
-        supervisor.email,
-        f"New submission from {student.reg_number or student.email}",
-        f"""
-        <p>Student <b>{student.name} ({student.reg_number})</b> submitted a {payload.proposal_type}.</p>
-        <p>Similarity: <b>{similarity}%</b>.</p>
-        {warn}
-        <p>Please log in to review.</p>
-        """
-    )
+    # Notify supervisor (single email or digest item)
+    notify_supervisor(db, supervisor, student, submission)
 
-    return {"id": submission.id, "similarity": similarity}
+    # Emails go out from the outbox - the response does not wait on Mailjet
+    db.commit()
+    email_dispatcher.wake()
+
+    return {
+        "id": submission.id,
+        "similarity": similarity,
+        "reference_similarity": reference["score"],
+        "reference_match": reference["document"],
+    }
+
+
+# ============================================================
+#   LIVE TITLE SIMILARITY PREVIEW
+# ============================================================
+@router.get("/similarity/preview")
+def similarity_preview(
+    title: str = Query(..., max_length=300),
+    type: ProposalTypeEnum = Query(...),
+    limit: int = Query(5, ge=1, le=20),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Called while the student types. Trigram overlap on titles only - an early
+    warning, not the score /submit computes. Students get scores only, not
+    other students' titles or ids.
+    """
+    start = time.perf_counter()
+    title_index.refresh(db)
+
+    # A student's own proposals (e.g. the one being edited) are not competition
+    exclude = current_user.id if current_user.role == "student" else None
+    hits = title_index.search(title, type.value, limit=limit, exclude_student=exclude)
+
+    if current_user.role == "student":
+        results = [{"score": score} for score, _, _ in hits]
+    else:
+        results = [{"id": sid, "proposed_title": t, "score": score} for score, sid, t in hits]
+
+    return {
+        "best_score": hits[0][0] if hits else 0.0,
+        "hits": results,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
 
 
 # ============================================================
@@ -241,7 +334,7 @@ def update_submission(
             Submission.id != sub.id
         ).first()
 
-        if duplicate:
+        if duplicate or has_archived_approval(db, sub.student_id, payload.proposal_type):
             raise HTTPException(
                 status_code=400,
                 detail=f"You already have a {payload.proposal_type} submission."
@@ -258,6 +351,7 @@ def update_submission(
     level = get_degree_level(sub.proposal_type)
     mode = undergrad_mode if level == "undergrad" else postgrad_mode
 
+    lock_type(db, getattr(sub.proposal_type, "value", sub.proposal_type))
     existing = db.query(Submission).filter(
         Submission.proposal_type == sub.proposal_type,
         Submission.id != sub.id
@@ -277,14 +371,30 @@ def update_submission(
     ]
     new_text = build_text_for_mode(mode, sub.proposed_title, new_parts)
 
-    sub.similarity_score = compute_similarity_percent(new_text, existing_texts)
+    ptype = getattr(sub.proposal_type, "value", sub.proposal_type)
+    sims = similarity_scores(new_text, existing_texts, ptype)
+    archived, _ = archive_index.best_match(db, new_text, ptype, mode)
+    sub.archive_score = archived
+    sub.similarity_score = max(top_percent(sims), archived)
+    reference = reference_match(db, new_text, mode)
+    sub.reference_score = reference["score"]
+    sub.reference_match_id = reference["document"]["id"] if reference["document"] else None
+
+    # The old text's matches no longer hold; record the new ones both ways
+    detach(db, sub.id)
+    attach(db, sub, existing, sims)
 
     db.commit()
     db.refresh(sub)
 
+    # Drop the cached PDF right away rather than on next download
+    invalidate_submission(sub.id)
+
     return {
         "id": sub.id,
         "similarity": sub.similarity_score,
+        "reference_similarity": sub.reference_score,
+        "reference_match": reference["document"],
         "message": "Submission updated successfully"
     }
 
@@ -350,6 +460,7 @@ def get_student_submissions(
             "literature_review": s.literature_review,
 
             "similarity_score": s.similarity_score,
+            "reference_score": s.reference_score,
 
             "lecturer_decision": s.lecturer_decision,
             "admin_decision": s.admin_decision,
@@ -363,7 +474,33 @@ def get_student_submissions(
                 s.ca_score
                 if show_ca or current_user.role != "student"
                 else None
-            )
+            ),
+            "archived": False,
+        })
+
+    # Past sessions, read-only
+    archived = db.query(ArchivedSubmission).filter(
+        ArchivedSubmission.student_id == student_id
+    ).order_by(
+        ArchivedSubmission.created_at.desc()
+    ).all()
+
+    for a in archived:
+        result.append({
+            "id": a.id,
+            "student_id": a.student_id,
+            "supervisor_id": a.supervisor_id,
+            "proposal_type": a.proposal_type,
+            "proposed_title": a.proposed_title,
+            **decompress_text(a.text_z),
+            "similarity_score": a.similarity_score,
+            "lecturer_decision": a.lecturer_decision,
+            "final_decision": a.final_decision,
+            "created_at": a.created_at,
+            "lecturer_decision_at": a.lecturer_decision_at,
+            "ca_score": a.ca_score if show_ca or current_user.role != "student" else None,
+            "archived": True,
+            "session": a.session,
         })
 
     return result
@@ -373,6 +510,8 @@ def get_student_submissions(
 # ============================================================
 @router.get("/submissions")
 def get_all_submissions(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -380,6 +519,16 @@ def get_all_submissions(
     if current_user.role == "student":
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    # Nothing changed since the client's copy -> skip the list query.
+    # The items carry student / supervisor names, so user edits count too
+    not_modified = check_not_modified(request, response, db, submissions_scope_for(current_user), USERS_SCOPE)
+    if not_modified:
+        return not_modified
+
+    # Read the cursor BEFORE the list, so a write racing with this request
+    # shows up again in the next /submissions/changes call rather than being lost
+    response.headers["X-Change-Cursor"] = str(latest_change_id(db))
+
     query = db.query(Submission)
 
     if current_user.role == "lecturer":
@@ -387,39 +536,109 @@ def get_all_submissions(
 
     submissions = query.order_by(Submission.created_at.desc()).all()
 
-    result = []
-    for s in submissions:
-        result.append({
-            "id": s.id,
-            "proposal_type": s.proposal_type.value,
-            "proposed_title": s.proposed_title,
+    return [serialize_list_item(s) for s in submissions]
+
 
-            # RETURN ALL FIELDS NEEDED IN LECTURER PANEL
+def serialize_list_item(s: Submission, include_text: bool = True) -> dict:
+    item = {
+        "id": s.id,
+        "proposal_type": s.proposal_type.value,
+        "proposed_title": s.proposed_title,
+    }
+
+    # RETURN ALL FIELDS NEEDED IN LECTURER PANEL
+    if include_text:
+        item.update({
             "background": s.background,
             "aim": s.aim,
             "objectives": s.objectives,
             "methods": s.methods,
             "expected_results": s.expected_results,
             "literature_review": s.literature_review,
+        })
 
-            "similarity_score": float(s.similarity_score or 0),
-            "ca_score": s.ca_score,
-            "student": {
-                "id": s.student.id,
-                "name": s.student.name,
-                "email": s.student.email,
-                "reg_number": s.student.reg_number
-            } if s.student else None,
-
-            "supervisor": {
-                "id": s.supervisor.id,
-                "name": s.supervisor.name,
-                "email": s.supervisor.email
-            } if s.supervisor else None,
+    item.update({
+        "similarity_score": float(s.similarity_score or 0),
+        "reference_score": float(s.reference_score or 0),
+        "ca_score": s.ca_score,
+        "student": {
+            "id": s.student.id,
+            "name": s.student.name,
+            "email": s.student.email,
+            "reg_number": s.student.reg_number
+        } if s.student else None,
+
+        "supervisor": {
+            "id": s.supervisor.id,
+            "name": s.supervisor.name,
+            "email": s.supervisor.email
+        } if s.supervisor else None,
+
+        "lecturer_decision": s.lecturer_decision,
+        "final_decision": s.final_decision,
+        "created_at": s.created_at,
+        "updated_at": s.updated_at,
+    })
+    return item
 
-            "lecturer_decision": s.lecturer_decision,
-            "final_decision": s.final_decision,
-            "created_at": s.created_at
-        })
 
-    return result
+# ============================================================
+#   DELTA SYNC - CHANGES SINCE A CURSOR
+# ============================================================
+@router.get("/submissions/changes")
+def get_submission_changes(
+    since: int = 0,
+    limit: int = 500,
+    include_text: bool = True,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Returns submissions created/updated/deleted after `since` (a cursor from
+    X-Change-Cursor on GET /submissions or from a previous call).
+    Deleted, or no longer visible to the caller, come back as ids in "deleted".
+    """
+    limit = max(1, min(limit, 1000))
+
+    log = db.query(SubmissionChange).filter(SubmissionChange.id > since)
+
+    if current_user.role == "lecturer":
+        log = log.filter(SubmissionChange.supervisor_id == current_user.id)
+    elif current_user.role == "student":
+        log = log.filter(SubmissionChange.student_id == current_user.id)
+
+    entries = log.order_by(SubmissionChange.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    if not entries:
+        return {"cursor": since, "has_more": False, "changed": [], "deleted": []}
+
+    # Only the latest state of each submission matters
+    touched = {e.submission_id for e in entries}
+
+    current = db.query(Submission).filter(Submission.id.in_(touched))
+    if current_user.role == "lecturer":
+        current = current.filter(Submission.supervisor_id == current_user.id)
+    elif current_user.role == "student":
+        current = current.filter(Submission.student_id == current_user.id)
+    current = {s.id: s for s in current}
+
+    hide_ca = False
+    if current_user.role == "student":
+        settings = db.query(Settings).first()
+        hide_ca = not (settings and settings.show_ca_to_students)
+
+    changed = []
+    for s in current.values():
+        item = serialize_list_item(s, include_text)
+        if hide_ca:
+            item["ca_score"] = None
+        changed.append(item)
+
+    return {
+        "cursor": entries[-1].id,
+        "has_more": has_more,
+        "changed": changed,
+        "deleted": sorted(touched - set(current)),
+    }
@@ -1,21 +1,27 @@
-from database import engine, Base, SessionLocal
-from models import User
-from passlib.hash import bcrypt
+"""
+Dev logins: one admin, two lecturers, two students. For production-scale
+data use datagen.py.
+"""
+from database import SessionLocal
+from models import User, Settings
+from migrate import run_migrations
+from utils_password import hash_password
 
 def seed():
-    Base.metadata.create_all(bind=engine)
+    run_migrations()
     db = SessionLocal()
     if not db.query(User).filter(User.email=='admin@uni.edu').first():
-        admin = User(name='Admin', email='admin@uni.edu', password_hash=bcrypt.hash('adminpass'), role='admin')
+        admin = User(name='Admin', email='admin@uni.edu', password_hash=hash_password('adminpass'), role='admin', is_approved=True)
         db.add(admin)
     if not db.query(User).filter(User.email=='lect1@uni.edu').first():
-        l1 = User(name='Dr. Ada', email='lect1@uni.edu', password_hash=bcrypt.hash('lectpass1'), role='lecturer')
-        l2 = User(name='Prof. Bassey', email='lect2@uni.edu', password_hash=bcrypt.hash('lectpass2'), role='lecturer')
+        l1 = User(name='Dr. Ada', email='lect1@uni.edu', password_hash=hash_password('lectpass1'), role='lecturer', is_approved=True)
+        l2 = User(name='Prof. Bassey', email='lect2@uni.edu', password_hash=hash_password('lectpass2'), role='lecturer', is_approved=True)
         db.add_all([l1,l2])
         db.commit()
     if not db.query(User).filter(User.email=='student1@uni.edu').first():
-        s1 = User(name='Jane Student', email='student1@uni.edu', password_hash=bcrypt.hash('studpass1'), role='student', reg_number='CSC/2025/001')
-        s2 = User(name='John Student', email='student2@uni.edu', password_hash=bcrypt.hash('studpass2'), role='student', reg_number='CSC/2025/002')
+        # reg_number is 6 digits (String(6))
+        s1 = User(name='Jane Student', email='student1@uni.edu', password_hash=hash_password('studpass1'), role='student', reg_number='250001', is_approved=True)
+        s2 = User(name='John Student', email='student2@uni.edu', password_hash=hash_password('studpass2'), role='student', reg_number='250002', is_approved=True)
         db.add_all([s1,s2])
         db.commit()
     l1 = db.query(User).filter(User.email=='lect1@uni.edu').first()
@@ -27,13 +33,13 @@ def seed():
     if l2 and s2 and l2 not in s2.supervisors:
         s2.supervisors.append(l2)
     # Ensure a single settings row exists
-        settings = db.query(Settings).first()
-        if not settings:
-            settings = Settings(
-                undergrad_mode="title",      # default as requested
-                postgrad_mode="title_plus"   # default as requested
-            )
-            db.add(settings)
+    settings = db.query(Settings).first()
+    if not settings:
+        settings = Settings(
+            undergrad_mode="title",      # default as requested
+            postgrad_mode="title_plus"   # default as requested
+        )
+        db.add(settings)
     db.commit()
     db.close()
     print('Seed complete')
@@ -0,0 +1,585 @@
+"""
+Hot/cold tiering. Final submissions (approved / rejected / closed) from
+past academic sessions move out of `submissions` into
+`archived_submissions`, with their text zlib-compressed. Lists, stats and
+the per-request similarity pass then only see the current session.
+
+Archived text still counts for similarity. Each archiving batch writes
+read-only index segments (`archive_segments`), one per proposal type and
+similarity mode, holding hashed term counts, so new text is vectorised
+without refitting anything. A run ends by merging each type and mode into
+a single segment, whose IDF then covers every archived document of it.
+The first process to load a segment writes its TF-IDF matrix to
+SEGMENT_CACHE_DIR as plain .npy files; every worker then memory-maps those,
+so the page cache holds one copy however many workers there are. New text
+is scored with one sparse product per segment.
+
+    python utils_archive.py                     # archive sessions before the current one
+    python utils_archive.py --before 2025-09-01 --dry-run
+    python utils_archive.py --compact           # merge segments, one per type and mode
+    python utils_archive.py --rebuild-segments  # rewrite segments from archived text
+"""
+import io
+import os
+import json
+import zlib
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session, defer
+from models import Submission, ArchivedSubmission, ArchiveSegment, ArchiveJob, SimilarityNeighbor
+from utils_neighbors import lock_type
+
+ACADEMIC_YEAR_START_MONTH = int(os.environ.get("ACADEMIC_YEAR_START_MONTH", "9"))
+ARCHIVE_BATCH = int(os.environ.get("ARCHIVE_BATCH", "2000"))
+ARCHIVE_DECISIONS = ("approved", "rejected", "closed")
+# A running job with no progress for this long is taken to have died with its worker
+ARCHIVE_JOB_STALE_SECONDS = int(os.environ.get("ARCHIVE_JOB_STALE_SECONDS", "1800"))
+HASH_FEATURES = 2 ** 18
+# Weighted segment matrices, memory-mapped by every worker (persistent volume, like the PDF cache)
+SEGMENT_CACHE_DIR = os.environ.get("SEGMENT_CACHE_DIR", os.path.join("data", "segment_cache"))
+_SEGMENT_ARRAYS = ("ids", "data", "indices", "indptr", "idf_cols", "idf")
+
+TEXT_FIELDS = ("background", "aim", "objectives", "methods", "expected_results", "literature_review")
+MODES = ("title", "title_plus")
+
+
+def academic_session(dt: datetime) -> str:
+    start = dt.year if dt.month >= ACADEMIC_YEAR_START_MONTH else dt.year - 1
+    return f"{start}/{start + 1}"
+
+
+def current_session_start(now: datetime = None) -> datetime:
+    now = now or datetime.utcnow()
+    year = now.year if now.month >= ACADEMIC_YEAR_START_MONTH else now.year - 1
+    return datetime(year, ACADEMIC_YEAR_START_MONTH, 1)
+
+
+def compress_text(sub) -> bytes:
+    return zlib.compress(json.dumps({f: getattr(sub, f) for f in TEXT_FIELDS}).encode(), 6)
+
+
+def decompress_text(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob)) if blob else {f: None for f in TEXT_FIELDS}
+
+
+def text_for_mode(mode: str, title: str, parts: list) -> str:
+    # Same as build_text_for_mode in routes_submissions
+    if mode == "title":
+        return title or ""
+    return " ".join(filter(None, [title] + list(parts)))
+
+
+# ============================================================
+#   SEGMENTS
+# ============================================================
+def _hasher():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    # Same tokens as the live TfidfVectorizer; counts only, weighting on load
+    return HashingVectorizer(n_features=HASH_FEATURES, stop_words="english", alternate_sign=False, norm=None)
+
+
+def _pack(ids, counts) -> bytes:
+    import numpy as np
+
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf, data=counts.data.astype(np.float32), indices=counts.indices.astype(np.int32),
+        indptr=counts.indptr.astype(np.int64), ids=np.asarray(ids, dtype=np.int64),
+    )
+    return buf.getvalue()
+
+
+def _unpack(payload: bytes) -> tuple:
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    z = np.load(io.BytesIO(payload))
+    ids = z["ids"]
+    return ids, csr_matrix((z["data"], z["indices"], z["indptr"]), shape=(len(ids), HASH_FEATURES))
+
+
+def _top_terms(counts, max_terms: int):
+    """Keeps each row's max_terms most frequent terms, which bounds a segment at rows x max_terms."""
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    lengths = np.diff(counts.indptr)
+    if lengths.max(initial=0) <= max_terms:
+        return counts
+
+    data, indices, indptr = [], [], [0]
+    for row in range(counts.shape[0]):
+        start, end = counts.indptr[row], counts.indptr[row + 1]
+        keep = np.arange(start, end)
+        if end - start > max_terms:
+            keep = np.sort(start + np.argpartition(counts.data[start:end], -max_terms)[-max_terms:])
+        data.append(counts.data[keep])
+        indices.append(counts.indices[keep])
+        indptr.append(indptr[-1] + len(keep))
+    return csr_matrix((np.concatenate(data), np.concatenate(indices), indptr), shape=counts.shape)
+
+
+def build_segment(ids: list, texts: list, max_terms: int = None) -> bytes:
+    """
+    Hashed term counts of texts, as .npz bytes, optionally capped at
+    max_terms distinct terms per text. IDF is applied when the segment is loaded.
+    """
+    counts = _hasher().transform(texts).tocsr()
+    if max_terms:
+        counts = _top_terms(counts, max_terms)
+    return _pack(ids, counts)
+
+
+def merge_segments(payloads) -> tuple:
+    """(doc count, payload) of one segment holding the documents of all `payloads`."""
+    import numpy as np
+    from scipy.sparse import vstack
+
+    ids, counts = [], []
+    for payload in payloads:
+        seg_ids, seg_counts = _unpack(payload)
+        ids.append(seg_ids)
+        counts.append(seg_counts)
+    return sum(len(i) for i in ids), _pack(np.concatenate(ids), vstack(counts, format="csr"))
+
+
+class _Segment:
+    """
+    TF-IDF (smooth idf, l2 rows, as TfidfVectorizer does) of one segment's
+    counts. The IDF is kept for the segment's own terms only; query terms
+    it has never seen get the idf of df=0.
+    """
+
+    def __init__(self, ids, matrix, idf_cols, idf):
+        import numpy as np
+
+        self.ids, self.matrix, self.idf_cols, self.idf = ids, matrix, idf_cols, idf
+        self.unseen_idf = np.float32(np.log(1 + len(ids)) + 1)
+
+    @classmethod
+    def build(cls, payload: bytes):
+        import numpy as np
+        from sklearn.preprocessing import normalize
+
+        ids, counts = _unpack(payload)
+        df = np.bincount(counts.indices, minlength=HASH_FEATURES)
+        idf_cols = np.flatnonzero(df).astype(np.int32)
+        idf = (np.log((1 + len(ids)) / (1 + df[idf_cols])) + 1).astype(np.float32)
+
+        counts.data *= idf[np.searchsorted(idf_cols, counts.indices)]
+        return cls(ids, normalize(counts), idf_cols, idf)
+
+    @classmethod
+    def open(cls, path: str, payload):
+        """
+        Memory-maps the segment cached at path. On a miss it is built from
+        payload() (read from the DB only then) and cached for the other workers.
+        """
+        try:
+            return cls._mmap(path)
+        except FileNotFoundError:
+            pass
+
+        seg = cls.build(payload())
+        try:
+            seg._save(path)
+            return cls._mmap(path)
+        except OSError as e:
+            print(f"⚠️ Segment cache unavailable, keeping {path} in memory: {e}")
+            return seg
+
+    @classmethod
+    def _mmap(cls, path: str):
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        a = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _SEGMENT_ARRAYS}
+        matrix = csr_matrix((a["data"], a["indices"], a["indptr"]),
+                            shape=(len(a["ids"]), HASH_FEATURES), copy=False)
+        return cls(a["ids"], matrix, a["idf_cols"], a["idf"])
+
+    def _save(self, path: str):
+        import numpy as np
+
+        # Written to a temp directory then renamed, so readers never see half a segment
+        os.makedirs(SEGMENT_CACHE_DIR, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=SEGMENT_CACHE_DIR, prefix=".tmp-")
+        arrays = {
+            "ids": self.ids, "data": self.matrix.data, "indices": self.matrix.indices,
+            "indptr": self.matrix.indptr, "idf_cols": self.idf_cols, "idf": self.idf,
+        }
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), array)
+            os.rename(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(path):   # otherwise another worker got there first
+                raise
+
+    def _query(self, counts):
+        """Hashed counts -> l2-normalised TF-IDF rows under this segment's IDF."""
+        from sklearn.preprocessing import normalize
+
+        q = counts.tocsr().astype("float32")
+        q.data *= self._weights(q.indices)
+        return normalize(q)
+
+    def _weights(self, cols):
+        import numpy as np
+
+        if not len(self.idf_cols):
+            return np.full(len(cols), self.unseen_idf)
+        pos = np.minimum(np.searchsorted(self.idf_cols, cols), len(self.idf_cols) - 1)
+        return np.where(self.idf_cols[pos] == cols, self.idf[pos], self.unseen_idf)
+
+    def best(self, query) -> tuple:
+        """query: hashed counts (1 x HASH_FEATURES). Returns (cosine, document id)."""
+        sims = (self.matrix @ self._query(query).T).toarray().ravel()
+        if not len(sims):
+            return 0.0, None
+        i = int(sims.argmax())
+        return float(sims[i]), int(self.ids[i])
+
+    def best_many(self, queries, chunk_nnz: int = 2_000_000):
+        """Best cosine for each row of queries (n x HASH_FEATURES counts), in row chunks."""
+        import numpy as np
+
+        q = self._query(queries)
+        out = np.zeros(q.shape[0], dtype=np.float32)
+        if not len(self.ids):
+            return out
+        step = max(1, chunk_nnz // len(self.ids))
+        for start in range(0, q.shape[0], step):
+            out[start:start + step] = (q[start:start + step] @ self.matrix.T).max(axis=1).toarray().ravel()
+        return out
+
+
+class ArchiveIndex:
+    """
+    Archive segments per (proposal_type, mode), loaded once per process.
+    Segments are immutable; compact() replaces a key's segments with one,
+    and refresh() notices both new and removed segments.
+    """
+
+    model = ArchiveSegment
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = {}      # segment cache path (id + created_at) -> (key, _Segment)
+        self._segments = {}    # key -> [_Segment]
+
+    def _key(self, seg):
+        return (seg.proposal_type, seg.mode)
+
+    def _fields(self, key) -> dict:
+        return {"proposal_type": key[0], "mode": key[1]}
+
+    def _rows(self, db: Session):
+        # Key columns only; payloads are read for segments not loaded yet
+        return db.query(self.model).options(defer(self.model.payload)).order_by(self.model.id).all()
+
+    def _cache_path(self, row) -> str:
+        # created_at too: rebuild_segments starts the ids over
+        stamp = row.created_at.strftime("%Y%m%d%H%M%S%f") if row.created_at else "0"
+        return os.path.join(SEGMENT_CACHE_DIR, f"{self.model.__tablename__}-{row.id}-{stamp}")
+
+    def _prune_cache(self, keep: set):
+        prefix = f"{self.model.__tablename__}-"
+        try:
+            names = os.listdir(SEGMENT_CACHE_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(SEGMENT_CACHE_DIR, name)
+            if name.startswith(prefix) and path not in keep:
+                # Workers still mapping it keep their pages until they refresh
+                shutil.rmtree(path, ignore_errors=True)
+
+    def refresh(self, db: Session):
+        paths = {self._cache_path(r): r for r in self._rows(db)}
+        if set(paths) == set(self._loaded):
+            return
+
+        # Load outside the lock; lookups keep using the current segments meanwhile
+        loaded = {
+            path: self._loaded.get(path) or (self._key(r), _Segment.open(path, lambda r=r: r.payload))
+            for path, r in paths.items()
+        }
+        segments = {}
+        for key, seg in loaded.values():
+            segments.setdefault(key, []).append(seg)
+        with self._lock:
+            self._loaded, self._segments = loaded, segments
+        self._prune_cache(set(paths))
+
+    def _best(self, db: Session, text: str, key) -> tuple:
+        self.refresh(db)
+        segments = self._segments.get(key)
+        if not segments or not text:
+            return 0.0, None
+
+        query = _hasher().transform([text])
+        best, best_id = 0.0, None
+        for seg in segments:
+            sim, sid = seg.best(query)
+            if sim > best:
+                best, best_id = sim, sid
+        return round(best * 100, 2), best_id
+
+    def best_match(self, db: Session, text: str, proposal_type: str, mode: str) -> tuple:
+        """(score %, archived submission id) of the closest archived proposal."""
+        return self._best(db, text, (proposal_type, mode))
+
+    def best_scores(self, db: Session, texts: list, proposal_type: str, mode: str):
+        """best_match scores (%) for many texts at once, as a numpy array."""
+        import numpy as np
+
+        self.refresh(db)
+        scores = np.zeros(len(texts), dtype=np.float32)
+        segments = self._segments.get((proposal_type, mode))
+        if segments and texts:
+            queries = _hasher().transform(texts)
+            for seg in segments:
+                np.maximum(scores, seg.best_many(queries), out=scores)
+        return np.round(scores.astype(np.float64) * 100, 2)
+
+    def compact(self, db: Session) -> int:
+        """
+        Merges each key's segments into one, so a lookup is one product per
+        key and the IDF covers every document of the key. Returns the number
+        of segments removed.
+        """
+        groups = {}
+        for row in self._rows(db):
+            groups.setdefault(self._key(row), []).append(row.id)
+
+        removed = 0
+        for key, seg_ids in groups.items():
+            if len(seg_ids) < 2:
+                continue
+            payloads = (p for (p,) in db.query(self.model.payload)
+                        .filter(self.model.id.in_(seg_ids)).order_by(self.model.id).yield_per(1))
+            doc_count, payload = merge_segments(payloads)
+            db.add(self.model(**self._fields(key), doc_count=doc_count, payload=payload))
+            db.execute(delete(self.model).where(self.model.id.in_(seg_ids)))
+            db.commit()
+            removed += len(seg_ids) - 1
+        return removed
+
+
+archive_index = ArchiveIndex()
+
+
+# ============================================================
+#   ARCHIVING
+# ============================================================
+def _archivable(db: Session, before: datetime):
+    return db.query(Submission).filter(
+        Submission.created_at < before,
+        func.lower(Submission.final_decision).in_(ARCHIVE_DECISIONS),
+    )
+
+
+def _add_segments(db: Session, docs: list):
+    """docs: (proposal_type, id, title, {text field: value}). One segment per type and mode."""
+    by_type = {}
+    for ptype, doc_id, title, fields in docs:
+        by_type.setdefault(ptype, []).append((doc_id, title, [fields.get(f) for f in TEXT_FIELDS]))
+
+    for ptype, group in by_type.items():
+        for mode in MODES:
+            db.add(ArchiveSegment(
+                proposal_type=ptype, mode=mode, doc_count=len(group),
+                payload=build_segment([d[0] for d in group], [text_for_mode(mode, d[1], d[2]) for d in group]),
+            ))
+
+
+def archive_submissions(db: Session, before: datetime = None, dry_run: bool = False, progress=None) -> dict:
+    """
+    Moves final submissions created before `before` (default: start of the
+    current session) to the archive, ARCHIVE_BATCH rows per transaction.
+    progress(done, total) is called after each batch. Returns {proposal_type: count}.
+
+    Each batch holds one proposal type and takes that type's lock_type, so
+    a concurrent submit/update cannot attach neighbours to rows being moved
+    out. Without the lock (SQLite) a neighbour written in that window is
+    swept at the end.
+    """
+    from utils_pdf_cache import invalidate_submission
+
+    before = before or current_session_start()
+    counts = {}
+    for ptype, n in (_archivable(db, before).with_entities(Submission.proposal_type, func.count())
+                     .group_by(Submission.proposal_type)):
+        counts[getattr(ptype, "value", ptype)] = n
+    if dry_run:
+        return counts
+
+    by_type = {}
+    for sid, ptype in (_archivable(db, before).with_entities(Submission.id, Submission.proposal_type)
+                       .order_by(Submission.id)):
+        by_type.setdefault(getattr(ptype, "value", ptype), []).append(sid)
+    batches = [(ptype, ids[start:start + ARCHIVE_BATCH])
+               for ptype, ids in by_type.items()
+               for start in range(0, len(ids), ARCHIVE_BATCH)]
+    total, done = sum(len(ids) for ids in by_type.values()), 0
+
+    for ptype, chunk in batches:
+        lock_type(db, ptype)
+        subs = db.query(Submission).filter(Submission.id.in_(chunk)).all()
+
+        for sub in subs:
+            db.add(ArchivedSubmission(
+                id=sub.id,
+                session=academic_session(sub.created_at),
+                student_id=sub.student_id,
+                supervisor_id=sub.supervisor_id,
+                proposal_type=getattr(sub.proposal_type, "value", sub.proposal_type),
+                proposed_title=sub.proposed_title,
+                text_z=compress_text(sub),
+                similarity_score=sub.similarity_score,
+                lecturer_decision=sub.lecturer_decision,
+                final_decision=sub.final_decision,
+                ca_score=sub.ca_score,
+                created_at=sub.created_at,
+                lecturer_decision_at=sub.lecturer_decision_at,
+            ))
+
+        _add_segments(db, [
+            (getattr(s.proposal_type, "value", s.proposal_type), s.id, s.proposed_title,
+             {f: getattr(s, f) for f in TEXT_FIELDS})
+            for s in subs
+        ])
+
+        # Live rows keep scores that came from archived matches; only the lists
+        # go, so the best archived pair moves to archive_score
+        N = SimilarityNeighbor
+        for sid, score in (db.query(N.submission_id, func.max(N.score))
+                           .filter(N.neighbor_id.in_(chunk), N.submission_id.notin_(chunk))
+                           .group_by(N.submission_id)):
+            db.query(Submission).filter(
+                Submission.id == sid, func.coalesce(Submission.archive_score, 0) < score
+            ).update({Submission.archive_score: score}, synchronize_session=False)
+        db.execute(delete(SimilarityNeighbor).where(or_(
+            SimilarityNeighbor.submission_id.in_(chunk), SimilarityNeighbor.neighbor_id.in_(chunk)
+        )))
+        for sub in subs:
+            db.delete(sub)
+        db.commit()
+
+        for sid in chunk:
+            invalidate_submission(sid)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+
+    if total:
+        live = select(Submission.id)
+        db.execute(delete(SimilarityNeighbor).where(or_(
+            SimilarityNeighbor.submission_id.notin_(live), SimilarityNeighbor.neighbor_id.notin_(live)
+        )))
+        db.commit()
+        archive_index.compact(db)
+    return counts
+
+
+def rebuild_segments(db: Session) -> int:
+    """
+    Rewrites archive_segments from the archived text, ARCHIVE_BATCH rows at
+    a time, then compacts. Archived matches are incomplete until it finishes.
+    """
+    db.execute(delete(ArchiveSegment))
+    db.commit()
+
+    last_id, total = 0, 0
+    while True:
+        rows = (db.query(ArchivedSubmission).filter(ArchivedSubmission.id > last_id)
+                .order_by(ArchivedSubmission.id).limit(ARCHIVE_BATCH).all())
+        if not rows:
+            break
+        _add_segments(db, [(a.proposal_type, a.id, a.proposed_title, decompress_text(a.text_z)) for a in rows])
+        last_id, total = rows[-1].id, total + len(rows)
+        db.commit()
+        db.expunge_all()
+
+    archive_index.compact(db)
+    return total
+
+
+# ============================================================
+#   BACKGROUND JOBS (POST /admin/archive)
+# ============================================================
+def running_job(db: Session):
+    cutoff = datetime.utcnow() - timedelta(seconds=ARCHIVE_JOB_STALE_SECONDS)
+    return (db.query(ArchiveJob)
+            .filter(ArchiveJob.status == "running", ArchiveJob.updated_at >= cutoff)
+            .first())
+
+
+def _run_job(job_id: int, before: datetime):
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        job = db.query(ArchiveJob).filter(ArchiveJob.id == job_id).first()
+
+        def progress(done, total):
+            job.done, job.total, job.updated_at = done, total, datetime.utcnow()
+            db.commit()
+
+        try:
+            counts = archive_submissions(db, before, progress=progress)
+            job.status, job.by_type = "done", json.dumps(counts)
+        except Exception as e:
+            db.rollback()
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            print("❌ Archive job error:", e)
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def start_archive_job(db: Session, before: datetime, requested_by: int) -> ArchiveJob:
+    """Records a job and archives in a background thread. One job at a time."""
+    job = ArchiveJob(before=before or current_session_start(), requested_by=requested_by)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    threading.Thread(target=_run_job, args=(job.id, job.before), name=f"archive-{job.id}", daemon=True).start()
+    return job
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Archive final submissions from past sessions")
+    parser.add_argument("--before", help="YYYY-MM-DD (default: start of the current session)")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--compact", action="store_true", help="Only merge segments, one per type and mode")
+    parser.add_argument("--rebuild-segments", action="store_true", help="Only rewrite segments from archived text")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        if args.compact:
+            print(f"✅ Compacted archive segments, {archive_index.compact(session)} removed")
+            raise SystemExit
+        if args.rebuild_segments:
+            print(f"✅ Rebuilt archive segments over {rebuild_segments(session)} submissions")
+            raise SystemExit
+        cutoff = datetime.fromisoformat(args.before) if args.before else None
+        result = archive_submissions(
+            session, cutoff, args.dry_run,
+            progress=lambda done, total: print(f"🗄 Archived {done}/{total} submissions"),
+        )
+        verb = "Would archive" if args.dry_run else "Archived"
+        print(f"✅ {verb} {sum(result.values())} submissions: {result}")
+    finally:
+        session.close()
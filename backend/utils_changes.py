@@ -0,0 +1,153 @@
+from fastapi import Request, Response
+from datetime import datetime
+from sqlalchemy import event, func, insert as sa_insert, inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import ChangeCounter, Submission, SubmissionChange, User
+
+USERS_SCOPE = "users"
+SUBMISSIONS_SCOPE = "submissions"
+
+
+def supervisor_scope(supervisor_id) -> str:
+    return f"submissions:supervisor:{supervisor_id}"
+
+
+def student_scope(student_id) -> str:
+    return f"submissions:student:{student_id}"
+
+
+def submissions_scope_for(user: User) -> str:
+    """The counter that covers everything `user` sees in GET /submissions."""
+    if user.role == "lecturer":
+        return supervisor_scope(user.id)
+    if user.role == "student":
+        return student_scope(user.id)
+    return SUBMISSIONS_SCOPE
+
+
+def _attr_values(obj, attr) -> set:
+    """Current and (if changed in this flush) previous values of obj.attr."""
+    hist = sa_inspect(obj).attrs[attr].history
+    values = set(hist.added) | set(hist.deleted) | set(hist.unchanged)
+    if not values:
+        values.add(getattr(obj, attr))
+    return {v for v in values if v is not None}
+
+
+def _previous_value(obj, attr):
+    """Value before this flush if attr changed, else None."""
+    hist = sa_inspect(obj).attrs[attr].history
+    return hist.deleted[0] if hist.deleted else None
+
+
+def _change_log_rows(obj, deleted: bool) -> list:
+    now = datetime.utcnow()
+    row = dict(
+        submission_id=obj.id,
+        student_id=obj.student_id,
+        supervisor_id=obj.supervisor_id,
+        op="delete" if deleted else "upsert",
+        changed_at=now,
+    )
+    rows = [row]
+
+    # Re-assigned: the previous owner must see it disappear
+    old_supervisor = _previous_value(obj, "supervisor_id")
+    old_student = _previous_value(obj, "student_id")
+    if not deleted and (old_supervisor is not None or old_student is not None):
+        rows.insert(0, dict(
+            row,
+            student_id=old_student if old_student is not None else obj.student_id,
+            supervisor_id=old_supervisor if old_supervisor is not None else obj.supervisor_id,
+            op="delete",
+        ))
+    return rows
+
+
+def _scopes_for(obj) -> set:
+    if isinstance(obj, Submission):
+        scopes = {SUBMISSIONS_SCOPE}
+        scopes |= {supervisor_scope(v) for v in _attr_values(obj, "supervisor_id")}
+        scopes |= {student_scope(v) for v in _attr_values(obj, "student_id")}
+        return scopes
+    if isinstance(obj, User):
+        return {USERS_SCOPE}
+    return set()
+
+
+def bump(connection, scopes):
+    """Increments (or creates) counters for scopes inside the current transaction."""
+    dialect = connection.dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    for scope in sorted(scopes):   # fixed order avoids lock-order deadlocks
+        stmt = insert(ChangeCounter).values(scope=scope, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChangeCounter.scope],
+            set_={"version": ChangeCounter.version + 1}
+        )
+        connection.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    """
+    Bumps change counters and appends to the submission change log in the
+    same transaction as the write. Session state and attribute history
+    still describe this flush at this point, and new rows have ids.
+
+    Counters are bumped before the log rows are inserted. Every submission
+    write bumps SUBMISSIONS_SCOPE, whose row lock is held until commit, so
+    log ids are handed out in commit order. A client that has seen id N can
+    never later receive a commit with an id below N, which the `since`
+    cursors of /submissions/changes and TitleIndex rely on.
+    """
+    scopes = set()
+    log_rows = []
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        deleted = obj in session.deleted
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        scopes |= _scopes_for(obj)
+        if isinstance(obj, Submission):
+            log_rows += _change_log_rows(obj, deleted)
+
+    connection = session.connection()
+    if scopes:
+        bump(connection, scopes)
+    if log_rows:
+        connection.execute(sa_insert(SubmissionChange), log_rows)
+
+
+def latest_change_id(db: Session) -> int:
+    return db.query(func.max(SubmissionChange.id)).scalar() or 0
+
+
+def current_version(db: Session, scope: str) -> int:
+    return db.query(ChangeCounter.version).filter(ChangeCounter.scope == scope).scalar() or 0
+
+
+def _etags(header: str) -> list:
+    """Entity tags of an If-None-Match header; weak tags compare by their opaque part."""
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+
+def check_not_modified(request: Request, response: Response, db: Session, *scopes: str):
+    """
+    Sets ETag / Cache-Control on response from the change counters of
+    `scopes` (every scope the payload depends on, e.g. users for the names
+    in a submission list). Returns a 304 Response when the client's copy is
+    current - callers return it straight away and skip the list query.
+    """
+    versions = dict(db.query(ChangeCounter.scope, ChangeCounter.version).filter(ChangeCounter.scope.in_(scopes)))
+    etag = '"' + ";".join(f"{scope}:{versions.get(scope) or 0}" for scope in scopes) + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    client_etags = _etags(request.headers.get("if-none-match", ""))
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
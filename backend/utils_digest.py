@@ -0,0 +1,134 @@
+import os
+from datetime import datetime, timedelta
+from html import escape
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import SupervisorDigestItem, Submission, User
+from utils_email import queue_email, email_dispatcher
+
+# When enabled, supervisors get one email listing new submissions
+# instead of one email per submission.
+SUPERVISOR_DIGEST = os.environ.get("SUPERVISOR_DIGEST", "false").lower() == "true"
+DIGEST_INTERVAL_MINUTES = int(os.environ.get("DIGEST_INTERVAL_MINUTES", "60"))
+DIGEST_MAX_ITEMS = int(os.environ.get("DIGEST_MAX_ITEMS", "20"))
+
+# High-similarity submissions can still be reported straight away
+DIGEST_URGENT_IMMEDIATE = os.environ.get("DIGEST_URGENT_IMMEDIATE", "true").lower() == "true"
+HIGH_SIMILARITY_THRESHOLD = float(os.environ.get("HIGH_SIMILARITY_THRESHOLD", "70"))
+
+
+def _queue_single_notice(db: Session, supervisor: User, student: User, submission: Submission):
+    similarity = submission.similarity_score
+    warn = '<p style="color:red"><b>⚠ High similarity detected</b></p>' if similarity >= HIGH_SIMILARITY_THRESHOLD else ""
+    queue_email(
+        db,
+        supervisor.email,
+        f"New submission from {student.reg_number or student.email}",
+        f"""
+        <p>Student <b>{student.name} ({student.reg_number})</b> submitted a {submission.proposal_type.value}.</p>
+        <p>Similarity: <b>{similarity}%</b>.</p>
+        {warn}
+        <p>Please log in to review.</p>
+        """
+    )
+
+
+def notify_supervisor(db: Session, supervisor: User, student: User, submission: Submission):
+    """
+    Queues the supervisor's notice for a new submission - either as its own
+    email or as a digest item. Caller commits.
+    """
+    urgent = submission.similarity_score >= HIGH_SIMILARITY_THRESHOLD
+
+    if not SUPERVISOR_DIGEST or (urgent and DIGEST_URGENT_IMMEDIATE):
+        _queue_single_notice(db, supervisor, student, submission)
+        return
+
+    db.add(SupervisorDigestItem(
+        supervisor_id=supervisor.id,
+        submission_id=submission.id,
+        student_name=student.name,
+        student_reg_number=student.reg_number,
+        proposal_type=submission.proposal_type.value,
+        proposed_title=submission.proposed_title,
+        similarity=submission.similarity_score,
+    ))
+    db.flush()
+
+    pending = db.query(func.count(SupervisorDigestItem.id)).filter(
+        SupervisorDigestItem.supervisor_id == supervisor.id
+    ).scalar()
+
+    # Size threshold reached -> send now rather than waiting for the schedule
+    if pending >= DIGEST_MAX_ITEMS:
+        flush_supervisor_digest(db, supervisor.id)
+
+
+def _digest_html(supervisor: User, items: list) -> str:
+    rows = []
+    for i in items:
+        flag = ' style="color:red;font-weight:bold"' if i.similarity >= HIGH_SIMILARITY_THRESHOLD else ""
+        rows.append(
+            f"<tr><td>{escape(i.student_name or '')} ({escape(i.student_reg_number or '')})</td>"
+            f"<td>{escape(i.proposal_type or '')}</td>"
+            f"<td>{escape(i.proposed_title or '')}</td>"
+            f"<td{flag}>{i.similarity}%</td></tr>"
+        )
+
+    return f"""
+    <p>Hello {escape(supervisor.name)},</p>
+    <p>{len(items)} new submission(s) are waiting for your review:</p>
+    <table border="1" cellpadding="6" cellspacing="0" style="border-collapse:collapse">
+        <tr><th>Student</th><th>Type</th><th>Title</th><th>Similarity</th></tr>
+        {''.join(rows)}
+    </table>
+    <p>Similarity at or above {HIGH_SIMILARITY_THRESHOLD:g}% is highlighted in red.</p>
+    <p>Please log in to review.</p>
+    """
+
+
+def flush_supervisor_digest(db: Session, supervisor_id: int) -> int:
+    """Turns a supervisor's pending items into one outbox email. Caller commits."""
+    items = (
+        db.query(SupervisorDigestItem)
+        .filter(SupervisorDigestItem.supervisor_id == supervisor_id)
+        .order_by(SupervisorDigestItem.id)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not items:
+        return 0
+
+    supervisor = db.query(User).filter(User.id == supervisor_id).first()
+    if supervisor:
+        queue_email(
+            db,
+            supervisor.email,
+            f"{len(items)} new submission(s) to review",
+            _digest_html(supervisor, items)
+        )
+
+    for i in items:
+        db.delete(i)
+
+    return len(items)
+
+
+def flush_due_digests(db: Session):
+    """Sends digests whose oldest item has waited DIGEST_INTERVAL_MINUTES."""
+    cutoff = datetime.utcnow() - timedelta(minutes=DIGEST_INTERVAL_MINUTES)
+
+    due = (
+        db.query(SupervisorDigestItem.supervisor_id)
+        .group_by(SupervisorDigestItem.supervisor_id)
+        .having(func.min(SupervisorDigestItem.created_at) <= cutoff)
+        .all()
+    )
+
+    for (supervisor_id,) in due:
+        flush_supervisor_digest(db, supervisor_id)
+
+    db.commit()
+
+
+email_dispatcher.add_hook(flush_due_digests)
@@ -1,44 +1,272 @@
 import os
-from mailjet_rest import Client
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import EmailOutbox
+from utils_metrics import Counter, Gauge, Histogram
 
 MAILJET_API_KEY = os.environ.get("MAILJET_API_KEY")
 MAILJET_SECRET_KEY = os.environ.get("MAILJET_SECRET_KEY")
 MAILJET_SENDER = os.environ.get("MAILJET_SENDER")   # e.g. noreply@yourdomain.com
 
+# "mailjet" in production, "local" keeps messages in memory (tests / dev)
+EMAIL_TRANSPORT = os.environ.get("EMAIL_TRANSPORT", "mailjet")
+
+EMAIL_BATCH_SIZE = int(os.environ.get("EMAIL_BATCH_SIZE", "50"))        # Mailjet v3.1 limit
+EMAIL_MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_POLL_SECONDS = float(os.environ.get("EMAIL_POLL_SECONDS", "5"))
+EMAIL_RETRY_BASE_SECONDS = int(os.environ.get("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = 3600
+# A claimed batch not finished within this is handed to another worker
+EMAIL_LEASE_SECONDS = int(os.environ.get("EMAIL_LEASE_SECONDS", "300"))
+
+
+def _outbox_depth() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(EmailOutbox).filter(EmailOutbox.status == "pending").count()
+    finally:
+        db.close()
+
+
+email_outbox_depth = Gauge("email_outbox_pending", "Emails waiting in the outbox", fn=_outbox_depth)
+email_delivery_seconds = Histogram(
+    "email_delivery_seconds", "Time from queueing an email to Mailjet accepting it",
+    buckets=(1, 5, 10, 30, 60, 300, 900, 3600, 14400)
+)
+email_failures = Counter("email_failures_total", "Emails given up on after EMAIL_MAX_ATTEMPTS")
+
+
+def build_message(to_email: str, subject: str, body_html: str) -> dict:
+    return {
+        "From": {
+            "Email": MAILJET_SENDER,
+            "Name": "Research Submission System"
+        },
+        "To": [
+            {"Email": to_email}
+        ],
+        "Subject": subject,
+        "HTMLPart": body_html
+    }
+
+
+# ============================================================
+#   TRANSPORTS
+# ============================================================
+class MailjetTransport:
+    """One Mailjet client (and HTTP session) for the whole process."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                # Imported here: requests + mailjet_rest are only needed when sending
+                from mailjet_rest import Client
+                self._client = Client(auth=(MAILJET_API_KEY, MAILJET_SECRET_KEY), version='v3.1')
+            return self._client
+
+    def send_batch(self, messages: list[dict]) -> list:
+        """
+        Sends up to EMAIL_BATCH_SIZE messages in one API call.
+        Returns one error string (or None on success) per message, in order.
+        """
+        if not MAILJET_API_KEY or not MAILJET_SECRET_KEY or not MAILJET_SENDER:
+            return ["Mailjet settings missing"] * len(messages)
+
+        try:
+            result = self._get_client().send.create(data={"Messages": messages})
+        except Exception as e:
+            return [f"Mailjet request failed: {e}"] * len(messages)
+
+        try:
+            statuses = result.json().get("Messages") or []
+        except ValueError:
+            statuses = []
+
+        if len(statuses) != len(messages):
+            if result.status_code in (200, 201):
+                return [None] * len(messages)
+            return [f"Mailjet error {result.status_code}: {result.text[:500]}"] * len(messages)
+
+        return [
+            None if s.get("Status") == "success" else str(s.get("Errors") or s)[:500]
+            for s in statuses
+        ]
+
+
+class LocalTransport:
+    """Stand-in transport: keeps messages in memory instead of sending."""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: list[dict]) -> list:
+        with self._lock:
+            self.sent.extend(messages)
+        for m in messages:
+            print(f"📨 [local] {m['To'][0]['Email']}: {m['Subject']}")
+        return [None] * len(messages)
+
+
+transport = LocalTransport() if EMAIL_TRANSPORT == "local" else MailjetTransport()
+
+
 def send_email(to_email: str, subject: str, body_html: str):
+    """Sends one email immediately, bypassing the outbox."""
+    error = transport.send_batch([build_message(to_email, subject, body_html)])[0]
 
-    if not MAILJET_API_KEY or not MAILJET_SECRET_KEY or not MAILJET_SENDER:
-        print("❌ Mailjet settings missing — email not sent.")
+    if error:
+        print("❌ Failed sending email:", error)
         return False
 
-    try:
-        mailjet = Client(auth=(MAILJET_API_KEY, MAILJET_SECRET_KEY), version='v3.1')
-
-        data = {
-            'Messages': [
-                {
-                    "From": {
-                        "Email": MAILJET_SENDER,
-                        "Name": "Research Submission System"
-                    },
-                    "To": [
-                        {"Email": to_email}
-                    ],
-                    "Subject": subject,
-                    "HTMLPart": body_html
-                }
-            ]
-        }
-
-        result = mailjet.send.create(data=data)
-
-        if result.status_code in (200, 201):
-            print(f"📨 Email sent to {to_email}")
-            return True
+    print(f"📨 Email sent to {to_email}")
+    return True
+
+
+# ============================================================
+#   OUTBOX
+# ============================================================
+def queue_email(db: Session, to_email: str, subject: str, body_html: str):
+    """
+    Adds an email to the outbox. It is delivered once the caller commits
+    (call email_dispatcher.wake() after the commit to skip the poll delay).
+    """
+    db.add(EmailOutbox(to_email=to_email, subject=subject, body_html=body_html))
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS))
+
+
+def _claim_batch(db: Session, limit: int) -> list:
+    """
+    Marks up to `limit` due messages as "sending" with a lease and commits,
+    so no row lock is held while Mailjet is called. Rows whose lease ran out
+    (the worker died mid-send) are due again.
+    """
+    now = datetime.utcnow()
+    batch = (
+        db.query(EmailOutbox)
+        .filter(or_(
+            and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == "sending", EmailOutbox.lease_until <= now),
+        ))
+        .order_by(EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    lease = now + timedelta(seconds=EMAIL_LEASE_SECONDS)
+    for msg in batch:
+        msg.status = "sending"
+        msg.lease_until = lease
+    db.commit()
+    return batch
+
+
+def deliver_pending(db: Session, limit: int = EMAIL_BATCH_SIZE) -> int:
+    """
+    Sends one batch of due outbox messages. Returns how many were attempted.
+    Rows are claimed with SKIP LOCKED and a lease in their own short
+    transaction, then updated once the send returns.
+    """
+    batch = _claim_batch(db, limit)
+    if not batch:
+        return 0
+
+    errors = transport.send_batch([build_message(m.to_email, m.subject, m.body_html) for m in batch])
+
+    now = datetime.utcnow()
+    for msg, error in zip(batch, errors):
+        msg.attempts = (msg.attempts or 0) + 1
+        msg.lease_until = None
+        if error is None:
+            msg.status = "sent"
+            msg.sent_at = now
+            msg.last_error = None
+            if msg.created_at:
+                email_delivery_seconds.observe((now - msg.created_at).total_seconds())
+        elif msg.attempts >= EMAIL_MAX_ATTEMPTS:
+            msg.status = "failed"
+            msg.last_error = error
+            email_failures.inc()
+            print(f"❌ Giving up on email {msg.id} to {msg.to_email}:", error)
         else:
-            print("❌ Mailjet Error:", result.json())
-            return False
+            msg.status = "pending"
+            msg.next_attempt_at = now + _retry_delay(msg.attempts)
+            msg.last_error = error
 
-    except Exception as e:
-        print("❌ Failed sending email:", e)
-        return False
+    db.commit()
+
+    sent = sum(1 for e in errors if e is None)
+    print(f"📨 Outbox batch: {sent}/{len(batch)} sent")
+    return len(batch)
+
+
+class OutboxDispatcher:
+    """Background thread that drains the outbox, waking early on wake()."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._hooks = []
+
+    def add_hook(self, fn):
+        """fn(db) runs before each delivery pass, e.g. to queue scheduled emails."""
+        self._hooks.append(fn)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            for hook in self._hooks:
+                try:
+                    hook(db)
+                except Exception as e:
+                    db.rollback()
+                    print("❌ Email outbox hook error:", e)
+
+            total = 0
+            # Keep going while full batches come back
+            while True:
+                n = deliver_pending(db)
+                total += n
+                if n < EMAIL_BATCH_SIZE:
+                    return total
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                print("❌ Email outbox error:", e)
+            self._wake.wait(EMAIL_POLL_SECONDS)
+
+
+email_dispatcher = OutboxDispatcher()
@@ -0,0 +1,225 @@
+import os
+import json
+import asyncio
+import select
+import threading
+from sqlalchemy import event, inspect as sa_inspect, text
+from sqlalchemy.orm import Session
+from database import engine
+from models import Submission
+
+# memory: one process only. postgres: fan out across workers with LISTEN/NOTIFY.
+EVENT_BROKER = os.environ.get("EVENT_BROKER", "memory")
+EVENT_CHANNEL = "submission_events"
+
+# Events buffered per connection before it is told to resync instead
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "100"))
+
+DECISION_FIELDS = ("lecturer_decision", "admin_decision", "final_decision")
+
+
+# ============================================================
+#   SUBSCRIBERS (per process)
+# ============================================================
+class Subscriber:
+    def __init__(self, user, loop):
+        self.user_id = user.id
+        self.role = user.role
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+    def wants(self, evt: dict) -> bool:
+        return self.role == "admin" or self.user_id in evt.get("audience", ())
+
+    def offer(self, evt: dict):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(evt)
+        except asyncio.QueueFull:
+            # Slow client: drop what it has and ask it to resync via /submissions/changes
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class EventHub:
+    """Delivers events to the SSE connections held by this process."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user) -> Subscriber:
+        sub = Subscriber(user, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def dispatch(self, evt: dict):
+        # Called from request threads or the broker listener thread
+        with self._lock:
+            targets = [s for s in self._subscribers if s.wants(evt)]
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, evt)
+            except RuntimeError:
+                # Loop already closed (shutdown)
+                self.unsubscribe(sub)
+
+    @property
+    def connections(self) -> int:
+        return len(self._subscribers)
+
+
+hub = EventHub()
+
+
+# ============================================================
+#   BROKERS
+# ============================================================
+class MemoryBroker:
+    """Single process: publishing is delivering."""
+
+    def publish(self, events: list):
+        for evt in events:
+            hub.dispatch(evt)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class PostgresBroker:
+    """
+    Every worker LISTENs on one channel and NOTIFY reaches all of them,
+    including the publisher, so each worker only delivers to its own clients.
+    """
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self, events: list):
+        with engine.begin() as conn:
+            for evt in events:
+                conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": EVENT_CHANNEL, "payload": json.dumps(evt)}
+                )
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="event-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _listen_forever(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                print("❌ Event listener error:", e)
+                self._stop.wait(5)
+
+    def _listen(self):
+        raw = engine.raw_connection()
+        try:
+            dbapi_conn = raw.driver_connection
+            dbapi_conn.autocommit = True
+            dbapi_conn.cursor().execute(f"LISTEN {EVENT_CHANNEL}")
+
+            while not self._stop.is_set():
+                if select.select([dbapi_conn], [], [], 5) == ([], [], []):
+                    continue
+                dbapi_conn.poll()
+                while dbapi_conn.notifies:
+                    note = dbapi_conn.notifies.pop(0)
+                    hub.dispatch(json.loads(note.payload))
+        finally:
+            raw.invalidate()   # LISTEN state must not go back to the pool
+
+
+def _make_broker():
+    if EVENT_BROKER == "postgres":
+        return PostgresBroker()
+    if EVENT_BROKER != "memory":
+        print(f"⚠️ Unknown EVENT_BROKER '{EVENT_BROKER}', using memory")
+    return MemoryBroker()
+
+
+broker = _make_broker()
+
+
+# ============================================================
+#   SUBMISSION EVENTS
+# ============================================================
+def _audience(obj: Submission) -> list:
+    """Student and supervisor, including previous ones if it was just reassigned."""
+    state = sa_inspect(obj)
+    ids = {obj.student_id, obj.supervisor_id}
+    for attr in ("student_id", "supervisor_id"):
+        ids.update(state.attrs[attr].history.deleted)
+    return sorted(i for i in ids if i is not None)
+
+
+def submission_event(obj: Submission, evt_type: str) -> dict:
+    """Small payload: clients fetch full rows through /submissions/changes."""
+    return {
+        "type": evt_type,
+        "audience": _audience(obj),
+        "id": obj.id,
+        "student_id": obj.student_id,
+        "supervisor_id": obj.supervisor_id,
+        "proposed_title": obj.proposed_title,
+        "similarity_score": obj.similarity_score,
+        "lecturer_decision": obj.lecturer_decision,
+        "admin_decision": obj.admin_decision,
+        "final_decision": obj.final_decision,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault("submission_events", [])
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Submission):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if obj in session.new:
+            evt_type = "submission.created"
+        elif obj in session.deleted:
+            evt_type = "submission.deleted"
+        elif any(sa_inspect(obj).attrs[f].history.has_changes() for f in DECISION_FIELDS):
+            evt_type = "submission.decided"
+        else:
+            evt_type = "submission.updated"
+        pending.append(submission_event(obj, evt_type))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session):
+    events = session.info.pop("submission_events", None)
+    if events:
+        try:
+            broker.publish(events)
+        except Exception as e:
+            # The write is committed; clients catch up through delta sync
+            print("❌ Event publish failed:", e)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_events(session):
+    session.info.pop("submission_events", None)
@@ -0,0 +1,246 @@
+"""
+Minimal Prometheus metrics (text exposition format 0.0.4).
+
+Each metric child has its own lock, so an observation is a dict lookup, a
+bisect and a few additions. Values are per process: with several workers,
+scrape each one or aggregate by instance in Prometheus.
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+
+# /metrics answers 403 until this is set
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Long-lived streams (SSE); they would sit in the in-flight gauge for hours
+LONG_LIVED_PATHS = ("/events",)
+
+# Seconds. Covers fast DB reads up to slow PDF renders / similarity passes.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics have a single child
+        return self.labels()
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        if not self.label_names:
+            self._default()   # report zeros before the first observation
+        for key, child in sorted(self._children.items()):
+            lines += child.lines(self.name, self.label_names, key)
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def lines(self, name, names, key):
+        return [f"{name}{_label_str(names, key)} {self.value}"]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, largest = self.sum, self.max
+        return {"count": sum(counts), "sum": total, "max": largest, "counts": counts}
+
+    def lines(self, name, names, key):
+        snap = self.snapshot()
+        out, cumulative = [], 0
+        for bound, n in zip(list(self.buckets) + ["+Inf"], snap["counts"]):
+            cumulative += n
+            le = 'le="%s"' % bound
+            out.append(f"{name}_bucket{_label_str(names, key, [le])} {cumulative}")
+        out.append(f"{name}_sum{_label_str(names, key)} {snap['sum']}")
+        out.append(f"{name}_count{_label_str(names, key)} {snap['count']}")
+        return out
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """With fn, the value is read from fn() at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=(), fn=None):
+        super().__init__(name, doc, labels)
+        self.fn = fn
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def collect(self) -> list:
+        if self.fn is not None:
+            try:
+                self.set(self.fn())
+            except Exception as e:
+                print(f"❌ Metric {self.name} failed:", e)
+        return super().collect()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+registry = []
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines += metric.collect()
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================
+#   HTTP
+# ============================================================
+http_requests = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    labels=("method", "route", "status"),
+)
+http_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled")
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware. Labels use the matched route template
+    (/submission/{submission_id}/pdf), not the raw path, to keep
+    cardinality bounded. Streaming responses are timed to the last chunk.
+    LONG_LIVED_PATHS are left out of the in-flight gauge.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = scope["path"] not in LONG_LIVED_PATHS
+        if in_flight:
+            http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if in_flight:
+                http_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_requests.labels(scope["method"], path, status["code"]).observe(
+                time.perf_counter() - start
+            )
@@ -0,0 +1,269 @@
+"""
+Bidirectional similarity maintenance.
+
+similarity_score used to be computed once, for the proposal being
+submitted. A later copy of an earlier proposal never raised the earlier
+one's score. Now every submission keeps its top-k neighbours in
+similarity_neighbors, and submit/update use the similarity vector they
+already compute (new text against every same-type text) in both directions:
+
+  - the new row's own list is the top k of that vector
+  - existing rows whose stored score is below their entry in the vector
+    are raised; no other submission rows are written
+  - rows that had the edited/removed submission as their best match fall
+    back to the next entry in their list, or to their best archived match
+    (archive_score) if that is higher
+
+Pairs below SIMILARITY_NEIGHBOR_MIN % are not listed. After deploying,
+run `python utils_neighbors.py --rebuild` once to fill the lists for
+existing data; `--verify` compares the stored lists and scores with a
+rebuild without writing. submit/update take lock_type() first so two
+concurrent submissions of one type see each other (PostgreSQL).
+"""
+import os
+import zlib
+from sqlalchemy import delete, func, insert, select, text, tuple_
+from sqlalchemy.orm import Session
+from models import Submission, SimilarityNeighbor
+
+SIMILARITY_TOP_K = int(os.environ.get("SIMILARITY_TOP_K", "10"))
+SIMILARITY_NEIGHBOR_MIN = float(os.environ.get("SIMILARITY_NEIGHBOR_MIN", "5"))
+
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+def _percent(sim) -> float:
+    return round(float(sim) * 100, 2)
+
+
+def _row(owner: int, neighbor: int, score: float) -> dict:
+    return {"submission_id": owner, "neighbor_id": neighbor, "score": score}
+
+
+def _prune(db: Session, owners):
+    """Trims the given owners' lists back to SIMILARITY_TOP_K entries."""
+    N = SimilarityNeighbor
+    for chunk in _chunks(owners):
+        rank = func.row_number().over(
+            partition_by=N.submission_id, order_by=(N.score.desc(), N.neighbor_id)
+        ).label("rank")
+        ranked = select(N.submission_id, N.neighbor_id, rank).where(N.submission_id.in_(chunk)).subquery()
+        extra = select(ranked.c.submission_id, ranked.c.neighbor_id).where(ranked.c.rank > SIMILARITY_TOP_K)
+        db.execute(delete(N).where(tuple_(N.submission_id, N.neighbor_id).in_(extra)))
+
+
+def detach(db: Session, submission_id: int):
+    """
+    Removes a submission from every other list (its text changed, or it is
+    being deleted). Rows whose best match it was drop to their next entry.
+    """
+    N = SimilarityNeighbor
+    held = dict(db.query(N.submission_id, N.score).filter(N.neighbor_id == submission_id).all())
+    db.execute(delete(N).where(N.submission_id == submission_id))
+    if not held:
+        return
+
+    db.execute(delete(N).where(N.neighbor_id == submission_id))
+    for chunk in _chunks(held):
+        remaining = dict(
+            db.query(N.submission_id, func.max(N.score))
+            .filter(N.submission_id.in_(chunk))
+            .group_by(N.submission_id)
+            .all()
+        )
+        for sub in db.query(Submission).filter(Submission.id.in_(chunk)):
+            # Only where the detached submission was the best match
+            if (sub.similarity_score or 0) <= held[sub.id]:
+                sub.similarity_score = max(remaining.get(sub.id, 0.0), sub.archive_score or 0.0)
+
+
+def attach(db: Session, submission: Submission, existing: list, sims):
+    """
+    Records submission's similarity vector `sims` (aligned with `existing`,
+    the other same-type submissions). Call after detach() for updates.
+    """
+    N = SimilarityNeighbor
+    if len(existing) == 0:
+        return
+
+    # Raise the earlier proposals this one resembles more than their best match so far
+    for sub, sim in zip(existing, sims):
+        score = _percent(sim)
+        if score > (sub.similarity_score or 0):
+            sub.similarity_score = score
+
+    candidates = [(sub.id, _percent(sim)) for sub, sim in zip(existing, sims) if sim * 100 >= SIMILARITY_NEIGHBOR_MIN]
+    if not candidates:
+        return
+
+    own = sorted(candidates, key=lambda c: -c[1])[:SIMILARITY_TOP_K]
+    db.execute(insert(N), [_row(submission.id, nid, s) for nid, s in own])
+
+    # Enter the other lists where this pair beats their current k-th entry
+    enters, full = [], []
+    for chunk in _chunks(candidates):
+        stats = {
+            owner: (count, lowest)
+            for owner, count, lowest in db.query(N.submission_id, func.count(), func.min(N.score))
+            .filter(N.submission_id.in_([owner for owner, _ in chunk]))
+            .group_by(N.submission_id)
+        }
+        for owner, score in chunk:
+            count, lowest = stats.get(owner, (0, 0.0))
+            if count < SIMILARITY_TOP_K:
+                enters.append(_row(owner, submission.id, score))
+            elif score > lowest:
+                enters.append(_row(owner, submission.id, score))
+                full.append(owner)
+
+    if enters:
+        db.execute(insert(N), enters)
+    _prune(db, full)
+
+
+# ============================================================
+#   ONE-OFF REBUILD / CHECK
+# ============================================================
+def _from_scratch(db: Session, ptype, chunk_nnz: int = 2_000_000):
+    """
+    One TF-IDF fit over the type's submissions, then sparse products in row
+    chunks. Returns (subs, neighbour rows, scores, archive scores), where
+    the score lists are aligned with subs.
+    """
+    import numpy as np
+    from utils_archive import archive_index
+    from utils_similarity import make_vectorizer
+    from utils_similarity_mode import get_similarity_mode, build_text_for_similarity
+
+    subs = db.query(Submission).filter(Submission.proposal_type == ptype).order_by(Submission.id).all()
+    if len(subs) < 2:
+        return subs, [], [s.similarity_score for s in subs], [s.archive_score for s in subs]
+
+    mode = get_similarity_mode(subs[0], db)
+    texts = [build_text_for_similarity(s, mode) for s in subs]
+    vectors = make_vectorizer().fit_transform(texts).tocsr()   # rows are L2-normalised
+    archived = [float(a) for a in archive_index.best_scores(db, texts, getattr(ptype, "value", ptype), mode)]
+
+    rows, scores = [], []
+    step = max(1, chunk_nnz // len(subs))
+    for start in range(0, len(subs), step):
+        block = (vectors[start:start + step] @ vectors.T).toarray()
+        for offset, sims in enumerate(block):
+            i = start + offset
+            sims[i] = 0.0    # not its own neighbour
+            top = np.argpartition(-sims, SIMILARITY_TOP_K)[:SIMILARITY_TOP_K] if len(sims) > SIMILARITY_TOP_K else range(len(sims))
+            rows += [
+                _row(subs[i].id, subs[j].id, _percent(sims[j]))
+                for j in top if sims[j] * 100 >= SIMILARITY_NEIGHBOR_MIN
+            ]
+            scores.append(max(_percent(sims.max()), archived[i]))
+    return subs, rows, scores, archived
+
+
+def rebuild_neighbors(db: Session, chunk_nnz: int = 2_000_000) -> int:
+    """
+    Recomputes every list and score from scratch. Archived matches are
+    scored again against the archive index. Returns the number of
+    submissions whose score changed.
+    """
+    db.execute(delete(SimilarityNeighbor))
+    changed = 0
+
+    for (ptype,) in db.query(Submission.proposal_type).distinct():
+        subs, rows, scores, archived = _from_scratch(db, ptype, chunk_nnz)
+        if len(subs) < 2:
+            continue
+        for sub, score, archive_score in zip(subs, scores, archived):
+            sub.archive_score = archive_score
+            if sub.similarity_score != score:
+                sub.similarity_score = score
+                changed += 1
+
+        for i in range(0, len(rows), 5000):
+            db.execute(insert(SimilarityNeighbor), rows[i:i + 5000])
+        db.commit()
+        print(f"🔁 {getattr(ptype, 'value', ptype)}: {len(subs)} submissions, {len(rows)} neighbour pairs")
+
+    return changed
+
+
+def verify_neighbors(db: Session, tolerance: float = 1.0) -> dict:
+    """
+    Compares the incrementally maintained lists and scores with what a
+    rebuild would write, without writing anything. Stored scores come from
+    the vectorizer fitted when each pair was recorded, so small drift is
+    expected; scores are compared within `tolerance` points and lists as
+    sets of neighbour ids. Returns mismatch counts and up to 10 examples.
+    """
+    result = {"checked": 0, "score_mismatches": 0, "list_mismatches": 0, "examples": []}
+
+    for (ptype,) in db.query(Submission.proposal_type).distinct():
+        subs, rows, scores, _ = _from_scratch(db, ptype)
+        expected = {}
+        for r in rows:
+            expected.setdefault(r["submission_id"], set()).add(r["neighbor_id"])
+
+        stored = {}
+        for owner, neighbor in (db.query(SimilarityNeighbor.submission_id, SimilarityNeighbor.neighbor_id)
+                                .join(Submission, Submission.id == SimilarityNeighbor.submission_id)
+                                .filter(Submission.proposal_type == ptype)):
+            stored.setdefault(owner, set()).add(neighbor)
+
+        for sub, score in zip(subs, scores):
+            result["checked"] += 1
+            bad_score = abs((sub.similarity_score or 0) - (score or 0)) > tolerance
+            bad_list = stored.get(sub.id, set()) != expected.get(sub.id, set())
+            result["score_mismatches"] += bad_score
+            result["list_mismatches"] += bad_list
+            if (bad_score or bad_list) and len(result["examples"]) < 10:
+                result["examples"].append({
+                    "id": sub.id,
+                    "stored_score": sub.similarity_score,
+                    "expected_score": score,
+                    "missing": sorted(expected.get(sub.id, set()) - stored.get(sub.id, set())),
+                    "extra": sorted(stored.get(sub.id, set()) - expected.get(sub.id, set())),
+                })
+
+    return result
+
+
+def lock_type(db: Session, proposal_type: str):
+    """
+    Serialises submit/update per proposal type until the transaction ends,
+    so the second of two concurrent submissions reads the first as an
+    existing text and the pair is recorded. PostgreSQL only (advisory
+    lock); on SQLite concurrent writes of the same type can each miss the
+    other, which `--verify` reports and `--rebuild` repairs.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"),
+                   {"key": zlib.crc32(f"similarity:{proposal_type}".encode())})
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal
+
+    if "--rebuild" not in sys.argv and "--verify" not in sys.argv:
+        sys.exit("usage: python utils_neighbors.py --rebuild | --verify")
+
+    session = SessionLocal()
+    try:
+        if "--verify" in sys.argv:
+            report = verify_neighbors(session)
+            print(f"{'✅' if not report['score_mismatches'] and not report['list_mismatches'] else '⚠️'} "
+                  f"{report['checked']} submissions checked, {report['score_mismatches']} score and "
+                  f"{report['list_mismatches']} list mismatches")
+            for example in report["examples"]:
+                print("  ", example)
+        else:
+            print(f"✅ Rebuilt similarity neighbours, {rebuild_neighbors(session)} scores changed")
+    finally:
+        session.close()
@@ -0,0 +1,180 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from passlib.hash import pbkdf2_sha256, bcrypt
+from utils_metrics import Counter, Gauge, Histogram
+
+# Worker processes used for bulk hashing (roster imports)
+HASH_PROCESSES = int(os.environ.get("HASH_PROCESSES", os.cpu_count() or 1))
+
+# Request-path hashing (login / signup / change password).
+# HASH_THREADS hashes run at once, HASH_QUEUE_LIMIT more may wait,
+# anything beyond that is turned away instead of tying up the server threadpool.
+HASH_THREADS = int(os.environ.get("HASH_THREADS", os.cpu_count() or 1))
+HASH_QUEUE_LIMIT = int(os.environ.get("HASH_QUEUE_LIMIT", "16"))
+HASH_TIMEOUT_SECONDS = float(os.environ.get("HASH_TIMEOUT_SECONDS", "10"))
+
+# pbkdf2 work factor for NEW hashes. Existing hashes keep their own rounds
+# and still verify. Use bench_hashing.py to pick a value for the hardware.
+PBKDF2_ROUNDS = int(os.environ.get("PBKDF2_ROUNDS", pbkdf2_sha256.default_rounds))
+
+_pbkdf2 = pbkdf2_sha256.using(rounds=PBKDF2_ROUNDS)
+
+_process_pool = None
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_THREADS, thread_name_prefix="hash")
+_hash_slots = threading.BoundedSemaphore(HASH_THREADS + HASH_QUEUE_LIMIT)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full. Callers should answer 503."""
+
+
+def hash_password(plain: str) -> str:
+    """Hash with pbkdf2_sha256 (consistent across app)."""
+    return _pbkdf2.hash(plain)
+
+
+def is_bcrypt_hash(hashed: str) -> bool:
+    return hashed.startswith("$2b$") or hashed.startswith("$2a$") or hashed.startswith("$2y$")
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    """Verify password against stored hash. Handles bcrypt -> pbkdf2 upgrade path."""
+    if not hashed:
+        return False
+
+    # If stored is bcrypt, use bcrypt.verify then (optionally) upgrade to pbkdf2 in DB caller
+    if is_bcrypt_hash(hashed):
+        try:
+            return bcrypt.verify(plain, hashed)
+        except Exception:
+            return False
+
+    # Default: pbkdf2_sha256
+    try:
+        return pbkdf2_sha256.verify(plain, hashed)
+    except Exception:
+        return False
+
+
+# -------------------------------
+# Hash latency metrics (exported on /metrics)
+# -------------------------------
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+password_hash_seconds = Histogram(
+    "password_hash_seconds", "Time spent hashing / verifying a password", labels=("op",), buckets=HASH_BUCKETS
+)
+password_hash_rejected = Counter(
+    "password_hash_rejected_total", "Hash requests turned away because the queue was full"
+)
+password_hash_in_flight = Gauge(
+    "password_hash_in_flight", "Hash requests running or queued",
+    fn=lambda: _in_flight,
+)
+
+
+def _acquire_slot() -> bool:
+    global _in_flight
+    if not _hash_slots.acquire(blocking=False):
+        return False
+    with _in_flight_lock:
+        _in_flight += 1
+    return True
+
+
+def _release_slot():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+    _hash_slots.release()
+
+
+def _timed(op: str, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        password_hash_seconds.labels(op).observe(time.perf_counter() - start)
+
+
+def _run_limited(op: str, fn, *args):
+    """
+    Runs fn on the dedicated hashing executor and waits for the result.
+    Raises HashingBusy immediately when every worker and queue slot is taken.
+    """
+    if not _acquire_slot():
+        password_hash_rejected.inc()
+        raise HashingBusy()
+
+    try:
+        future = _hash_executor.submit(_timed, op, fn, *args)
+    except Exception:
+        _release_slot()
+        raise
+
+    future.add_done_callback(lambda _: _release_slot())
+    return future.result(timeout=HASH_TIMEOUT_SECONDS)
+
+
+def hash_password_limited(plain: str) -> str:
+    return _run_limited("hash", hash_password, plain)
+
+
+def verify_password_limited(plain: str, hashed: str) -> bool:
+    return _run_limited("verify", verify_password, plain, hashed)
+
+
+def hashing_status() -> dict:
+    """Summary of the hashing metrics for /auth/hash_stats."""
+    ops = {}
+    for op in ("hash", "verify"):
+        snap = password_hash_seconds.labels(op).snapshot()
+        ops[op] = {
+            "count": snap["count"],
+            "avg_ms": round(snap["sum"] / snap["count"] * 1000, 2) if snap["count"] else 0.0,
+            "max_ms": round(snap["max"] * 1000, 2),
+            "buckets_ms": {
+                **{f"<={int(b * 1000)}": n for b, n in zip(HASH_BUCKETS, snap["counts"])},
+                "+Inf": snap["counts"][-1],
+            },
+        }
+
+    return {
+        "threads": HASH_THREADS,
+        "queue_limit": HASH_QUEUE_LIMIT,
+        "in_flight": _in_flight,
+        "pbkdf2_rounds": PBKDF2_ROUNDS,
+        "operations": ops,
+        "rejected": int(password_hash_rejected.labels().value),
+    }
+
+
+# -------------------------------
+# Bulk hashing (process pool)
+# -------------------------------
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn: workers only import this module, never the web app
+        _process_pool = ProcessPoolExecutor(
+            max_workers=HASH_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hash many passwords across all cores. Order is preserved.
+    Small lists are hashed inline - not worth the IPC.
+    """
+    if len(passwords) < 2 * HASH_PROCESSES or HASH_PROCESSES < 2:
+        return [hash_password(p) for p in passwords]
+
+    chunksize = max(1, len(passwords) // (HASH_PROCESSES * 4))
+    return list(_get_process_pool().map(hash_password, passwords, chunksize=chunksize))
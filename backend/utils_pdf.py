@@ -1,51 +1,92 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
-from io import BytesIO
-
-
-def generate_pdf(sub):
-    buffer = BytesIO()
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=30,
-        leftMargin=30,
-        topMargin=40,
-        bottomMargin=40
-    )
-
-    styles = getSampleStyleSheet()
-
-    # Custom Styles
-    title_style = ParagraphStyle(
-        "TitleStyle", parent=styles["Heading1"], alignment=TA_CENTER, spaceAfter=12
-    )
-
-    header_style = ParagraphStyle(
-        "HeaderStyle", parent=styles["Normal"], alignment=TA_CENTER, fontSize=12, spaceAfter=10, leading=14
-    )
-
-    section_title = ParagraphStyle(
-        "SectionTitle", parent=styles["Heading2"], spaceBefore=15, spaceAfter=6
-    )
-
-    justified = ParagraphStyle(
-        "Justified", parent=styles["Normal"], alignment=TA_JUSTIFY, leading=15
-    )
+import os
+import tempfile
+import threading
+from utils_metrics import Histogram
+
+# ReportLab is imported inside the functions below: most requests never
+# render a PDF, so cold starts should not pay for it.
+
+# Bump when the layout changes so cached PDFs are re-rendered
+PDF_TEMPLATE_VERSION = 3
+
+# Rendered output stays in memory up to this size, then moves to a temp file
+PDF_SPOOL_MAX_BYTES = int(os.environ.get("PDF_SPOOL_MAX_KB", "512")) * 1024
+
+PAGE_LAYOUT = dict(
+    pagesize=(595.2755905511812, 841.8897637795277),   # reportlab A4
+    rightMargin=30,
+    leftMargin=30,
+    topMargin=40,
+    bottomMargin=40
+)
+
+UNIVERSITY_HEADER = [
+    "<b>Michael Okpara University of Agriculture, Umudike</b>",
+    "<b>College of Natural and Applied Sciences (COLPAS)</b>",
+    "<b>Department of Computer Science</b>",
+]
+
+SECTIONS = [
+    ("1. Background", "background"),
+    ("2. Aim", "aim"),
+    ("3. Objectives", "objectives"),
+    ("4. Methods", "methods"),
+    ("5. Expected Results", "expected_results"),
+    ("6. Literature Review", "literature_review"),
+]
+
+pdf_render_seconds = Histogram("pdf_render_seconds", "Time to lay out and write one proposal PDF")
+
+_styles = None
+_styles_lock = threading.Lock()
+
+
+def get_styles() -> dict:
+    """
+    Builds the stylesheet once per process.
+    Styles are only read while building, so renders can share them.
+    """
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+                from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+
+                base = getSampleStyleSheet()
+                _styles = {
+                    "title": ParagraphStyle(
+                        "TitleStyle", parent=base["Heading1"], alignment=TA_CENTER, spaceAfter=12
+                    ),
+                    "header": ParagraphStyle(
+                        "HeaderStyle", parent=base["Normal"], alignment=TA_CENTER, fontSize=12, spaceAfter=10, leading=14
+                    ),
+                    "section_title": ParagraphStyle(
+                        "SectionTitle", parent=base["Heading2"], spaceBefore=15, spaceAfter=6
+                    ),
+                    "justified": ParagraphStyle(
+                        "Justified", parent=base["Normal"], alignment=TA_JUSTIFY, leading=15
+                    ),
+                }
+    return _styles
+
+
+def build_elements(sub) -> list:
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = get_styles()
+    header_style = styles["header"]
+    justified = styles["justified"]
 
     elements = []
 
     # University Header
-    elements.append(Paragraph("<b>Michael Okpara University of Agriculture, Umudike</b>", header_style))
-    elements.append(Paragraph("<b>College of Natural and Applied Sciences (COLPAS)</b>", header_style))
-    elements.append(Paragraph("<b>Department of Computer Science</b>", header_style))
+    for line in UNIVERSITY_HEADER:
+        elements.append(Paragraph(line, header_style))
     elements.append(Spacer(1, 12))
 
     # Proposal Title
-    elements.append(Paragraph(f"<b>{sub.proposed_title.upper()}</b>", title_style))
+    elements.append(Paragraph(f"<b>{sub.proposed_title.upper()}</b>", styles["title"]))
     elements.append(Spacer(1, 20))
 
     # Student and Supervisor Info
@@ -56,23 +97,52 @@ def generate_pdf(sub):
 
     elements.append(Paragraph(f"<b>Student:</b> {student_name} ({student_reg})", justified))
     elements.append(Paragraph(f"<b>Supervisor:</b> {supervisor_name}", justified))
-    elements.append(Paragraph(f"<b>Proposal Type:</b> {sub.proposal_type}", justified))
+    # ORM rows carry the enum, bundle snapshots the plain value; both print the value
+    proposal_type = getattr(sub.proposal_type, "value", sub.proposal_type)
+    elements.append(Paragraph(f"<b>Proposal Type:</b> {proposal_type}", justified))
     elements.append(Spacer(1, 15))
 
     # Sections
-    def add_section(title, content):
+    # One Paragraph per line: splitting a single huge Paragraph across
+    # pages is quadratic, which made long literature reviews very slow.
+    for title, field in SECTIONS:
+        content = getattr(sub, field)
         if content:
-            elements.append(Paragraph(title, section_title))
-            elements.append(Paragraph(content.replace("\n", "<br/>"), justified))
+            elements.append(Paragraph(title, styles["section_title"]))
+            for line in content.split("\n"):
+                if line.strip():
+                    elements.append(Paragraph(line, justified))
+                else:
+                    elements.append(Spacer(1, justified.leading))
             elements.append(Spacer(1, 10))
 
-    add_section("1. Background", sub.background)
-    add_section("2. Aim", sub.aim)
-    add_section("3. Objectives", sub.objectives)
-    add_section("4. Methods", sub.methods)
-    add_section("5. Expected Results", sub.expected_results)
-    add_section("6. Literature Review", sub.literature_review)
+    return elements
+
+
+def generate_pdf(sub, out=None):
+    """
+    Renders the proposal PDF.
+    With out (a binary file object) the PDF is written there and out is returned.
+    Otherwise a SpooledTemporaryFile is returned, positioned at the start -
+    small PDFs stay in memory, large ones spill to disk.
+    """
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = out if out is not None else tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
 
-    doc.build(elements)
-    buffer.seek(0)
+    with pdf_render_seconds.time():
+        doc = SimpleDocTemplate(buffer, **PAGE_LAYOUT)
+        doc.build(build_elements(sub))
+
+    if out is None:
+        buffer.seek(0)
     return buffer
+
+
+def render_pdf_bytes(sub) -> bytes:
+    """
+    Process-pool entry point. sub can be any object with the Submission
+    attributes used above (e.g. a SimpleNamespace snapshot).
+    """
+    with generate_pdf(sub) as f:
+        return f.read()
@@ -0,0 +1,124 @@
+import os
+import glob
+import json
+import hashlib
+import tempfile
+import threading
+from utils_pdf import generate_pdf, PDF_TEMPLATE_VERSION
+
+# Rendered PDFs live on the persistent volume next to the SQLite DB
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", os.path.join("data", "pdf_cache"))
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+_evict_lock = threading.Lock()
+
+
+def pdf_cache_key(sub) -> str:
+    """Hash of everything that appears in the rendered PDF."""
+    content = [
+        PDF_TEMPLATE_VERSION,
+        sub.id,
+        sub.proposed_title,
+        str(getattr(sub.proposal_type, "value", sub.proposal_type)),
+        sub.background, sub.aim, sub.objectives, sub.methods,
+        sub.expected_results, sub.literature_review,
+        sub.student.name if sub.student else None,
+        sub.student.reg_number if sub.student else None,
+        sub.supervisor.name if sub.supervisor else None,
+    ]
+    return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+def _cache_path(submission_id: int, key: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, f"{submission_id}-{key}.pdf")
+
+
+def cached_pdf_path(submission_id: int, key: str):
+    """Path of a cached render, or None. Hits refresh mtime for LRU eviction."""
+    path = _cache_path(submission_id, key)
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        return None
+
+
+def _write_atomic(submission_id: int, key: str, write) -> str:
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+
+    # Older renders of this submission are stale now
+    invalidate_submission(submission_id)
+
+    # Write to a temp file then rename, so readers never see a partial PDF
+    path = _cache_path(submission_id, key)
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    _evict()
+    return path
+
+
+def store_pdf(submission_id: int, key: str, data: bytes) -> str:
+    return _write_atomic(submission_id, key, lambda f: f.write(data))
+
+
+def get_cached_pdf(sub, key: str = None) -> str:
+    """
+    Returns the path of the rendered PDF for sub.
+    On a miss the PDF is rendered straight into the cache file.
+    """
+    key = key or pdf_cache_key(sub)
+    return cached_pdf_path(sub.id, key) or _write_atomic(sub.id, key, lambda f: generate_pdf(sub, out=f))
+
+
+def open_cached_pdf(sub, key: str = None):
+    """
+    get_cached_pdf, opened for reading. An open file stays readable after
+    eviction or invalidation removes its path, so callers stream from it.
+    If the path goes between lookup and open, the PDF is rendered again.
+    """
+    key = key or pdf_cache_key(sub)
+    try:
+        return open(get_cached_pdf(sub, key), "rb")
+    except FileNotFoundError:
+        return open(_write_atomic(sub.id, key, lambda f: generate_pdf(sub, out=f)), "rb")
+
+
+def invalidate_submission(submission_id: int):
+    for path in glob.glob(os.path.join(PDF_CACHE_DIR, f"{submission_id}-*.pdf")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _evict():
+    """Removes least recently used PDFs until the cache is under its size limit."""
+    with _evict_lock:
+        entries = []
+        total = 0
+        for entry in os.scandir(PDF_CACHE_DIR):
+            if entry.name.endswith(".pdf"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        if total <= PDF_CACHE_MAX_BYTES:
+            return
+
+        # Trim to 90% so we don't evict on every single write
+        target = PDF_CACHE_MAX_BYTES * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,303 @@
+"""
+On-demand profiling of single requests, for admins.
+
+An admin adds `X-Profile: 1` (or `?_profile=1`) to a request. That request
+runs under a sampling profiler and tracemalloc, and the result is stored
+under PROFILE_DIR. The response carries `X-Profile-Id`; fetch the profile
+from /admin/profiles/{id}, or /admin/profiles/{id}/folded for a flame graph
+(speedscope.app, flamegraph.pl).
+
+The sampler reads every thread's stack with sys._current_frames(). Sync
+endpoints run in the threadpool, so a per-thread profiler would miss them.
+Other requests running at the same time show up under their own thread
+names. Only one profile runs at a time, at most once every
+PROFILE_MIN_INTERVAL_SECONDS. Other flagged requests are served normally.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "1") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "profiles"))
+PROFILE_MIN_INTERVAL_SECONDS = float(os.environ.get("PROFILE_MIN_INTERVAL_SECONDS", "30"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+# Streaming responses (/events) would otherwise be profiled forever
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "30"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "20"))
+PROFILE_TOP = 25
+
+PROFILE_ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+
+# Leaf frames of threads parked with nothing to do
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    def __init__(self, method: str, path: str):
+        self.id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        self.method = method
+        self.path = path
+        self.status = None
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._finished = threading.Lock()
+        self._done = False
+        self._owns_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._mem_start = tracemalloc.get_traced_memory()[0]
+        self._before = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {}
+        interval = PROFILE_INTERVAL_MS / 1000
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+
+        while not self._stop.wait(interval):
+            if time.monotonic() > deadline:
+                print(f"⏱ Profile {self.id} hit PROFILE_MAX_SECONDS, stopping")
+                self.finish()
+                return
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(tid, str(tid)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def finish(self):
+        """Stops sampling and stores the profile. Safe to call twice."""
+        with self._finished:
+            if self._done:
+                return
+            self._done = True
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        try:
+            self._save()
+        finally:
+            limiter.release()
+
+    def _save(self):
+        duration = time.perf_counter() - self._started
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(ignore).compare_to(self._before.filter_traces(ignore), "lineno")
+        allocations = [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            }
+            for stat in diff[:PROFILE_TOP]
+        ]
+
+        # Leaf frames: where the samples actually were
+        leaves = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+
+        profile = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(duration * 1000, 1),
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": self.samples,
+            "top_functions": [{"frame": f, "samples": n} for f, n in leaves.most_common(PROFILE_TOP)],
+            "memory": {
+                "net_kb": round((current - self._mem_start) / 1024, 1),
+                "peak_kb": round((peak - self._mem_start) / 1024, 1),
+            },
+            "top_allocations": allocations,
+        }
+        folded = "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+        store.save(profile, folded)
+        print(f"🔬 Profiled {self.method} {self.path} in {profile['duration_ms']} ms ({self.id})")
+
+
+# ============================================================
+#   RATE LIMIT
+# ============================================================
+class ProfileLimiter:
+    """One profile at a time, and a cool-down between them."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._active = False
+        self._last = float("-inf")
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._active or now - self._last < self.min_interval:
+                return False
+            self._active = True
+            self._last = now
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active = False
+
+
+limiter = ProfileLimiter(PROFILE_MIN_INTERVAL_SECONDS)
+
+
+# ============================================================
+#   STORAGE
+# ============================================================
+class ProfileStore:
+    """<id>.json + <id>.folded per profile; keeps the newest PROFILE_KEEP."""
+
+    def __init__(self, directory: str, keep: int):
+        self.directory = directory
+        self.keep = keep
+
+    def _path(self, profile_id: str, ext: str) -> str:
+        if not PROFILE_ID_RE.match(profile_id):
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def save(self, profile: dict, folded: str):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile["id"], "json"), "w") as f:
+            json.dump(profile, f)
+        with open(self._path(profile["id"], "folded"), "w") as f:
+            f.write(folded)
+
+        for old in self.ids()[self.keep:]:
+            for ext in ("json", "folded"):
+                try:
+                    os.remove(self._path(old, ext))
+                except OSError:
+                    pass
+
+    def ids(self) -> list:
+        """Newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = [
+            (entry.stat().st_mtime, entry.name[:-5]) for entry in os.scandir(self.directory)
+            if entry.name.endswith(".json") and PROFILE_ID_RE.match(entry.name[:-5])
+        ]
+        return [profile_id for _, profile_id in sorted(entries, reverse=True)]
+
+    def load(self, profile_id: str, ext: str = "json"):
+        try:
+            with open(self._path(profile_id, ext)) as f:
+                return json.load(f) if ext == "json" else f.read()
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Profile not found")
+
+
+store = ProfileStore(PROFILE_DIR, PROFILE_KEEP)
+
+
+# ============================================================
+#   MIDDLEWARE
+# ============================================================
+def _is_admin(token: str) -> bool:
+    from auth_jwt import get_current_user
+
+    db = SessionLocal()
+    try:
+        return get_current_user(token=token, db=db).role == "admin"
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile" and value not in (b"", b"0"):
+            return True
+    return b"_profile=1" in scope.get("query_string", b"").split(b"&")
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI middleware. The flag is ignored unless the bearer token
+    belongs to an admin, so other users cannot slow the server down with it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_ENABLED or not _requested(scope):
+            return await self.app(scope, receive, send)
+
+        auth = dict(scope["headers"]).get(b"authorization", b"").decode()
+        if not auth.lower().startswith("bearer ") or not await run_in_threadpool(_is_admin, auth[7:]):
+            return await self.app(scope, receive, send)
+
+        if not limiter.try_acquire():
+            async def send_limited(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile", b"rate-limited")]
+                await send(message)
+            return await self.app(scope, receive, send_limited)
+
+        session = ProfileSession(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                session.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode())]
+            await send(message)
+
+        try:
+            await run_in_threadpool(session.start)
+        except Exception:
+            limiter.release()
+            raise
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await run_in_threadpool(session.finish)
@@ -0,0 +1,46 @@
+import time
+import threading
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets keyed by an arbitrary string (IP, email, ...).
+    Each key may burst up to `burst` requests, refilled at `per_minute`.
+    """
+
+    # Forget idle keys once the table grows past this many entries
+    MAX_KEYS = 10000
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        # A bucket idle long enough to be full again carries no state
+        full_after = self.burst / self.rate if self.rate else 0
+        stale = [k for k, (_, ts) in self._buckets.items() if now - ts >= full_after]
+        for k in stale:
+            del self._buckets[k]
+
+    def allow(self, key: str) -> float:
+        """
+        Takes one token for key.
+        Returns 0 when allowed, otherwise the seconds until a token is available.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+
+            tokens, ts = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - ts) * self.rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate if self.rate else 60.0
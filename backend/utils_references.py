@@ -0,0 +1,212 @@
+"""
+External reference corpus: past theses that were never submitted through
+the system (library scans, department archives). They are ingested offline
+into their own index, separate from live and archived submissions, and
+submit/update report the closest reference document next to the internal
+similarity score.
+
+    python utils_references.py /srv/theses                 # .txt and .pdf, recursively
+    python utils_references.py /srv/theses --workers 8 --batch 500
+
+Files are found lazily and extracted in a process pool with a bounded
+number of files in flight, so only the current batch of texts is ever held
+in memory. Each batch is written as one reference segment per similarity
+mode (hashed term counts, as in the archive, keeping each document's
+REFERENCE_MAX_TERMS most frequent terms), and the run ends by merging
+them into a single segment per mode with one IDF over the whole corpus.
+Workers memory-map the merged segment from SEGMENT_CACHE_DIR rather than
+each holding a copy.
+Files already ingested are skipped by content hash, so re-running over a
+growing directory only adds what is new. PDF extraction needs `pypdf`.
+"""
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from sqlalchemy.orm import Session
+from models import ReferenceDocument, ReferenceSegment
+from utils_archive import ArchiveIndex, MODES, build_segment
+
+REFERENCE_EXTENSIONS = (".txt", ".pdf")
+REFERENCE_BATCH = int(os.environ.get("REFERENCE_BATCH", "200"))
+# Longer documents are cut; the opening chapters carry the topic anyway
+REFERENCE_MAX_CHARS = int(os.environ.get("REFERENCE_MAX_CHARS", "200000"))
+# Distinct terms kept per document (its most frequent ones). Bounds the corpus
+# matrix at about 8 bytes x documents x this, e.g. 240 MB for 30,000 theses,
+# memory-mapped from SEGMENT_CACHE_DIR and shared by all workers.
+REFERENCE_MAX_TERMS = int(os.environ.get("REFERENCE_MAX_TERMS", "1000"))
+
+
+class ReferenceIndex(ArchiveIndex):
+    """Reference segments per similarity mode; there is no proposal type."""
+
+    model = ReferenceSegment
+
+    def _key(self, seg):
+        return seg.mode
+
+    def _fields(self, key) -> dict:
+        return {"mode": key}
+
+    def best_match(self, db: Session, text: str, mode: str) -> tuple:
+        """(score %, reference document id) of the closest reference document."""
+        return self._best(db, text, mode)
+
+
+reference_index = ReferenceIndex()
+
+
+def reference_match(db: Session, text: str, mode: str) -> dict:
+    """Closest reference document for a response body, or a zero score."""
+    score, doc_id = reference_index.best_match(db, text, mode)
+    doc = db.query(ReferenceDocument).filter(ReferenceDocument.id == doc_id).first() if doc_id else None
+    return {
+        "score": score,
+        "document": {"id": doc.id, "title": doc.title} if doc else None,
+    }
+
+
+# ============================================================
+#   EXTRACTION (runs in worker processes)
+# ============================================================
+def _pdf_text(data: bytes) -> str:
+    import io
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_text(path: str, max_chars: int = REFERENCE_MAX_CHARS) -> dict:
+    """Reads one file. Errors are returned, not raised, so one bad PDF does not stop the run."""
+    result = {"path": path, "sha1": None, "title": None, "text": None, "error": None}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        result["sha1"] = hashlib.sha1(data).hexdigest()
+
+        if path.lower().endswith(".pdf"):
+            raw = _pdf_text(data)
+        else:
+            raw = data.decode("utf-8", errors="replace")
+    except ImportError:
+        result["error"] = "pypdf is not installed"
+        return result
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    text = " ".join(raw[:max_chars].split())
+    if not text:
+        result["error"] = "no text"
+        return result
+
+    # The first line is usually the title page heading
+    first_line = next((line.strip() for line in raw[:2000].splitlines() if line.strip()), "")
+    result["title"] = (first_line or os.path.splitext(os.path.basename(path))[0])[:300]
+    result["text"] = text
+    return result
+
+
+# ============================================================
+#   INGESTION
+# ============================================================
+def iter_reference_files(root: str):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(REFERENCE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def _extracted(paths, workers: int, max_chars: int):
+    """Yields extraction results as they finish, keeping at most 4 files per worker in flight."""
+    paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            while len(pending) < workers * 4:
+                path = next(paths, None)
+                if path is None:
+                    break
+                pending.add(pool.submit(extract_text, path, max_chars))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def _write_batch(db: Session, batch: list):
+    docs = [
+        ReferenceDocument(path=r["path"], title=r["title"], sha1=r["sha1"], chars=len(r["text"]))
+        for r in batch
+    ]
+    db.add_all(docs)
+    db.flush()
+
+    ids = [d.id for d in docs]
+    for mode in MODES:
+        texts = [r["title"] if mode == "title" else f'{r["title"]} {r["text"]}' for r in batch]
+        db.add(ReferenceSegment(mode=mode, doc_count=len(batch),
+                                payload=build_segment(ids, texts, REFERENCE_MAX_TERMS)))
+    db.commit()
+
+
+def ingest_references(db: Session, root: str, workers: int = None, batch_size: int = REFERENCE_BATCH,
+                      max_chars: int = REFERENCE_MAX_CHARS) -> dict:
+    """Ingests every new .txt/.pdf under root. Returns counts of added / skipped / failed files."""
+    seen = {sha1 for (sha1,) in db.query(ReferenceDocument.sha1)}
+    counts = {"added": 0, "skipped": 0, "failed": 0}
+    batch = []
+
+    for result in _extracted(iter_reference_files(root), workers or os.cpu_count() or 1, max_chars):
+        if result["error"]:
+            counts["failed"] += 1
+            print(f"⚠️ {result['path']}: {result['error']}")
+            continue
+        if result["sha1"] in seen:
+            counts["skipped"] += 1
+            continue
+
+        seen.add(result["sha1"])
+        batch.append(result)
+        if len(batch) >= batch_size:
+            _write_batch(db, batch)
+            counts["added"] += len(batch)
+            batch = []
+            print(f"📚 Ingested {counts['added']} reference documents")
+
+    if batch:
+        _write_batch(db, batch)
+        counts["added"] += len(batch)
+
+    if counts["added"]:
+        reference_index.compact(db)
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from database import SessionLocal
+    from migrate import run_migrations
+
+    parser = argparse.ArgumentParser(description="Ingest a directory of past theses as similarity references")
+    parser.add_argument("root", help="Directory searched recursively for .txt and .pdf files")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--batch", type=int, default=REFERENCE_BATCH, help="Documents per index segment")
+    parser.add_argument("--max-chars", type=int, default=REFERENCE_MAX_CHARS)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        parser.error(f"{args.root} is not a directory")
+
+    run_migrations()
+    session = SessionLocal()
+    started = time.perf_counter()
+    try:
+        result = ingest_references(session, args.root, args.workers, args.batch, args.max_chars)
+        print(f"✅ {result['added']} added, {result['skipped']} already ingested, "
+              f"{result['failed']} failed in {time.perf_counter() - started:.1f}s")
+    finally:
+        session.close()
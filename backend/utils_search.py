@@ -0,0 +1,215 @@
+import re
+import html
+from sqlalchemy import text
+from database import engine
+
+SEARCH_FIELDS = [
+    "proposed_title", "background", "aim", "objectives",
+    "methods", "expected_results", "literature_review",
+]
+
+# Title matches count for more than section matches
+TITLE_WEIGHT = 10.0
+
+# Snippet markers that cannot appear in user text; swapped for <mark> after escaping
+_MARK_OPEN = "\ue000"
+_MARK_CLOSE = "\ue001"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# ============================================================
+#   INDEX SETUP
+# ============================================================
+# SQLite: external-content FTS5 table kept in sync by triggers, so every
+# write path (ORM, bulk inserts, manual SQL) updates the index.
+# No porter stemming: it breaks the prefix match on the word being typed
+# ("irrigat*" would not find the stem "irrig").
+_SQLITE_SETUP = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS submissions_fts USING fts5(
+        {", ".join(SEARCH_FIELDS)},
+        content='submissions', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS submissions_fts_ai AFTER INSERT ON submissions BEGIN
+        INSERT INTO submissions_fts(rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES (new.id, {", ".join("new." + f for f in SEARCH_FIELDS)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS submissions_fts_ad AFTER DELETE ON submissions BEGIN
+        INSERT INTO submissions_fts(submissions_fts, rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES ('delete', old.id, {", ".join("old." + f for f in SEARCH_FIELDS)});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS submissions_fts_au AFTER UPDATE OF {", ".join(SEARCH_FIELDS)} ON submissions BEGIN
+        INSERT INTO submissions_fts(submissions_fts, rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES ('delete', old.id, {", ".join("old." + f for f in SEARCH_FIELDS)});
+        INSERT INTO submissions_fts(rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES (new.id, {", ".join("new." + f for f in SEARCH_FIELDS)});
+    END
+    """,
+]
+
+# PostgreSQL: generated tsvector column (recomputed by the server on every
+# write) with a GIN index. Title is weight A, sections weight B.
+_PG_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(proposed_title, '')), 'A') || "
+    "setweight(to_tsvector('english', "
+    + " || ' ' || ".join(f"coalesce({f}, '')" for f in SEARCH_FIELDS[1:])
+    + "), 'B')"
+)
+
+_PG_SETUP = [
+    f"""
+    ALTER TABLE submissions ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS ({_PG_VECTOR}) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_submissions_search_vector ON submissions USING GIN (search_vector)",
+]
+
+
+def ensure_search_index():
+    """Creates the full-text index for the current engine if it is missing."""
+    dialect = engine.dialect.name
+
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'submissions_fts'")
+            ).first()
+            for stmt in _SQLITE_SETUP:
+                conn.execute(text(stmt))
+            if not exists:
+                # Index rows that were there before the table existed
+                conn.execute(text("INSERT INTO submissions_fts(submissions_fts) VALUES ('rebuild')"))
+                print("🛠 Built full-text index submissions_fts")
+        elif dialect == "postgresql":
+            for stmt in _PG_SETUP:
+                conn.execute(text(stmt))
+        else:
+            print(f"⚠️ Full-text search not supported on {dialect}")
+
+
+# ============================================================
+#   QUERIES
+# ============================================================
+def _scope_clause(user) -> tuple:
+    """Same visibility as list_all_submissions."""
+    if user.role == "admin":
+        return "", {}
+    if user.role == "lecturer":
+        return "AND s.supervisor_id = :user_id", {"user_id": user.id}
+    if user.role == "student":
+        return "AND s.student_id = :user_id", {"user_id": user.id}
+    return "AND 1 = 0", {}
+
+
+def _fts5_query(q: str) -> str:
+    """
+    User input as an FTS5 query: every word must match, the last one as a
+    prefix (search-as-you-type). Quoting keeps FTS5 operators out.
+    """
+    words = _WORD.findall(q)
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _highlight(snippet: str) -> str:
+    if not snippet:
+        return ""
+    return html.escape(snippet).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def _search_sqlite(db, q, scope_sql, params, limit, offset):
+    match = _fts5_query(q)
+    if not match:
+        return 0, []
+
+    params = {**params, "match": match, "limit": limit, "offset": offset}
+    weights = ", ".join([str(TITLE_WEIGHT)] + ["1.0"] * (len(SEARCH_FIELDS) - 1))
+
+    base = f"""
+        FROM submissions_fts
+        JOIN submissions s ON s.id = submissions_fts.rowid
+        WHERE submissions_fts MATCH :match {scope_sql}
+    """
+
+    total = db.execute(text(f"SELECT count(*) {base}"), params).scalar()
+    rows = db.execute(text(f"""
+        SELECT s.id, s.proposed_title, s.proposal_type, s.final_decision, s.similarity_score,
+               s.student_id, s.supervisor_id,
+               -bm25(submissions_fts, {weights}) AS rank,
+               snippet(submissions_fts, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 16) AS snippet
+        {base}
+        ORDER BY bm25(submissions_fts, {weights})
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+    return total, rows
+
+
+def _search_postgres(db, q, scope_sql, params, limit, offset):
+    params = {**params, "q": q, "limit": limit, "offset": offset}
+    base = f"""
+        FROM submissions s, websearch_to_tsquery('english', :q) query
+        WHERE s.search_vector @@ query {scope_sql}
+    """
+
+    total = db.execute(text(f"SELECT count(*) {base}"), params).scalar()
+
+    # ts_headline re-parses the text, so it only runs for the rows on this page
+    rows = db.execute(text(f"""
+        SELECT page.*,
+               ts_headline('english',
+                   concat_ws(' … ', {", ".join("page." + f for f in SEARCH_FIELDS)}),
+                   websearch_to_tsquery('english', :q),
+                   'StartSel={_MARK_OPEN}, StopSel={_MARK_CLOSE}, MaxWords=30, MinWords=10, MaxFragments=2'
+               ) AS snippet
+        FROM (
+            SELECT s.id, s.proposed_title, s.proposal_type, s.final_decision, s.similarity_score,
+                   s.student_id, s.supervisor_id,
+                   {", ".join("s." + f for f in SEARCH_FIELDS[1:])},
+                   ts_rank_cd(s.search_vector, query) AS rank
+            {base}
+            ORDER BY rank DESC
+            LIMIT :limit OFFSET :offset
+        ) page
+        ORDER BY page.rank DESC
+    """), params).mappings().all()
+    return total, rows
+
+
+def search_submissions(db, user, q: str, limit: int, offset: int) -> dict:
+    scope_sql, params = _scope_clause(user)
+
+    if engine.dialect.name == "postgresql":
+        total, rows = _search_postgres(db, q, scope_sql, params, limit, offset)
+    else:
+        total, rows = _search_sqlite(db, q, scope_sql, params, limit, offset)
+
+    return {
+        "query": q,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "results": [
+            {
+                "id": r["id"],
+                "proposed_title": r["proposed_title"],
+                "proposal_type": r["proposal_type"],
+                "final_decision": r["final_decision"],
+                "similarity_score": float(r["similarity_score"] or 0),
+                "student_id": r["student_id"],
+                "supervisor_id": r["supervisor_id"],
+                "rank": float(r["rank"]),
+                "snippet": _highlight(r["snippet"]),
+            }
+            for r in rows
+        ],
+    }
@@ -1,12 +1,43 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import time
+from utils_metrics import Gauge, Histogram
+
+similarity_seconds = Histogram(
+    "similarity_compute_seconds", "TF-IDF similarity pass duration", labels=("proposal_type",)
+)
+similarity_corpus_size = Gauge(
+    "similarity_corpus_size", "Existing texts compared in the last pass", labels=("proposal_type",)
+)
+
+
+def make_vectorizer():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(stop_words='english', max_features=5000)
+
+
+def similarity_scores(new_text: str, existing_texts: list, proposal_type: str = "unknown"):
+    """
+    Cosine similarity of new_text to each existing text, as a numpy array
+    aligned with existing_texts (one sparse product against the new vector).
+    """
+    similarity_corpus_size.labels(proposal_type).set(len(existing_texts))
+
+    # scikit-learn (and SciPy behind it) takes ~1s to import, so it is loaded
+    # on first use instead of on every cold start
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
 
-def compute_similarity_percent(new_text: str, existing_texts: list):
     if not existing_texts:
-        return 0.0
-    corpus = existing_texts + [new_text]
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-    vectors = vectorizer.fit_transform(corpus)
-    sims = cosine_similarity(vectors[-1], vectors[:-1])[0]
-    max_sim = float(sims.max()) if len(sims) > 0 else 0.0
-    return round(max_sim * 100, 2)
+        return np.zeros(0)
+
+    with similarity_seconds.labels(proposal_type).time():
+        corpus = existing_texts + [new_text]
+        vectors = make_vectorizer().fit_transform(corpus)
+        return cosine_similarity(vectors[-1], vectors[:-1])[0]
+
+
+def top_percent(sims) -> float:
+    return round(float(sims.max()) * 100, 2) if len(sims) > 0 else 0.0
+
+
+def compute_similarity_percent(new_text: str, existing_texts: list, proposal_type: str = "unknown"):
+    return top_percent(similarity_scores(new_text, existing_texts, proposal_type))
@@ -50,5 +50,7 @@ def calculate_submission_similarity(submission: Submission, db: Session):
         existing_texts.append(text)
 
     # Call your original TF-IDF cosine similarity function
-    score = compute_similarity_percent(new_text, existing_texts)
+    score = compute_similarity_percent(
+        new_text, existing_texts, getattr(submission.proposal_type, "value", submission.proposal_type)
+    )
     return score
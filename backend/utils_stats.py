@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from models import Submission, User, RoleEnum, ProposalTypeEnum
+from utils_changes import SUBMISSIONS_SCOPE, USERS_SCOPE, current_version
+
+# Upper bound on staleness; writes invalidate earlier through the change counters
+STATS_CACHE_SECONDS = int(os.environ.get("STATS_CACHE_SECONDS", "60"))
+
+_cache = {"key": None, "at": 0.0, "value": None}
+_cache_lock = threading.Lock()
+
+HISTOGRAM_BUCKETS = 10   # 0-10, 10-20, ... 90-100
+
+
+def _turnaround_seconds(dialect: str):
+    if dialect == "postgresql":
+        return func.extract("epoch", Submission.lecturer_decision_at - Submission.created_at)
+    return (func.julianday(Submission.lecturer_decision_at) - func.julianday(Submission.created_at)) * 86400
+
+
+def _similarity_bucket():
+    # CASE instead of floor(): same result on SQLite and PostgreSQL
+    score = func.coalesce(Submission.similarity_score, 0)
+    width = 100 / HISTOGRAM_BUCKETS
+    return case(
+        *[(score < width * (i + 1), i) for i in range(HISTOGRAM_BUCKETS - 1)],
+        else_=HISTOGRAM_BUCKETS - 1
+    )
+
+
+def compute_stats(db: Session) -> dict:
+    dialect = db.get_bind().dialect.name
+
+    # final_decision x proposal_type x supervisor; decisions are stored in mixed case
+    decision = func.lower(Submission.final_decision)
+    breakdown = (
+        db.query(
+            decision,
+            Submission.proposal_type,
+            Submission.supervisor_id,
+            func.count(Submission.id),
+        )
+        .group_by(decision, Submission.proposal_type, Submission.supervisor_id)
+        .all()
+    )
+
+    # The full cross-tab, plus its marginals for the simple cards
+    by_type = {t.value: 0 for t in ProposalTypeEnum}
+    by_decision = {}
+    by_decision_type = {}
+    by_supervisor = {}
+    total = 0
+    for decision, ptype, supervisor_id, n in breakdown:
+        ptype = ptype.value if ptype else None
+        decision = decision or "pending"
+        total += n
+        by_type[ptype] = by_type.get(ptype, 0) + n
+        by_decision[decision] = by_decision.get(decision, 0) + n
+        cell = by_decision_type.setdefault(decision, {})
+        cell[ptype] = cell.get(ptype, 0) + n
+        sup = by_supervisor.setdefault(supervisor_id, {"total": 0, "by_type": {}, "by_decision": {}, "by_decision_type": {}})
+        sup["total"] += n
+        sup["by_type"][ptype] = sup["by_type"].get(ptype, 0) + n
+        sup["by_decision"][decision] = sup["by_decision"].get(decision, 0) + n
+        cell = sup["by_decision_type"].setdefault(decision, {})
+        cell[ptype] = cell.get(ptype, 0) + n
+
+    # Similarity histogram
+    bucket = _similarity_bucket().label("bucket")
+    histogram = [0] * HISTOGRAM_BUCKETS
+    for b, n in db.query(bucket, func.count(Submission.id)).group_by(bucket).all():
+        histogram[b] = n
+    width = 100 // HISTOGRAM_BUCKETS
+
+    # Average lecturer turnaround, overall and per supervisor
+    turnaround = _turnaround_seconds(dialect)
+    decided = Submission.lecturer_decision_at.isnot(None)
+    turnaround_rows = (
+        db.query(Submission.supervisor_id, func.avg(turnaround), func.count(Submission.id))
+        .filter(decided)
+        .group_by(Submission.supervisor_id)
+        .all()
+    )
+    overall_seconds = db.query(func.avg(turnaround)).filter(decided).scalar()
+
+    # Users
+    users_by_role = {r.value: 0 for r in RoleEnum}
+    for role, n in db.query(User.role, func.count(User.id)).group_by(User.role).all():
+        users_by_role[role.value] = n
+    pending_users = db.query(func.count(User.id)).filter(User.is_approved.is_(False)).scalar()
+
+    lecturers = db.query(User.id, User.name, User.email).filter(User.role == RoleEnum.lecturer).all()
+    avg_by_supervisor = {sid: (avg, n) for sid, avg, n in turnaround_rows}
+
+    supervisors = []
+    for lid, name, email in lecturers:
+        counts = by_supervisor.get(lid, {"total": 0, "by_type": {}, "by_decision": {}, "by_decision_type": {}})
+        avg, decided_count = avg_by_supervisor.get(lid, (None, 0))
+        supervisors.append({
+            "id": lid,
+            "name": name,
+            "email": email,
+            **counts,
+            "decided": decided_count,
+            "avg_turnaround_hours": round(float(avg) / 3600, 2) if avg is not None else None,
+        })
+
+    return {
+        "total_submissions": total,
+        "by_type": by_type,
+        "by_decision": by_decision,
+        "by_decision_type": by_decision_type,
+        "supervisors": supervisors,
+        "unassigned": by_supervisor.get(None, {"total": 0, "by_type": {}, "by_decision": {}, "by_decision_type": {}}),
+        "similarity_histogram": [
+            {"from": i * width, "to": (i + 1) * width, "count": n}
+            for i, n in enumerate(histogram)
+        ],
+        "pending_submissions": by_decision.get("pending", 0),
+        "pending_user_approvals": pending_users,
+        "users_by_role": users_by_role,
+        "avg_turnaround_hours": round(float(overall_seconds) / 3600, 2) if overall_seconds is not None else None,
+    }
+
+
+def get_stats(db: Session) -> dict:
+    """
+    compute_stats, cached until a submission or user write bumps a change
+    counter or STATS_CACHE_SECONDS pass. The counters live in the DB, so
+    every worker notices writes made by the others.
+    """
+    key = (current_version(db, SUBMISSIONS_SCOPE), current_version(db, USERS_SCOPE))
+    now = time.monotonic()
+
+    with _cache_lock:
+        if _cache["key"] == key and now - _cache["at"] < STATS_CACHE_SECONDS:
+            return _cache["value"]
+
+    value = compute_stats(db)
+    value["generated_at"] = datetime.utcnow().isoformat()
+
+    with _cache_lock:
+        _cache.update(key=key, at=now, value=value)
+    return value
@@ -0,0 +1,134 @@
+import re
+import heapq
+import threading
+from collections import Counter, defaultdict
+from sqlalchemy.orm import Session
+from models import Submission, SubmissionChange
+from utils_changes import latest_change_id
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def title_trigrams(title: str) -> set:
+    """
+    Character trigrams of each word, padded like pg_trgm so short words and
+    word starts/ends still produce trigrams.
+    """
+    grams = set()
+    for word in _NON_WORD.split((title or "").lower()):
+        if word:
+            padded = f"  {word} "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TitleIndex:
+    """
+    In-memory trigram inverted index of proposed_title per proposal_type.
+
+    Kept current from the submission_changes log: each lookup first applies
+    changes newer than the last cursor it saw, which is one indexed query and
+    works across workers. Only ids, types and titles are ever loaded.
+    Queries run outside the lock; only applying their result takes it, so
+    searches never wait on the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(lambda: defaultdict(set))   # type -> trigram -> {ids}
+        self._docs = {}                                          # id -> (type, student_id, title, grams)
+        self._cursor = None
+
+    def _remove(self, sid: int):
+        doc = self._docs.pop(sid, None)
+        if doc:
+            ptype, _, _, grams = doc
+            postings = self._postings[ptype]
+            for g in grams:
+                postings[g].discard(sid)
+                if not postings[g]:
+                    del postings[g]
+
+    def _add(self, sid: int, ptype: str, student_id: int, title: str):
+        grams = title_trigrams(title)
+        self._docs[sid] = (ptype, student_id, title, grams)
+        postings = self._postings[ptype]
+        for g in grams:
+            postings[g].add(sid)
+
+    def _load(self, db: Session):
+        # Cursor first: anything written during the load is re-applied next time
+        cursor = latest_change_id(db)
+        fresh = TitleIndex()
+        rows = db.query(
+            Submission.id, Submission.proposal_type, Submission.student_id, Submission.proposed_title
+        ).yield_per(1000)
+        for sid, ptype, student_id, title in rows:
+            fresh._add(sid, getattr(ptype, "value", ptype), student_id, title)
+
+        with self._lock:
+            if self._cursor is None:   # not loaded by another thread meanwhile
+                self._postings, self._docs, self._cursor = fresh._postings, fresh._docs, cursor
+
+    def refresh(self, db: Session):
+        cursor = self._cursor
+        if cursor is None:
+            self._load(db)
+            return
+
+        changes = (
+            db.query(SubmissionChange.id, SubmissionChange.submission_id)
+            .filter(SubmissionChange.id > cursor)
+            .order_by(SubmissionChange.id)
+            .all()
+        )
+        if not changes:
+            return
+
+        touched = {sid for _, sid in changes}
+        current = db.query(
+            Submission.id, Submission.proposal_type, Submission.student_id, Submission.proposed_title
+        ).filter(Submission.id.in_(touched)).all()
+
+        with self._lock:
+            # Another thread applied changes from this cursor first; the next refresh catches up
+            if self._cursor != cursor:
+                return
+            for sid in touched:
+                self._remove(sid)
+            for sid, ptype, student_id, title in current:
+                self._add(sid, getattr(ptype, "value", ptype), student_id, title)
+            self._cursor = changes[-1][0]
+
+    def search(self, title: str, ptype: str, limit: int = 5, exclude_student: int = None) -> list:
+        """
+        Top matches by Dice coefficient on trigram sets, as (score 0-100, id, title).
+        Only titles sharing at least one trigram are scored.
+        """
+        grams = title_trigrams(title)
+        if not grams:
+            return []
+
+        with self._lock:
+            postings = self._postings.get(ptype, {})
+            overlap = Counter()
+            for g in grams:
+                # Counter.update counts in C; common trigrams have long lists
+                overlap.update(postings.get(g, ()))
+
+            scored = []
+            for sid, shared in overlap.items():
+                _, student_id, doc_title, doc_grams = self._docs[sid]
+                if exclude_student is not None and student_id == exclude_student:
+                    continue
+                scored.append((200.0 * shared / (len(grams) + len(doc_grams)), sid, doc_title))
+
+        top = heapq.nlargest(limit, scored, key=lambda x: (x[0], -x[1]))
+        return [(round(score, 2), sid, t) for score, sid, t in top]
+
+    @property
+    def size(self) -> int:
+        return len(self._docs)
+
+
+title_index = TitleIndex()
@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+from sqlalchemy import text
+from database import engine, idle_recycler, SessionLocal
+from models import Settings
+
+# Requests after a gap this long re-run the warm-up (Render sleeps after ~15 min)
+WARMUP_IDLE_SECONDS = int(os.environ.get("WARMUP_IDLE_SECONDS", "600"))
+# Pool connections opened and validated up front
+WARMUP_CONNECTIONS = int(os.environ.get("WARMUP_CONNECTIONS", "3"))
+
+
+def _warm_pool():
+    # After a sleep, start from a fresh pool rather than pinging dead sockets
+    if idle_recycler:
+        idle_recycler.check()
+
+    # Hold them all at once so the pool really opens N connections
+    conns = []
+    try:
+        for _ in range(max(1, WARMUP_CONNECTIONS)):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+def _warm_settings():
+    db = SessionLocal()
+    try:
+        db.query(Settings).first()
+    finally:
+        db.close()
+
+
+def _warm_similarity():
+    from utils_title_index import title_index
+    from utils_similarity import compute_similarity_percent
+    from utils_archive import archive_index
+    from utils_references import reference_index
+
+    db = SessionLocal()
+    try:
+        title_index.refresh(db)
+        archive_index.refresh(db)
+        reference_index.refresh(db)
+    finally:
+        db.close()
+
+    # Imports scikit-learn and runs the vectorizer once
+    compute_similarity_percent("warm up text", ["another warm up text"])
+
+
+def _warm_pdf():
+    from utils_pdf import get_styles
+    get_styles()
+
+
+WARMUP_STEPS = [
+    ("db_pool", _warm_pool),
+    ("settings", _warm_settings),
+    ("similarity", _warm_similarity),
+    ("pdf_template", _warm_pdf),
+]
+
+
+class WarmUp:
+    """
+    Runs WARMUP_STEPS in a background thread at startup and again on the
+    first request after an idle gap. /health/ready reports `ready` so the
+    load balancer holds traffic until the first run finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.ready = False
+        self.runs = 0
+        self.last_activity = time.monotonic()
+        self.steps = {}
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def touch(self):
+        """Called per request. Kicks off a warm-up if we were idle for a while."""
+        now = time.monotonic()
+        idle = now - self.last_activity
+        self.last_activity = now
+        if idle > WARMUP_IDLE_SECONDS:
+            print(f"💤 Idle for {idle:.0f}s, warming up again")
+            self.start()
+
+    def _run(self):
+        started = time.perf_counter()
+        for name, step in WARMUP_STEPS:
+            t0 = time.perf_counter()
+            try:
+                step()
+                self.steps[name] = {"ok": True, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+            except Exception as e:
+                self.steps[name] = {"ok": False, "error": str(e)}
+                print(f"❌ Warm-up step {name} failed:", e)
+
+        self.runs += 1
+        # Without the database nothing works; the other steps only cost latency
+        # if they failed, so they do not keep the instance out of rotation
+        if self.steps["db_pool"]["ok"]:
+            self.ready = True
+        print(f"🔥 Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warming": bool(self._thread and self._thread.is_alive()),
+            "runs": self.runs,
+            "steps": self.steps,
+        }
+
+
+warmup = WarmUp()
+
+
+class ActivityMiddleware:
+    """
+    Plain ASGI middleware (no body buffering, safe for streaming responses)
+    that reports each request to the warm-up tracker. Health checks and
+    metric scrapes are not activity, otherwise polling would hide every idle gap.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith(("/health", "/metrics")):
+            warmup.touch()
+        await self.app(scope, receive, send)
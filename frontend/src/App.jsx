@@ -5,10 +5,14 @@ import Signup from './components/Signup';
 import StudentPanel from './components/StudentPanel';
 import LecturerPanel from './components/LecturerPanel';
 import AdminDashboard from './components/AdminDashboard';
+import ChangePassword from './components/ChangePassword';
+import { refreshTokens } from './auth';
 
 // 🔥 Toast imports
 import { Toaster } from "react-hot-toast";
 
+const API_URL = process.env.REACT_APP_API_URL || "http://localhost:8000";
+
 export default function App() {
   const [user, setUser] = useState(null);
 
@@ -26,12 +30,63 @@ export default function App() {
     }
   }, []);
 
+  // Renew the access token shortly before it expires (no password re-entry)
+  useEffect(() => {
+    if (!user?.exp) return;
+
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) return;
+
+    const delay = Math.max(user.exp * 1000 - Date.now() - 60 * 1000, 0);
+
+    const timer = setTimeout(async () => {
+      try {
+        const accessToken = await refreshTokens(API_URL);
+        setUser(JSON.parse(atob(accessToken.split('.')[1])));
+      } catch (e) {
+        console.error('Token refresh failed:', e);
+        handleLogout();
+      }
+    }, delay);
+
+    return () => clearTimeout(timer);
+  }, [user]);
+
   // Handle logout globally
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      fetch(`${API_URL}/auth/logout`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setUser(null);
   };
 
+  // Imported / reset accounts must replace their temporary password first
+  if (user?.pwd_change) {
+    return (
+      <div className="min-h-screen bg-gray-100 p-6">
+        <Toaster position="top-right" toastOptions={{ duration: 4000 }} />
+        <p className="max-w-md mx-auto mb-4 text-gray-700">
+          Please choose a new password before continuing.
+        </p>
+        <ChangePassword
+          API_URL={API_URL}
+          token={localStorage.getItem('token')}
+          onChanged={(accessToken) => setUser(JSON.parse(atob(accessToken.split('.')[1])))}
+        />
+        <button onClick={handleLogout} className="block mx-auto mt-4 text-sm text-gray-600 underline">
+          Logout
+        </button>
+      </div>
+    );
+  }
+
   return (
     <Router>
 
@@ -0,0 +1,40 @@
+// src/auth.js
+
+// Refresh tokens are single use (rotated on every call), so concurrent
+// callers - the App timer and the event stream - share one request.
+let inFlight = null;
+
+export function tokenExpiresSoon(token, marginMs = 30 * 1000) {
+  try {
+    const { exp } = JSON.parse(atob(token.split(".")[1]));
+    return !exp || exp * 1000 - Date.now() < marginMs;
+  } catch (e) {
+    return true;
+  }
+}
+
+// Stores and returns the new access token; throws if the refresh was refused
+export function refreshTokens(API_URL) {
+  if (inFlight) return inFlight;
+
+  inFlight = (async () => {
+    const refreshToken = localStorage.getItem("refresh_token");
+    if (!refreshToken) throw new Error("No refresh token");
+
+    const res = await fetch(`${API_URL}/auth/refresh`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!res.ok) throw new Error(await res.text());
+
+    const data = await res.json();
+    localStorage.setItem("token", data.access_token);
+    localStorage.setItem("refresh_token", data.refresh_token);
+    return data.access_token;
+  })().finally(() => {
+    inFlight = null;
+  });
+
+  return inFlight;
+}
@@ -20,6 +20,7 @@ export default function AdminDashboard() {
   const [selectedStudent, setSelectedStudent] = useState(null);
   const [selectedLecturer, setSelectedLecturer] = useState(null);
   const [settings, setSettings] = useState({ undergrad_mode: 'title', postgrad_mode: 'title_plus' });
+  const [stats, setStats] = useState(null);
 
   // Filters state for Submissions
   const [submissionFilter, setSubmissionFilter] = useState({
@@ -42,8 +43,8 @@ export default function AdminDashboard() {
     else if (activeTab === 'assign') { fetchStudents(); fetchLecturers(); }
     else if (activeTab === 'settings') fetchSettings();
     else if (activeTab === 'dashboard') {
-      // load everything important for dashboard
-      Promise.all([fetchSubs(), fetchAllUsers(), fetchStudents(), fetchLecturers()]).catch(() => {});
+      // Counts are aggregated on the server; no need to download every proposal
+      fetchStats();
     }
   }, [activeTab]);
 
@@ -60,6 +61,17 @@ export default function AdminDashboard() {
     }
   };
 
+  const fetchStats = async () => {
+    try {
+      const res = await fetch(`${API_URL}/admin/stats`, { headers: { Authorization: `Bearer ${token}` }});
+      if (!res.ok) throw new Error(await res.text());
+      setStats(await res.json());
+    } catch (err) {
+      setError(err.message);
+      toast.error("Unable to load dashboard stats");
+    }
+  };
+
   const fetchSubs = async () => {
     try {
       const res = await fetch(`${API_URL}/submissions`, { headers: { Authorization: `Bearer ${token}` }});
@@ -184,7 +196,7 @@ export default function AdminDashboard() {
       });
       const data = await res.json();
       if (!res.ok) throw new Error(data.detail || "Failed reset");
-      toast.success("Password reset to 1234567");
+      toast.success(data.message);
     } catch (err) {
       toast.error("Reset failed: " + err.message);
     }
@@ -247,16 +259,38 @@ const saveSettings = async () => {
   // Counts by category for dashboard
   const counts = useMemo(() => {
     const c = { Seminar: 0, Project: 0, Dissertation: 0, Thesis: 0, totalStudents: 0, totalLecturers: 0, totalUsers: 0 };
-    subs.forEach(s => {
-      if (s.proposal_type) {
-        if (c[s.proposal_type] !== undefined) c[s.proposal_type] += 1;
-      }
-    });
-    c.totalStudents = students.length;
-    c.totalLecturers = lecturers.length;
-    c.totalUsers = allUsers.length;
+    if (!stats) return c;
+    Object.assign(c, stats.by_type);
+    c.totalStudents = stats.users_by_role.student;
+    c.totalLecturers = stats.users_by_role.lecturer;
+    c.totalUsers = Object.values(stats.users_by_role).reduce((a, b) => a + b, 0);
     return c;
-  }, [subs, students, lecturers, allUsers]);
+  }, [stats]);
+
+  // Download every PDF matching the current filter as one ZIP
+  const downloadPdfBundle = async () => {
+    try {
+      const params = new URLSearchParams();
+      if (submissionFilter.category) params.append('proposal_type', submissionFilter.category);
+      if (submissionFilter.lecturerId) params.append('supervisor_id', submissionFilter.lecturerId);
+
+      const res = await fetch(`${API_URL}/admin/submissions/pdf_bundle?${params}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      if (!res.ok) throw new Error(await res.text());
+
+      const blob = await res.blob();
+      const url = window.URL.createObjectURL(blob);
+      const a = document.createElement('a');
+      a.href = url;
+      a.download = 'submissions.zip';
+      a.click();
+      window.URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error(err);
+      toast.error("Unable to download PDFs");
+    }
+  };
 
   // Apply submissionFilter to subs when showing submissions tab
   const filteredSubs = useMemo(() => {
@@ -346,6 +380,21 @@ const saveSettings = async () => {
               <div className="text-2xl mt-2">{counts.totalUsers}</div>
             </div>
 
+            <div className="p-4 bg-white rounded shadow">
+              <h3 className="font-semibold">Awaiting decision</h3>
+              <div className="text-2xl mt-2">{stats?.pending_submissions ?? 0}</div>
+            </div>
+
+            <div className="p-4 bg-white rounded shadow">
+              <h3 className="font-semibold">Pending user approvals</h3>
+              <div className="text-2xl mt-2">{stats?.pending_user_approvals ?? 0}</div>
+            </div>
+
+            <div className="p-4 bg-white rounded shadow">
+              <h3 className="font-semibold">Avg. lecturer decision time</h3>
+              <div className="text-2xl mt-2">{stats?.avg_turnaround_hours != null ? `${stats.avg_turnaround_hours} h` : '-'}</div>
+            </div>
+
             {/* Category cards */}
             <div className="col-span-1 md:col-span-3 grid grid-cols-2 md:grid-cols-4 gap-4 mt-4">
               {['Seminar','Project','Dissertation','Thesis'].map(cat => (
@@ -365,21 +414,23 @@ const saveSettings = async () => {
             <div className="col-span-1 md:col-span-3 mt-4 bg-white rounded p-4 shadow">
               <h3 className="font-semibold mb-2">Lecturers (click to open details)</h3>
               <div className="space-y-2">
-                {lecturers.length === 0 ? <div className="text-sm text-gray-500">No lecturers</div> :
-                  lecturers.map(l => {
-                    // compute counts per lecturer quickly (client-side)
-                    const byLect = subs.filter(s => s.supervisor?.id === l.id);
+                {!stats || stats.supervisors.length === 0 ? <div className="text-sm text-gray-500">No lecturers</div> :
+                  stats.supervisors.map(l => {
+                    const byType = l.by_type || {};
                     return (
                       <div key={l.id} className="flex justify-between items-center border-b py-2">
                         <div>
                           <button className="text-blue-600 hover:underline" onClick={() => openLecturerPage(l.id)}>{l.name}</button>
                           <div className="text-xs text-gray-500">Email: {l.email}</div>
+                          {l.avg_turnaround_hours !== null && (
+                            <div className="text-xs text-gray-500">Avg. decision time: {l.avg_turnaround_hours} h</div>
+                          )}
                         </div>
                         <div className="text-xs text-right">
-                          <div>Seminar: {byLect.filter(x => x.proposal_type === 'Seminar').length}</div>
-                          <div>Project: {byLect.filter(x => x.proposal_type === 'Project').length}</div>
-                          <div>Dissertation: {byLect.filter(x => x.proposal_type === 'Dissertation').length}</div>
-                          <div>Thesis: {byLect.filter(x => x.proposal_type === 'Thesis').length}</div>
+                          <div>Seminar: {byType.Seminar || 0}</div>
+                          <div>Project: {byType.Project || 0}</div>
+                          <div>Dissertation: {byType.Dissertation || 0}</div>
+                          <div>Thesis: {byType.Thesis || 0}</div>
                         </div>
                       </div>
                     );
@@ -399,6 +450,7 @@ const saveSettings = async () => {
                 { (submissionFilter.category || submissionFilter.lecturerId) && (
                   <button className="px-3 py-1 rounded bg-gray-200" onClick={clearSubmissionFilter}>Clear Filter</button>
                 )}
+                <button className="px-3 py-1 rounded bg-gray-600 text-white hover:bg-gray-700" onClick={downloadPdfBundle}>Download PDFs (ZIP)</button>
               </div>
             </div>
 
@@ -1,7 +1,7 @@
 // src/components/ChangePassword.jsx
 import React, { useState } from "react";
 
-export default function ChangePassword({ API_URL, token }) {
+export default function ChangePassword({ API_URL, token, onChanged }) {
   const [oldPassword, setOldPassword] = useState("");
   const [newPassword, setNewPassword] = useState("");
   const [confirmPassword, setConfirmPassword] = useState("");
@@ -22,8 +22,12 @@ export default function ChangePassword({ API_URL, token }) {
 
       const data = await res.json();
       if (!res.ok) throw new Error(data.detail || "Failed to change password");
+      // Older refresh tokens were revoked; keep this session on the new pair
+      localStorage.setItem("token", data.access_token);
+      localStorage.setItem("refresh_token", data.refresh_token);
       alert("✅ Password changed successfully!");
       setOldPassword(""); setNewPassword(""); setConfirmPassword("");
+      if (onChanged) onChanged(data.access_token);
     } catch (err) {
       alert("❌ " + err.message);
     } finally {
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import SimilarityMeter from './SimilarityMeter';
 import { useNavigate } from 'react-router-dom';
 import { toast } from 'react-hot-toast';
+import useSubmissionEvents from '../useSubmissionEvents';
 
 export default function LecturerPanel({ user, setUser }) {
   const [subs, setSubs] = useState([]);
@@ -45,6 +46,14 @@ export default function LecturerPanel({ user, setUser }) {
 
   useEffect(() => { fetchSubs(); }, []);
 
+  // New submissions from supervisees and admin decisions arrive over SSE
+  useSubmissionEvents(API_URL, (type, data) => {
+    if (type === "submission.created") {
+      toast(`New submission: ${data.proposed_title}`);
+    }
+    fetchSubs();
+  });
+
   // ⭐ NEW ⭐ — Filter Logic
   const applyFilter = (all, type) => {
     if (type === "seminar") {
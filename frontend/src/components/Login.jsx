@@ -41,6 +41,7 @@ export default function Login({ setUser }) {
 
       const data = await res.json();
       localStorage.setItem("token", data.access_token);
+      localStorage.setItem("refresh_token", data.refresh_token);
 
       // Decode JWT
       const payload = JSON.parse(atob(data.access_token.split(".")[1]));
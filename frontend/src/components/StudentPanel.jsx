@@ -3,6 +3,7 @@ import ChangePassword from "./ChangePassword";
 import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import toast from "react-hot-toast";
+import useSubmissionEvents from "../useSubmissionEvents";
 
 export default function StudentPanel({ user, setUser }) {
   const [proposalType, setProposalType] = useState("Seminar – Undergraduate");
@@ -22,6 +23,8 @@ export default function StudentPanel({ user, setUser }) {
   const [showPasswordModal, setShowPasswordModal] = useState(false);
   const [supervisor, setSupervisor] = useState(null);
   const [formOpen, setFormOpen] = useState(false);
+  const [refreshKey, setRefreshKey] = useState(0);
+  const [titlePreview, setTitlePreview] = useState(null);
 
   const navigate = useNavigate();
   const API_URL = process.env.REACT_APP_API_URL || "http://localhost:8000";
@@ -72,7 +75,40 @@ export default function StudentPanel({ user, setUser }) {
       fetchSubmissions();
       fetchSupervisor();
     }
-  }, [student_id, API_URL, token]);
+  }, [student_id, API_URL, token, refreshKey]);
+
+  // Pushed by the server when a decision or score changes
+  useSubmissionEvents(API_URL, (type, data) => {
+    if (type === "submission.decided") {
+      toast(`"${data.proposed_title}" is now ${data.final_decision}`);
+    }
+    setRefreshKey((k) => k + 1);
+  });
+
+  // Live title similarity while typing (debounced)
+  useEffect(() => {
+    if (!formOpen || title.trim().length < 4) {
+      setTitlePreview(null);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ title, type: toBackendEnum(proposalType), limit: 3 });
+        const res = await fetch(`${API_URL}/similarity/preview?${params}`, {
+          headers: { Authorization: `Bearer ${token}` },
+          signal: controller.signal,
+        });
+        if (res.ok) setTitlePreview(await res.json());
+      } catch (err) {
+        // aborted or offline - the full check still runs on submit
+      }
+    }, 250);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [title, proposalType, formOpen, API_URL, token]);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -373,6 +409,11 @@ return (
               className="w-full p-2 border rounded"
               required
             />
+            {titlePreview && titlePreview.hits.length > 0 && (
+              <div className={`text-xs ${titlePreview.best_score >= 70 ? "text-red-600" : "text-gray-500"}`}>
+                Closest existing title: {titlePreview.best_score}% match
+              </div>
+            )}
     
             <textarea value={background} onChange={(e) => setBackground(e.target.value)} placeholder="Background" className="w-full p-2 border rounded" required />
             <textarea value={aim} onChange={(e) => setAim(e.target.value)} placeholder="Aim" className="w-full p-2 border rounded" required />
@@ -0,0 +1,75 @@
+// src/useSubmissionEvents.js
+import { useEffect, useRef } from "react";
+import { refreshTokens, tokenExpiresSoon } from "./auth";
+
+const EVENT_TYPES = [
+  "submission.created",
+  "submission.decided",
+  "submission.updated",
+  "submission.deleted",
+  "resync",
+];
+
+const RETRY_MIN_MS = 1000;
+const RETRY_MAX_MS = 30000;
+
+// One server-sent events stream per panel instead of polling.
+// onEvent(type, data) runs for every submission event the user may see.
+export default function useSubmissionEvents(API_URL, onEvent) {
+  const handler = useRef(onEvent);
+  handler.current = onEvent;
+
+  useEffect(() => {
+    let source = null;
+    let stopped = false;
+    let timer = null;
+    let retryMs = RETRY_MIN_MS;
+
+    const connect = () => {
+      const token = localStorage.getItem("token");
+      if (!token || stopped) return;
+
+      source = new EventSource(`${API_URL}/events?token=${encodeURIComponent(token)}`);
+      source.onopen = () => {
+        retryMs = RETRY_MIN_MS;
+      };
+
+      EVENT_TYPES.forEach((type) =>
+        source.addEventListener(type, (e) => {
+          handler.current(type, e.data ? JSON.parse(e.data) : {});
+        })
+      );
+
+      // The token is part of the URL, so the browser's own reconnect would
+      // reuse it forever: close, get a fresh token if needed, then reopen
+      source.addEventListener("expired", reopen);
+      source.onerror = reopen;
+    };
+
+    const reopen = async () => {
+      if (source) source.close();
+      if (stopped) return;
+
+      const token = localStorage.getItem("token");
+      if (token && tokenExpiresSoon(token)) {
+        try {
+          await refreshTokens(API_URL);
+        } catch (e) {
+          // Refresh refused: App logs the user out; keep backing off until then
+          console.error("Event stream token refresh failed:", e);
+        }
+      }
+
+      clearTimeout(timer);
+      timer = setTimeout(connect, retryMs);
+      retryMs = Math.min(retryMs * 2, RETRY_MAX_MS);
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(timer);
+      if (source) source.close();
+    };
+  }, [API_URL]);
+}